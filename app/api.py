@@ -0,0 +1,223 @@
+"""JSON aggregation API over the dashboard's data cube.
+
+    GET /api/aggregate?group_by=year,type&metrics=titles,imdb_score&types=MOVIE&year_range=2010,2020
+
+``group_by`` takes any of DIMENSIONS and ``metrics`` any of METRICS (comma-separated
+or repeated). The filters are the dashboard's: ``year_range`` (two years,
+inclusive), ``types``, ``genres`` and ``countries``. Genres and countries are
+multi-label, so grouping by them counts a title once under each of its labels.
+``share`` is a group's titles over all the (filtered) titles of the same year or
+quarter, or over all of them when not grouping by time: e.g. a genre's share of
+its year. ``hits`` counts titles at visualization.DEFAULT_HIT.
+
+Results are paginated with ``offset`` and ``limit`` (at most MAX_LIMIT rows), in
+group order. ``format=columns`` returns each column as one array instead of a
+list of row objects.
+
+Queries are answered from the cube (see visualization.cube), its cells split by
+quarter, plus the hit titles, never from the title rows. Aggregated results are kept in an in-memory
+LRU of at most CACHE_BYTES per process, keyed by the published data version and
+the normalized query, so every page of a result is cut from one aggregation.
+Responses also go through http_cache, which adds ETags and keeps compressed pages.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+import flask
+import numpy as np
+import pandas as pd
+
+import rebuild
+import visualization
+from visualization import dataset, get_dataset
+
+DIMENSIONS = ("year", "quarter", "type", "genre", "country")
+LABEL_DIMENSIONS = {"genre": ("genre_combo", "genres"), "country": ("country_combo", "countries")}
+TIME_DIMENSIONS = ("year", "quarter")
+METRICS = ("titles", "imdb_score", "high_quality", "high_quality_ratio", "hits", "share", "close")
+DEFAULT_METRICS = ("titles", "imdb_score")
+SUMMED_COLUMNS = ["titles", "score_sum", "score_count", "high_quality", "hits", "close_sum"]
+CELL_KEYS = ["quarter", *visualization.CELL_KEYS]
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+
+# Upper bound on the aggregated results kept in memory, per process.
+CACHE_BYTES = 32 << 20
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+
+class QueryError(ValueError):
+    """The request's parameters don't describe a valid query."""
+
+
+@dataset
+def api_cells():
+    """The cube's cells split by quarter, with their default-threshold hit count and close x titles."""
+    cube = get_dataset("cube")
+    dated = cube.dated
+    rows = cube.cells[visualization.CELL_KEYS].iloc[dated["cell"].to_numpy()].reset_index(drop=True)
+    rows["quarter"] = dated["release_date"].dt.to_period("Q").astype(str).to_numpy()
+    for column in ["titles", "score_sum", "score_count", "high_quality"]:
+        rows[column] = dated[column].to_numpy()
+    rows["close_sum"] = (dated["close"] * dated["titles"]).to_numpy()
+    cells = rows.groupby(CELL_KEYS, observed=True)[["titles", "score_sum", "score_count", "high_quality", "close_sum"]].sum()
+
+    hit_titles = get_dataset("hit_titles", visualization.DEFAULT_HIT)
+    hits = hit_titles.assign(
+        quarter=hit_titles["release_date"].dt.to_period("Q").astype(str),
+        type=hit_titles["type"].astype(str),
+    ).groupby(CELL_KEYS, observed=True).size()
+    cells["hits"] = hits.reindex(cells.index, fill_value=0).astype(np.int64)
+    return cells.reset_index()
+
+
+def explode_labels(cells, dimension):
+    """One row per (cell, label) of the cells' genre or country combinations, with the label in ``dimension``."""
+    combo_column, index_name = LABEL_DIMENSIONS[dimension]
+    index = getattr(get_dataset("cube"), index_name)
+    combos = cells[combo_column].to_numpy()
+    lengths = np.diff(index.offsets)[combos]
+    rows = np.repeat(np.arange(len(cells)), lengths)
+    within = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    labels = index.codes[index.offsets[combos][rows] + within]
+    exploded = cells.iloc[rows].reset_index(drop=True)
+    exploded[dimension] = np.asarray(index.labels, dtype=object)[labels]
+    return exploded
+
+
+def aggregate(group_by, metrics, filters):
+    """The ``metrics`` of the cells matching ``filters``, per ``group_by`` group, as a frame."""
+    cells = get_dataset("api_cells")
+    cells = cells[visualization.filter_mask(cells, filters)]
+    grouped = cells
+    for dimension in group_by:
+        if dimension in LABEL_DIMENSIONS:
+            grouped = explode_labels(grouped, dimension)
+
+    if group_by:
+        sums = grouped.groupby(list(group_by), sort=True)[SUMMED_COLUMNS].sum().reset_index()
+    else:
+        sums = pd.DataFrame({column: [grouped[column].sum()] for column in SUMMED_COLUMNS})
+    result = sums[list(group_by)].copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for metric in metrics:
+            if metric == "imdb_score":
+                result[metric] = sums["score_sum"] / sums["score_count"]
+            elif metric == "high_quality_ratio":
+                result[metric] = sums["high_quality"] / sums["titles"]
+            elif metric == "close":
+                result[metric] = sums["close_sum"] / sums["titles"]
+            elif metric == "share":
+                periods = [dimension for dimension in group_by if dimension in TIME_DIMENSIONS]
+                if periods:
+                    totals = cells.groupby(periods)["titles"].sum().rename("total").reset_index()
+                    total = sums[periods].merge(totals, on=periods, how="left")["total"].to_numpy()
+                else:
+                    total = cells["titles"].sum()
+                result[metric] = sums["titles"] / total
+            else:
+                result[metric] = sums[metric]
+    return result
+
+
+def _values(args, name, default=()):
+    values = [value.strip() for raw in args.getlist(name) for value in raw.split(",") if value.strip()]
+    return tuple(values) or tuple(default)
+
+
+def _int(args, name, default):
+    try:
+        return int(args.get(name, default))
+    except ValueError:
+        raise QueryError(f"{name} must be an integer")
+
+
+def parse_query(args):
+    """(group_by, metrics, filters) from request arguments, normalized so equal queries compare equal."""
+    group_by = _values(args, "group_by")
+    metrics = _values(args, "metrics", DEFAULT_METRICS)
+    for name, values, allowed in (("group_by", group_by, DIMENSIONS), ("metrics", metrics, METRICS)):
+        unknown = sorted(set(values) - set(allowed))
+        if unknown:
+            raise QueryError(f"unknown {name}: {', '.join(unknown)} (expected any of {', '.join(allowed)})")
+    if len(set(group_by)) != len(group_by):
+        raise QueryError("group_by has a repeated dimension")
+
+    year_range = _values(args, "year_range")
+    if year_range and (len(year_range) != 2 or not all(year.isdigit() for year in year_range)):
+        raise QueryError("year_range must be two years, e.g. year_range=2010,2020")
+    filters = visualization.make_filters(year_range, _values(args, "types"), _values(args, "genres"),
+                                         _values(args, "countries"))
+    return group_by, tuple(dict.fromkeys(metrics)), filters
+
+
+def cached_aggregate(group_by, metrics, filters):
+    global _cache_bytes
+    key = (rebuild.current_version(), group_by, metrics, filters)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            return entry[0]
+
+    result = aggregate(group_by, metrics, filters)
+    size = int(result.memory_usage(index=True, deep=True).sum())
+    if size <= CACHE_BYTES:
+        with _lock:
+            if key not in _cache:
+                _cache[key] = (result, size)
+                _cache_bytes += size
+                while _cache_bytes > CACHE_BYTES:
+                    _, (_, evicted_size) = _cache.popitem(last=False)
+                    _cache_bytes -= evicted_size
+    return result
+
+
+def clear():
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+
+def page_json(result, group_by, metrics, offset, limit, columnar):
+    """The response body for one page of ``result``, as JSON text."""
+    page = result.iloc[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(result) else None
+    header = {"group_by": list(group_by), "metrics": list(metrics), "total": len(result),
+              "offset": offset, "limit": limit, "next_offset": next_offset}
+    # pandas writes the values in C, with NaN (e.g. the mean score of a group without scores) as null.
+    if columnar:
+        columns = ",".join(f"{json.dumps(column)}:{page[column].to_json(orient='values', double_precision=15)}"
+                           for column in page.columns)
+        data = f'"columns":{{{columns}}}'
+    else:
+        data = f'"rows":{page.to_json(orient="records", double_precision=15)}'
+    return f"{json.dumps(header)[:-1]},{data}}}"
+
+
+def aggregate_view():
+    args = flask.request.args
+    try:
+        group_by, metrics, filters = parse_query(args)
+        offset = _int(args, "offset", 0)
+        limit = _int(args, "limit", DEFAULT_LIMIT)
+        if offset < 0 or not 0 < limit <= MAX_LIMIT:
+            raise QueryError(f"offset must be >= 0 and limit between 1 and {MAX_LIMIT}")
+        if args.get("format", "rows") not in ("rows", "columns"):
+            raise QueryError("format must be rows or columns")
+    except QueryError as exc:
+        return flask.jsonify({"error": str(exc)}), 400
+
+    result = cached_aggregate(group_by, metrics, filters)
+    body = page_json(result, group_by, metrics, offset, limit, args.get("format") == "columns")
+    return flask.Response(body, mimetype="application/json")
+
+
+def init_app(server):
+    server.add_url_rule("/api/aggregate", "aggregate", aggregate_view)
@@ -1,8 +1,37 @@
+import functools
+import os
+
 import dash
-from dash import dcc, html  
+from dash import dcc, html, Input, Output, State, MATCH, Patch, ClientsideFunction
+import api
+import figure_cache
+import http_cache
+import metrics
+import rebuild
 import visualization  
 
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
+metrics.init_app(app.server, app.callback_map, visualization.FIGURES)
+rebuild.init_app(app.server)
+http_cache.init_app(app.server)
+api.init_app(app.server)
+
+# With lazy graphs, each chart starts as a placeholder and its figure is fetched
+# once the section scrolls into view (see assets/lazy_graphs.js).
+LAZY_GRAPHS = os.environ.get("LAZY_GRAPHS", "1") == "1"
+
+GRAPH_HEIGHT = 450
+
+placeholder_figure = {
+    "data": [],
+    "layout": {
+        "template": "plotly_dark",
+        "height": GRAPH_HEIGHT,
+        "xaxis": {"visible": False},
+        "yaxis": {"visible": False},
+        "annotations": [{"text": "Loading chart...", "showarrow": False, "font": {"color": "gray", "size": 16}}],
+    },
+}
 
 chart_descriptions = {
     "plot_imdb_score_trend": ("Section 1: Content Quality Decline",
@@ -39,6 +68,11 @@ chart_descriptions = {
         "Do blockbuster shows (IMDb ≥ 8.0, ≥ 100k votes) cause short-term stock price fluctuations? "
         "The data suggests that major hits do not immediately trigger significant stock price changes."
     ),
+    "plot_release_event_study": ("",
+        "Does the stock move in the days after a release? For every title, this event study measures the stock's "
+        "abnormal return (against its average return over the preceding 120 trading days) and the change in "
+        "volatility over 1 to 30 trading days after the release, comparing hit shows with the whole catalogue."
+    ),
     "plot_hit_shows_vs_stock_long_term": ("",
         "How does the number of annual hit shows correlate with stock performance? "
         "The stock price follows a steady upward trend, seemingly independent of the number of hit shows."
@@ -82,53 +116,417 @@ project_background = html.Div([
         style={"textAlign": "center", "color": "white", "fontSize": "18px", "padding": "0px 80px"}
     ),
 ], style={"padding": "20px", "backgroundColor": "black"})
-\
-layout_elements = [project_background]
 
-previous_section = None
+conclusion = html.Div([
+    html.H2("Conclusion", style={"textAlign": "center", "color": "white", "marginTop": "60px"}),
+    html.P(
+        "Our findings reveal that while Netflix content quality has declined, stock price movements are more influenced by a combination of factors, "
+        "including content volume, global expansion, the number of users, and various other elements, rather than direct quality metrics.",
+        style={"textAlign": "center", "color": "white", "fontSize": "16px", "padding": "0px 60px"}
+    ),
+    html.P(
+        "However, content quality may still play an indirect role by affecting subscriber engagement, brand loyalty, "
+        "and user retention. As Netflix continues to scale, balancing quality with quantity may become crucial "
+        "for long-term sustainability.",
+        style={"textAlign": "center", "color": "white", "fontSize": "16px", "padding": "0px 60px"}
+    )
+])
+
+def graph_id(plot_func_name):
+    return {"type": "dashboard-graph", "name": plot_func_name}
 
-for plot_func_name in visualization.plot_functions_order:
-    plot_func = getattr(visualization, plot_func_name, None)
 
-    if callable(plot_func):
-        section_title, description = chart_descriptions.get(plot_func_name, ("", ""))
+def graph_component(plot_func_name, lazy):
+    # The store records whether the graph has been shown; filters only rebuild visible graphs.
+    if not lazy:
+        return html.Div([
+            dcc.Store(id={"type": "graph-visible", "name": plot_func_name}, data=True),
+            dcc.Graph(id=graph_id(plot_func_name),
+                      figure=figure_cache.load_figure(plot_func_name, rebuild.current_version()),
+                      style={"textAlign": "center"}),
+        ])
 
-        if section_title and section_title != previous_section:
-            layout_elements.append(html.H2(section_title, style={"textAlign": "center", "color": "white", "marginTop": "60px"}))
-            previous_section = section_title
+    return html.Div([
+        dcc.Store(id={"type": "graph-visible", "name": plot_func_name}, data=False),
+        dcc.Graph(
+            id=graph_id(plot_func_name),
+            figure=placeholder_figure,
+            style={"textAlign": "center", "minHeight": f"{GRAPH_HEIGHT}px"},
+        ),
+    ], className="lazy-section", **{"data-figure": plot_func_name})
+
+
+def filter_bar():
+    cube = visualization.get_dataset("cube")
+    years = cube.cells["year"]
+    first_year, last_year = int(years.min()), int(years.max())
+    label_style = {"color": "white", "fontSize": "14px", "marginBottom": "4px"}
+    dropdown_style = {"color": "black"}
+
+    return html.Div([
+        html.Div([
+            html.Div("Release year", style=label_style),
+            dcc.RangeSlider(
+                id="filter-years", min=first_year, max=last_year, step=1,
+                value=[first_year, last_year],
+                marks={year: {"label": str(year), "style": {"color": "white"}}
+                       for year in range(first_year, last_year + 1, 3)},
+            ),
+        ], style={"flex": "2", "minWidth": "300px"}),
+        html.Div([
+            html.Div("Type", style=label_style),
+            dcc.Checklist(
+                id="filter-types",
+                options=[{"label": " Movies", "value": "MOVIE"}, {"label": " TV Shows", "value": "SHOW"}],
+                value=[], inline=True, style={"color": "white"}, inputStyle={"marginLeft": "10px"},
+            ),
+        ], style={"flex": "1", "minWidth": "160px"}),
+        html.Div([
+            html.Div("Genre", style=label_style),
+            dcc.Dropdown(id="filter-genres", options=cube.genres.labels, multi=True,
+                         placeholder="All genres", style=dropdown_style),
+        ], style={"flex": "1", "minWidth": "200px"}),
+        html.Div([
+            html.Div("Country", style=label_style),
+            dcc.Dropdown(id="filter-countries", options=cube.countries.labels, multi=True,
+                         placeholder="All countries", style=dropdown_style),
+        ], style={"flex": "1", "minWidth": "200px"}),
+        dcc.Store(id="dashboard-filters", data={}),
+    ], style={"display": "flex", "flexWrap": "wrap", "gap": "30px", "padding": "20px 60px",
+              "position": "sticky", "top": "0", "zIndex": "10", "backgroundColor": "rgba(0,0,0,0.9)"})
 
-        layout_elements.append(
-            html.Div([
-                html.H3(plot_func_name.replace("_", " ").title(), style={"textAlign": "center", "color": "white"}),
-                html.P(description, style={"color": "white", "textAlign": "center", "marginBottom": "10px", "fontSize": "16px"}),
-                dcc.Graph(figure=plot_func(), style={"textAlign": "center"}),  
-            ],
-            style={"width": "100%", "marginBottom": "50px"})
-        )
 
-layout_elements.append(
-    html.Div([
-        html.H2("Conclusion", style={"textAlign": "center", "color": "white", "marginTop": "60px"}),
-        html.P(
-            "Our findings reveal that while Netflix content quality has declined, stock price movements are more influenced by a combination of factors, "
-            "including content volume, global expansion, the number of users, and various other elements, rather than direct quality metrics.",
-            style={"textAlign": "center", "color": "white", "fontSize": "16px", "padding": "0px 60px"}
+def country_frames_payload(year, filters=visualization.NO_FILTERS):
+    """Frames for ``year`` and its neighbouring years, keyed by year."""
+    years = visualization.get_dataset("country_frames", visualization.NO_FILTERS).years
+    position = years.index(year)
+    nearby = years[max(position - 1, 0):position + 2]
+    country_frames = visualization.get_dataset("country_frames", filters)
+    return {str(y): visualization.country_frame(y, country_frames) for y in nearby}
+
+
+def country_year_controls():
+    country_frames = visualization.get_dataset("country_frames", visualization.NO_FILTERS)
+    first_year = country_frames.years[0]
+    return html.Div([
+        dcc.Slider(
+            id="country-year-slider",
+            min=first_year, max=country_frames.years[-1], step=None, value=first_year,
+            marks={year: {"label": str(year), "style": {"color": "white"}} for year in country_frames.years},
         ),
-        html.P(
-            "However, content quality may still play an indirect role by affecting subscriber engagement, brand loyalty, "
-            "and user retention. As Netflix continues to scale, balancing quality with quantity may become crucial "
-            "for long-term sustainability.",
-            style={"textAlign": "center", "color": "white", "fontSize": "16px", "padding": "0px 60px"}
-        )
-    ])
+        dcc.Store(id="country-frames", data={
+            "countries": country_frames.countries,
+            "frames": country_frames_payload(first_year),
+        }),
+    ], style={"padding": "0px 60px"})
+
+
+def figures_taking(option):
+    """Figures with a dataset that takes ``option`` (see visualization.DATASET_OPTIONS)."""
+    return [
+        name for name in visualization.plot_functions_order
+        if any(option in visualization.dataset_options(dataset) for dataset in visualization.FIGURES[name].inputs)
+    ]
+
+
+# Figures whose datasets depend on the hit definition, and so on the hit sliders.
+HIT_FIGURES = figures_taking("hit_threshold")
+# Figures whose datasets compare eras, and so depend on the era slider.
+ERA_FIGURES = figures_taking("eras")
+
+
+def format_votes(votes):
+    if votes >= 1_000_000:
+        return f"{votes / 1_000_000:g}M"
+    return f"{votes / 1000:g}k" if votes else "0"
+
+
+def hit_threshold_controls():
+    score_steps, vote_steps = visualization.HIT_SCORE_STEPS, visualization.HIT_VOTE_STEPS
+    label_style = {"color": "white", "fontSize": "14px", "marginBottom": "4px"}
+    return html.Div([
+        html.Div("Hit definition: minimum IMDb score", style=label_style),
+        dcc.Slider(
+            id="hit-score-slider",
+            min=score_steps[0], max=score_steps[-1], step=0.1, value=visualization.DEFAULT_HIT.score,
+            marks={score: {"label": str(score), "style": {"color": "white"}} for score in range(5, 10)},
+        ),
+        html.Div("Hit definition: minimum IMDb votes", style=label_style),
+        dcc.Slider(
+            id="hit-votes-slider",
+            min=0, max=len(vote_steps) - 1, step=1,
+            value=int(vote_steps.tolist().index(visualization.DEFAULT_HIT.votes)),
+            marks={i: {"label": format_votes(votes), "style": {"color": "white"}} for i, votes in enumerate(vote_steps)},
+        ),
+    ], style={"padding": "0px 60px"})
+
+
+def era_controls():
+    years = visualization.get_dataset("cube").cells["year"]
+    first_year, last_year = int(years.min()), int(years.max())
+    (_, early_end), (recent_start, _) = visualization.DEFAULT_ERAS
+    return html.Div([
+        html.Div("Early era released before / recent era released after",
+                 style={"color": "white", "fontSize": "14px", "marginBottom": "4px"}),
+        dcc.RangeSlider(
+            id="era-split-slider", min=first_year + 1, max=last_year, step=1,
+            value=[int(early_end), int(recent_start)],
+            marks={year: {"label": str(year), "style": {"color": "white"}}
+                   for year in range(first_year + 1, last_year + 1, 3)},
+        ),
+    ], style={"padding": "0px 60px"})
+
+
+def series_controls(plot_func_name):
+    label_style = {"color": "white", "fontSize": "14px", "marginBottom": "4px"}
+    return html.Div([
+        html.Div("Smoothing window (years)", style=label_style),
+        dcc.Slider(
+            id={"type": "series-window", "name": plot_func_name},
+            min=1, max=visualization.MAX_SMOOTHING_WINDOW, step=1,
+            value=visualization.SMOOTHING_WINDOWS[plot_func_name],
+            marks={window: {"label": str(window), "style": {"color": "white"}}
+                   for window in range(1, visualization.MAX_SMOOTHING_WINDOW + 1)},
+        ),
+        dcc.Checklist(
+            id={"type": "series-scale", "name": plot_func_name},
+            options=[{"label": " Log scale", "value": "log"}, {"label": " % of peak", "value": "normalize"}],
+            value=[], inline=True, style={"color": "white"}, inputStyle={"marginLeft": "10px"},
+        ),
+    ], style={"padding": "0px 60px"})
+
+
+# Extra controls rendered under a section's graph.
+section_controls = {
+    "plot_quality_vs_stock_volatility": era_controls,
+    "plot_impact_of_hit_shows_on_stock": hit_threshold_controls,
+    "plot_country_production_growth": country_year_controls,
+    **{name: functools.partial(series_controls, name) for name in visualization.SMOOTHING_WINDOWS},
+}
+
+
+def build_layout(lazy=LAZY_GRAPHS):
+    layout_elements = [project_background, filter_bar()]
+
+    previous_section = None
+
+    for plot_func_name in visualization.plot_functions_order:
+        plot_func = getattr(visualization, plot_func_name, None)
+
+        if callable(plot_func):
+            section_title, description = chart_descriptions.get(plot_func_name, ("", ""))
+
+            if section_title and section_title != previous_section:
+                layout_elements.append(html.H2(section_title, style={"textAlign": "center", "color": "white", "marginTop": "60px"}))
+                previous_section = section_title
+
+            layout_elements.append(
+                html.Div([
+                    html.H3(plot_func_name.replace("_", " ").title(), style={"textAlign": "center", "color": "white"}),
+                    html.P(description, style={"color": "white", "textAlign": "center", "marginBottom": "10px", "fontSize": "16px"}),
+                    graph_component(plot_func_name, lazy),
+                    *([section_controls[plot_func_name]()] if plot_func_name in section_controls else []),
+                ],
+                style={"width": "100%", "marginBottom": "50px"})
+            )
+
+    layout_elements.append(conclusion)
+
+    return html.Div(
+        layout_elements,
+        style={"backgroundColor": "black", "padding": "20px"},
+    )
+
+
+app.layout = build_layout()
+
+
+@app.callback(
+    Output("dashboard-filters", "data"),
+    Input("filter-years", "value"),
+    Input("filter-types", "value"),
+    Input("filter-genres", "value"),
+    Input("filter-countries", "value"),
+    State("filter-years", "min"),
+    State("filter-years", "max"),
+    prevent_initial_call=True,
+)
+def update_filters(year_range, types, genres, countries, first_year, last_year):
+    if year_range == [first_year, last_year]:
+        year_range = None
+    return {"year_range": year_range, "types": types, "genres": genres, "countries": countries}
+
+
+def figure_options(plot_func_name, country_year=None, hit_score=None, hit_votes=None, era_split=None):
+    """Keyword arguments for figures that depend on their own section controls."""
+    options = {}
+    if plot_func_name == "plot_country_production_growth":
+        first_year = visualization.get_dataset("country_frames", visualization.NO_FILTERS).years[0]
+        if country_year not in (None, first_year):
+            options["year"] = country_year
+    if plot_func_name in HIT_FIGURES and hit_score is not None and hit_votes is not None:
+        hit_threshold = visualization.make_hit_threshold(hit_score, visualization.HIT_VOTE_STEPS[hit_votes])
+        if hit_threshold != visualization.DEFAULT_HIT:
+            options["hit_threshold"] = hit_threshold
+    if plot_func_name in ERA_FIGURES and era_split is not None:
+        eras = visualization.make_eras(*era_split)
+        if eras != visualization.DEFAULT_ERAS:
+            options["eras"] = eras
+    return options
+
+
+def dashboard_figure(plot_func_name, filters, options):
+    filters = visualization.make_filters(**(filters or {}))
+    if filters == visualization.NO_FILTERS and not options:
+        return figure_cache.load_figure(plot_func_name, rebuild.current_version())
+    return visualization.FIGURES[plot_func_name].build(filters=filters, **options)
+
+
+@app.callback(
+    Output({"type": "dashboard-graph", "name": MATCH}, "figure"),
+    Input({"type": "graph-visible", "name": MATCH}, "data"),
+    Input("dashboard-filters", "data"),
+    State("country-year-slider", "value"),
+    State("hit-score-slider", "value"),
+    State("hit-votes-slider", "value"),
+    State("era-split-slider", "value"),
+    prevent_initial_call=True,
 )
+def render_graph(visible, filters, country_year, hit_score, hit_votes, era_split):
+    if not visible:
+        return dash.no_update
 
-app.layout = html.Div(
-    layout_elements,
-    style={"backgroundColor": "black", "padding": "20px"},
+    plot_func_name = dash.ctx.outputs_list["id"]["name"]
+    options = figure_options(plot_func_name, country_year, hit_score, hit_votes, era_split)
+    return dashboard_figure(plot_func_name, filters, options)
+
+
+@app.callback(
+    *[Output(graph_id(name), "figure", allow_duplicate=True) for name in HIT_FIGURES],
+    Input("hit-score-slider", "value"),
+    Input("hit-votes-slider", "value"),
+    State("dashboard-filters", "data"),
+    *[State({"type": "graph-visible", "name": name}, "data") for name in HIT_FIGURES],
+    prevent_initial_call=True,
 )
+def rerender_hit_graphs(hit_score, hit_votes, filters, *visible):
+    # Sections that haven't been shown yet pick the sliders up when they load.
+    return [
+        dashboard_figure(name, filters, figure_options(name, hit_score=hit_score, hit_votes=hit_votes))
+        if name_visible else dash.no_update
+        for name, name_visible in zip(HIT_FIGURES, visible)
+    ]
+
+
+@app.callback(
+    *[Output(graph_id(name), "figure", allow_duplicate=True) for name in ERA_FIGURES],
+    Input("era-split-slider", "value"),
+    State("dashboard-filters", "data"),
+    *[State({"type": "graph-visible", "name": name}, "data") for name in ERA_FIGURES],
+    prevent_initial_call=True,
+)
+def rerender_era_graphs(era_split, filters, *visible):
+    return [
+        dashboard_figure(name, filters, figure_options(name, era_split=era_split))
+        if name_visible else dash.no_update
+        for name, name_visible in zip(ERA_FIGURES, visible)
+    ]
+
+
+@app.callback(
+    Output("country-frames", "data"),
+    Input("country-year-slider", "value"),
+    Input("dashboard-filters", "data"),
+    prevent_initial_call=True,
+)
+def prefetch_country_frames(year, filters):
+    filters = visualization.make_filters(**(filters or {}))
+    if dash.ctx.triggered_id == "dashboard-filters":
+        # Frames prefetched under the old filters are stale, so replace them all.
+        countries = visualization.get_dataset("country_frames", filters).countries
+        return {"countries": countries, "frames": country_frames_payload(year, filters)}
+
+    frames = Patch()
+    for key, frame in country_frames_payload(year, filters).items():
+        frames["frames"][key] = frame
+    return frames
+
+
+def relayout_x_range(relayout):
+    """The x range zoomed to, "reset" on autoscale, or None when the x axis didn't change."""
+    if relayout.get("xaxis.autorange"):
+        return "reset"
+    if "xaxis.range[0]" in relayout and "xaxis.range[1]" in relayout:
+        return [relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]]
+    return relayout.get("xaxis.range")
+
+
+def register_zoom_callback(plot_func_name):
+    spec = visualization.ZOOMABLE[plot_func_name]
+
+    @app.callback(
+        Output(graph_id(plot_func_name), "figure", allow_duplicate=True),
+        Input(graph_id(plot_func_name), "relayoutData"),
+        State("dashboard-filters", "data"),
+        State("country-year-slider", "value"),
+        State("hit-score-slider", "value"),
+        State("hit-votes-slider", "value"),
+        State("era-split-slider", "value"),
+        prevent_initial_call=True,
+    )
+    def zoom(relayout, filters, *controls):
+        x_range = relayout_x_range(relayout or {})
+        if x_range is None:
+            return dash.no_update
+        if x_range == "reset":
+            return dashboard_figure(plot_func_name, filters, figure_options(plot_func_name, *controls))
+
+        level, rows = visualization.zoom_traces(
+            plot_func_name, visualization.make_filters(**(filters or {})), x_range
+        )
+        figure = Patch()
+        dates = rows["date"].dt.strftime("%Y-%m-%d")
+        for trace, column in spec.traces:
+            figure["data"][trace]["x"] = dates
+            figure["data"][trace]["y"] = rows[column]
+        # Keep the view the user zoomed to, rather than autoranging over the new data.
+        figure["layout"]["xaxis"]["range"] = x_range
+        figure["layout"]["xaxis"]["hoverformat"] = visualization.LEVEL_HOVER_FORMATS[level]
+        if "yaxis.range[0]" in relayout:
+            figure["layout"]["yaxis"]["range"] = [relayout["yaxis.range[0]"], relayout["yaxis.range[1]"]]
+        return figure
+
+
+# Zooming into a time series redraws it from the finest pyramid level that fits
+# the visible range; autoscale goes back to the overview figure.
+for name in visualization.ZOOMABLE:
+    register_zoom_callback(name)
+
+
+# Swaps the selected year's frame into the map in the browser, without a round trip
+# when the frame has already been prefetched.
+app.clientside_callback(
+    ClientsideFunction(namespace="netflix", function_name="renderCountryFrame"),
+    Output(graph_id("plot_country_production_growth"), "figure", allow_duplicate=True),
+    Input("country-year-slider", "value"),
+    Input("country-frames", "data"),
+    State(graph_id("plot_country_production_growth"), "figure"),
+    prevent_initial_call=True,
+)
+
+
+# Re-smooths and rescales the yearly series in the browser from the raw values the
+# figure carries, also when the server redraws the figure for new filters.
+for name in visualization.SMOOTHING_WINDOWS:
+    app.clientside_callback(
+        ClientsideFunction(namespace="netflix", function_name="applySeriesControls"),
+        Output(graph_id(name), "figure", allow_duplicate=True),
+        Input(graph_id(name), "figure"),
+        Input({"type": "series-window", "name": name}, "value"),
+        Input({"type": "series-scale", "name": name}, "value"),
+        prevent_initial_call=True,
+    )
 
-import os
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8050))
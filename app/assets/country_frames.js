@@ -0,0 +1,16 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    netflix: Object.assign({}, (window.dash_clientside || {}).netflix, {
+        // Replace the production map's single trace with a prefetched year frame.
+        renderCountryFrame: function (year, store, figure) {
+            var frame = store && store.frames[String(year)];
+            if (!frame || !figure || !figure.data || !figure.data.length) {
+                return window.dash_clientside.no_update;
+            }
+            var trace = Object.assign({}, figure.data[0], {
+                locations: frame.codes.map(function (code) { return store.countries[code]; }),
+                z: frame.z
+            });
+            return Object.assign({}, figure, {data: [trace].concat(figure.data.slice(1))});
+        }
+    })
+});
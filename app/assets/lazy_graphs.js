@@ -0,0 +1,38 @@
+// Marks a lazy dashboard section as visible the first time it nears the viewport.
+// The server-side callback in app.py then replaces its placeholder with the real figure.
+(function () {
+    var MARGIN = "300px 0px";
+    var observed = new WeakSet();
+
+    function markVisible(section) {
+        if (!window.dash_clientside || !window.dash_clientside.set_props) {
+            return false;
+        }
+        window.dash_clientside.set_props(
+            {type: "graph-visible", name: section.dataset.figure},
+            {data: true}
+        );
+        return true;
+    }
+
+    var intersection = new IntersectionObserver(function (entries) {
+        entries.forEach(function (entry) {
+            if (entry.isIntersecting && markVisible(entry.target)) {
+                intersection.unobserve(entry.target);
+            }
+        });
+    }, {rootMargin: MARGIN});
+
+    // Dash renders the layout after assets load, so watch for sections as they appear.
+    function observeSections() {
+        document.querySelectorAll(".lazy-section").forEach(function (section) {
+            if (!observed.has(section)) {
+                observed.add(section);
+                intersection.observe(section);
+            }
+        });
+    }
+
+    new MutationObserver(observeSections).observe(document.documentElement, {childList: true, subtree: true});
+    observeSections();
+})();
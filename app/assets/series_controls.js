@@ -0,0 +1,96 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    netflix: Object.assign({}, (window.dash_clientside || {}).netflix, {
+        // Redraw a figure's yearly series from the unsmoothed values its traces keep in
+        // ``meta`` (see visualization.series_meta): a trailing mean over ``smoothing``
+        // values, as pandas' rolling(smoothing, min_periods=1), then optionally as a
+        // percentage of each series' peak and on log y axes.
+        applySeriesControls: function (figure, smoothing, options) {
+            if (!figure || !figure.data || !figure.data.some(function (trace) { return trace.meta && trace.meta.raw; })) {
+                return window.dash_clientside.no_update;
+            }
+            var normalize = (options || []).indexOf("normalize") >= 0;
+            var log = (options || []).indexOf("log") >= 0;
+            var layout = figure.layout || {};
+            // The figure as the server drew it, recorded the first time it is redrawn here.
+            var base = (layout.meta || {}).seriesBase;
+            if (!base) {
+                var unchanged = !normalize && !log && figure.data.every(function (trace) {
+                    return !trace.meta || !trace.meta.raw || trace.meta.window === 1 || trace.meta.window === smoothing;
+                });
+                if (unchanged) {
+                    return window.dash_clientside.no_update;
+                }
+                base = {titles: {}, annotations: (layout.annotations || []).map(function (note) { return note.y; })};
+                Object.keys(layout).forEach(function (key) {
+                    if (/^yaxis\d*$/.test(key)) {
+                        var title = layout[key].title;
+                        base.titles[key] = title && typeof title === "object" ? title.text : title;
+                    }
+                });
+            }
+
+            function rollingMean(values, size) {
+                return values.map(function (_, i) {
+                    var sum = 0, count = 0;
+                    for (var j = Math.max(0, i - size + 1); j <= i; j++) {
+                        if (values[j] !== null) {
+                            sum += values[j];
+                            count++;
+                        }
+                    }
+                    return count ? sum / count : null;
+                });
+            }
+
+            // Peak of the first normalized series on each y axis, for its annotations.
+            var peaks = {};
+            var data = figure.data.map(function (trace) {
+                var meta = trace.meta;
+                if (!meta || !meta.raw) {
+                    return trace;
+                }
+                var y = meta.window > 1 ? rollingMean(meta.raw, smoothing) : meta.raw.slice();
+                var axis = "yaxis" + (trace.yaxis || "y").slice(1);
+                if (normalize) {
+                    var peak = Math.max.apply(null, y.filter(function (v) { return v !== null; }));
+                    if (peak > 0) {
+                        y = y.map(function (v) { return v === null ? null : v / peak * 100; });
+                        peaks[axis] = peaks[axis] || peak;
+                    }
+                }
+                var updated = Object.assign({}, trace, {y: y});
+                if (meta.name) {
+                    updated.name = smoothing > 1 ? meta.name + " (" + smoothing + "-year average)" : meta.name;
+                }
+                return updated;
+            });
+
+            var newLayout = Object.assign({}, layout, {meta: Object.assign({}, layout.meta, {seriesBase: base})});
+            Object.keys(base.titles).forEach(function (key) {
+                var title = base.titles[key];
+                newLayout[key] = Object.assign({}, layout[key], {
+                    type: log ? "log" : "linear",
+                    autorange: true,
+                    title: Object.assign({}, layout[key].title, {
+                        text: title && normalize ? title + " (% of peak)" : title
+                    })
+                });
+            });
+            if (layout.annotations) {
+                newLayout.annotations = layout.annotations.map(function (note, i) {
+                    var y = base.annotations[i];
+                    var axis = "yaxis" + (note.yref || "y").slice(1);
+                    if (typeof y !== "number" || !(axis in base.titles)) {
+                        return note;
+                    }
+                    if (peaks[axis]) {
+                        y = y / peaks[axis] * 100;
+                    }
+                    // Annotations on a log axis are placed by the exponent.
+                    return Object.assign({}, note, {y: log ? Math.log10(y) : y});
+                });
+            }
+            return Object.assign({}, figure, {data: data, layout: newLayout});
+        }
+    })
+});
@@ -0,0 +1,245 @@
+import functools
+import hashlib
+import json
+import os
+import shutil
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.environ.get("NETFLIX_DATA_PATH", os.path.join(BASE_DIR, "../data/netflix_final_merged.csv"))
+STOCKS_PATH = os.environ.get("NETFLIX_STOCKS_PATH", os.path.join(BASE_DIR, "../data/cleaned_Netflix_stocks.csv"))
+CACHE_DIR = os.environ.get("NETFLIX_CACHE_DIR", os.path.join(BASE_DIR, "../data/cache"))
+
+# Every data file the dashboard reads; figure caches are keyed on their fingerprints.
+DATA_SOURCES = [DATA_PATH, STOCKS_PATH]
+
+CATEGORICAL_COLUMNS = ["type", "genres", "country", "director"]
+DATE_COLUMNS = ["release_date", "date"]
+
+# Stock columns the merged table repeats on every title released on the same
+# trading day. The cache stores them once per trading day, in a separate table.
+PRICE_COLUMNS = ["date", "open", "high", "low", "close", "adj_close", "volume",
+                 "daily_return", "volatility", "MA30", "year_month_y"]
+# Titles column holding the row of the title's trading day in the prices table (-1: none).
+PRICE_KEY = "price_row"
+
+# Bump when the on-disk layout changes so old caches are rebuilt.
+CACHE_FORMAT = 2
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stat(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+@functools.lru_cache(maxsize=16)
+def _file_hash_at(path, size, mtime_ns):
+    return file_hash(path)
+
+
+def fingerprint(path=DATA_PATH):
+    """Return the sha256 of ``path``, reusing the cached manifest while size and mtime match."""
+    manifest = _read_manifest(path)
+    stat = _stat(path)
+    if manifest and manifest["size"] == stat["size"] and manifest["mtime_ns"] == stat["mtime_ns"]:
+        return manifest["sha256"]
+    # The file changed but its cache isn't rebuilt yet; hash it once per change, not per call.
+    return _file_hash_at(path, stat["size"], stat["mtime_ns"])
+
+
+def _manifest_path(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, name + ".json")
+
+
+def _read_manifest(path):
+    try:
+        with open(_manifest_path(path)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != CACHE_FORMAT or not os.path.isdir(manifest.get("columns_dir", "")):
+        return None
+    return manifest
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _write_columns(df, columns_dir):
+    os.makedirs(columns_dir, exist_ok=True)
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        if name in DATE_COLUMNS:
+            kind = "datetime"
+            values = pd.to_datetime(series).to_numpy(dtype="datetime64[ns]").view(np.int64)
+            np.save(os.path.join(columns_dir, name + ".npy"), values)
+        elif series.dtype == object or name in CATEGORICAL_COLUMNS:
+            kind = "category" if name in CATEGORICAL_COLUMNS else "string"
+            codes, categories = pd.factorize(series, sort=True)
+            np.save(os.path.join(columns_dir, name + ".npy"), codes.astype(np.int32))
+            np.save(os.path.join(columns_dir, name + ".categories.npy"), np.asarray(categories, dtype=str))
+        else:
+            kind = "numeric"
+            np.save(os.path.join(columns_dir, name + ".npy"), series.to_numpy())
+        columns.append({"name": name, "kind": kind})
+    return columns
+
+
+def normalize(df):
+    """Split a table into its tables to cache: {"titles", "prices"} for the merged table.
+
+    Stock columns are kept once per trading day, keyed by ``date``, and each title
+    gets the row of its trading day in PRICE_KEY. Tables without the stock columns
+    are cached as a single table, "table".
+    """
+    if not set(PRICE_COLUMNS) <= set(df.columns):
+        return {"table": df}
+    dates = pd.to_datetime(df["date"])
+    prices = df.loc[dates.notna(), PRICE_COLUMNS].assign(date=dates[dates.notna()])
+    prices = prices.drop_duplicates("date").sort_values("date", kind="stable").reset_index(drop=True)
+    price_row = np.searchsorted(prices["date"].to_numpy(), dates.to_numpy())
+    titles = df.drop(columns=PRICE_COLUMNS).assign(
+        **{PRICE_KEY: np.where(dates.notna(), price_row, -1).astype(np.int32)}
+    )
+    return {"titles": titles, "prices": prices}
+
+
+def build_cache(path=DATA_PATH):
+    """Parse the CSV once and write one ``.npy`` file per column of each normalized table under CACHE_DIR."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    stat = _stat(path)
+    sha = file_hash(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    columns_dir = os.path.join(CACHE_DIR, f"{name}-{sha[:16]}")
+
+    df = pd.read_csv(path)
+    tmp_dir = f"{columns_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tables = {
+        name: {"rows": len(table), "columns": _write_columns(table, os.path.join(tmp_dir, name))}
+        for name, table in normalize(df).items()
+    }
+    shutil.rmtree(columns_dir, ignore_errors=True)
+    os.rename(tmp_dir, columns_dir)
+
+    old = _read_manifest(path)
+    manifest = dict(stat, sha256=sha, format=CACHE_FORMAT, rows=len(df),
+                    tables=tables, columns_dir=columns_dir)
+    _write_json_atomic(_manifest_path(path), manifest)
+    if old and old["columns_dir"] != columns_dir:
+        shutil.rmtree(old["columns_dir"], ignore_errors=True)
+    return manifest
+
+
+def ensure_cache(path=DATA_PATH):
+    """Return a manifest that matches the current CSV, rebuilding the cache if needed."""
+    manifest = _read_manifest(path)
+    stat = _stat(path)
+    if manifest and manifest["size"] == stat["size"] and manifest["mtime_ns"] == stat["mtime_ns"]:
+        return manifest
+    if manifest and manifest["size"] == stat["size"] and manifest["sha256"] == file_hash(path):
+        # Touched but unchanged: refresh the recorded mtime instead of rebuilding.
+        manifest.update(stat)
+        _write_json_atomic(_manifest_path(path), manifest)
+        return manifest
+    return build_cache(path)
+
+
+def _load_column(columns_dir, column):
+    name, kind = column["name"], column["kind"]
+    values = np.load(os.path.join(columns_dir, name + ".npy"), mmap_mode="r")
+    if kind == "datetime":
+        return pd.Series(values.view("datetime64[ns]"), name=name)
+    if kind in ("category", "string"):
+        categories = np.load(os.path.join(columns_dir, name + ".categories.npy"))
+        values = pd.Categorical.from_codes(values, categories=pd.Index(categories, dtype=object))
+        if kind == "string":
+            values = np.asarray(values, dtype=object)
+        return pd.Series(values, name=name)
+    return pd.Series(values, name=name)
+
+
+def _load_tables(path):
+    manifest = ensure_cache(path)
+    tables = {}
+    for name, table in manifest["tables"].items():
+        columns_dir = os.path.join(manifest["columns_dir"], name)
+        columns = {column["name"]: _load_column(columns_dir, column) for column in table["columns"]}
+        tables[name] = pd.DataFrame(columns, copy=False)
+    return tables
+
+
+def _load_table(path):
+    return _load_tables(path)["table"]
+
+
+# The merged table, normalized: one row per title and one per trading day.
+Catalog = namedtuple("Catalog", ["titles", "prices"])
+
+
+def load_catalog(path=DATA_PATH):
+    """Load netflix_final_merged.csv from its column cache as a Catalog.
+
+    ``titles`` has the title columns plus PRICE_KEY, the row of the title's trading
+    day in ``prices``; ``prices`` has PRICE_COLUMNS, one row per trading day. Join
+    the stock columns a view needs with join_prices().
+    """
+    tables = _load_tables(path)
+    return Catalog(tables["titles"], tables["prices"])
+
+
+def gather_prices(catalog, column):
+    """``column`` of the prices table for every title (NaN/NaT for titles without a trading day)."""
+    price_row = catalog.titles[PRICE_KEY].to_numpy()
+    values = catalog.prices[column]
+    if not len(values):
+        return pd.Series(np.full(len(price_row), np.nan), name=column)
+    # Titles released on the same trading day share its row; only the requested column is copied.
+    gathered = values.take(np.maximum(price_row, 0)).reset_index(drop=True)
+    return gathered.where(pd.Series(price_row >= 0)) if (price_row < 0).any() else gathered
+
+
+def join_prices(catalog, columns=PRICE_COLUMNS):
+    """The titles with the given stock columns joined on, gathered only for those columns."""
+    # Built from the column Series without copying, so memory-mapped title columns stay mapped.
+    joined = {name: series for name, series in catalog.titles.items() if name != PRICE_KEY}
+    joined.update((column, gather_prices(catalog, column)) for column in columns)
+    return pd.DataFrame(joined, copy=False)
+
+
+def load_merged(path=DATA_PATH, price_columns=PRICE_COLUMNS):
+    """Load netflix_final_merged.csv from its typed column cache, joined back into one table.
+
+    ``type``, ``genres``, ``country`` and ``director`` come back as categoricals and
+    ``release_date``/``date`` as datetimes. Numeric title columns are memory-mapped.
+    Pass ``price_columns`` to join only the stock columns needed.
+    """
+    return join_prices(load_catalog(path), price_columns)
+
+
+def load_stocks(path=STOCKS_PATH):
+    """Load the daily price table (cleaned_Netflix_stocks.csv) from its column cache."""
+    return _load_table(path)
+
+
+if __name__ == "__main__":
+    for path in DATA_SOURCES:
+        manifest = build_cache(path)
+        print(f"Cached {manifest['rows']} rows from {path} into {manifest['columns_dir']}")
@@ -0,0 +1,47 @@
+"""Shape-preserving downsampling for long line traces."""
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """Return the indices of ``threshold`` points chosen by Largest-Triangle-Three-Buckets.
+
+    ``x`` must be sorted and numeric (datetimes can be passed as int64). The first and
+    last points are always kept; every bucket in between contributes the point that
+    forms the largest triangle with the previously kept point and the next bucket's
+    average, which keeps peaks and troughs that plain striding would drop.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket edges for the n - 2 interior points, split into threshold - 2 buckets.
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_start, next_stop = stop, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[next_start:next_stop].mean()
+        next_y = y[next_start:next_stop].mean()
+
+        # Twice the triangle area; the constant factor doesn't change the argmax.
+        area = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        indices[bucket + 1] = previous
+    return indices
+
+
+def downsample(frame, x_column, y_column, threshold):
+    """Rows of ``frame`` (sorted by ``x_column``) kept by LTTB, in order."""
+    if len(frame) <= threshold:
+        return frame
+    x = frame[x_column].to_numpy()
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").astype(np.int64)
+    return frame.iloc[lttb(x, frame[y_column].to_numpy(), threshold)]
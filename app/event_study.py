@@ -0,0 +1,81 @@
+"""Event-study returns of the stock around title releases.
+
+Every event is mapped to its event day, the first trading day on or after the
+release date, with a binary search over the sorted trading days. All windows of all
+events are then read off cumulative sums of daily log returns (and of their
+squares), so the cost is O(events x windows) array lookups with no Python loops.
+
+For a window of N trading days around event day t:
+
+* ``returns``: simple return over the N trading days starting on the event day,
+  from the close at t - 1 to the close at t + N - 1.
+* ``abnormal``: that return minus the return expected from the mean daily log
+  return over the ``estimation`` trading days before the pre-event window. With
+  only Netflix prices available there is no market index, so this is the
+  constant-mean-return model.
+* ``pre_volatility``/``post_volatility``: standard deviation of the daily log
+  returns over the N days before t and the N days from t on (NaN for N < 2), and
+  ``volatility_change`` their ratio minus one.
+
+Events whose windows would run past either end of the price series are NaN.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+EventStudy = namedtuple("EventStudy", ["windows", "returns", "abnormal", "pre_volatility",
+                                       "post_volatility", "volatility_change"])
+
+# Trading days before the pre-event window used to estimate the normal return.
+ESTIMATION_DAYS = 120
+
+
+def event_days(trading_days, event_dates):
+    """Index of the first trading day on or after each event date."""
+    return np.searchsorted(trading_days, event_dates, side="left")
+
+
+def event_study(trading_days, closes, event_dates, windows, estimation=ESTIMATION_DAYS):
+    """Compute every window of every event; each result is an events x windows array.
+
+    ``trading_days`` must be sorted and the same type as ``event_dates`` (e.g. both
+    datetime64[ns]); ``closes`` are the matching closing prices.
+    """
+    closes = np.asarray(closes, dtype=float)
+    windows = np.asarray(windows, dtype=np.int64)
+    log_returns = np.diff(np.log(closes))
+    # cumulative[i] is the sum of the first i daily log returns (return j ends on day j + 1).
+    cumulative = np.concatenate([[0.0], np.cumsum(log_returns)])
+    cumulative_sq = np.concatenate([[0.0], np.cumsum(log_returns ** 2)])
+
+    day = event_days(trading_days, event_dates)[:, None]
+    start = day - 1
+    end = start + windows[None, :]
+    pre = start - windows[None, :]
+    estimate = pre - estimation
+    valid = (estimate >= 0) & (end < len(closes))
+    start, end, pre, estimate = (np.where(valid, index, 0) for index in (start, end, pre, estimate))
+
+    def log_return(a, b):
+        return cumulative[b] - cumulative[a]
+
+    def volatility(a, b):
+        n = b - a
+        mean = log_return(a, b) / np.maximum(n, 1)
+        variance = (cumulative_sq[b] - cumulative_sq[a] - n * mean ** 2) / np.maximum(n - 1, 1)
+        return np.where(n >= 2, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+    post_log = log_return(start, end)
+    expected_log = log_return(estimate, pre) / estimation * windows[None, :]
+    returns = np.expm1(post_log)
+    abnormal = returns - np.expm1(expected_log)
+    pre_volatility = volatility(pre, start)
+    post_volatility = volatility(start, end)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volatility_change = post_volatility / pre_volatility - 1
+
+    def masked(values):
+        return np.where(valid, values, np.nan)
+
+    return EventStudy(windows, masked(returns), masked(abnormal), masked(pre_volatility),
+                      masked(post_volatility), masked(volatility_change))
@@ -0,0 +1,149 @@
+import argparse
+import functools
+import glob
+import hashlib
+import json
+import os
+
+import plotly.io as pio
+
+import data_store
+import visualization
+
+FIGURE_CACHE_DIR = os.path.join(data_store.CACHE_DIR, "figures")
+
+
+def data_version():
+    """Fingerprint of every data file the figures are built from."""
+    digest = hashlib.sha256()
+    for path in data_store.DATA_SOURCES:
+        digest.update(data_store.fingerprint(path).encode())
+    return digest.hexdigest()
+
+
+@functools.cache
+def code_version():
+    # Figures also change when the plotting code does, not only when the data does.
+    with open(visualization.__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def figure_key(name, version=None):
+    version = version or data_version()
+    return hashlib.sha256(f"{name}:{version}:{code_version()}".encode()).hexdigest()[:16]
+
+
+def figure_path(name, version=None):
+    return os.path.join(FIGURE_CACHE_DIR, f"{name}-{figure_key(name, version)}.json")
+
+
+class StaleDataError(RuntimeError):
+    """The data files weren't the requested version for the whole of a figure build."""
+
+
+def build_payload(name, version):
+    """``name`` built and serialized, and whether the data files were ``version`` throughout."""
+    before = data_version()
+    payload = pio.to_json(visualization.FIGURES[name].build(), validate=False)
+    return payload, before == version == data_version()
+
+
+def _store(path, payload):
+    os.makedirs(FIGURE_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def write_figure(name, version=None):
+    """Build ``name`` and store its serialized JSON for data ``version`` (default: the files' current one).
+
+    Raises StaleDataError, storing nothing, if the data files changed from that
+    version during the build. Other versions of the figure are left in place;
+    rebuild retires them once no request can still be reading them.
+    """
+    version = version or data_version()
+    payload, current = build_payload(name, version)
+    if not current:
+        raise StaleDataError(f"data files are no longer version {version[:12]}; {name} not stored")
+    path = figure_path(name, version)
+    _store(path, payload)
+    return path
+
+
+def is_complete(version, names=None):
+    """Whether every figure in ``names`` (default: all) is cached for data ``version``."""
+    return all(os.path.exists(figure_path(name, version)) for name in names or visualization.plot_functions_order)
+
+
+def retire(keep_versions):
+    """Delete every cached figure that doesn't belong to one of ``keep_versions``."""
+    keep = {figure_path(name, version) for version in keep_versions for name in visualization.plot_functions_order}
+    for path in glob.glob(os.path.join(FIGURE_CACHE_DIR, "*.json")):
+        if path not in keep:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def load_figure_json(name, version=None):
+    """Return the serialized figure for ``name``, building it on a miss.
+
+    The built figure is only cached when it was built from data ``version``; after
+    the files change it is served but not stored under the old version's key.
+    """
+    version = version or data_version()
+    path = figure_path(name, version)
+    try:
+        with open(path) as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    payload, current = build_payload(name, version)
+    if current:
+        _store(path, payload)
+    return payload
+
+
+def load_figure(name, version=None):
+    return json.loads(load_figure_json(name, version))
+
+
+def warm(names=None, force=False):
+    """Build the figures missing for the data files' current version; older versions are left to rebuild."""
+    version = data_version()
+    built = []
+    for name in names or visualization.plot_functions_order:
+        if force or not os.path.exists(figure_path(name, version)):
+            write_figure(name, version)
+            built.append(name)
+    return built
+
+
+def clear():
+    for path in glob.glob(os.path.join(FIGURE_CACHE_DIR, "*.json")):
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the pre-rendered figure cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    warm_parser = subparsers.add_parser("warm", help="Build every missing or stale figure.")
+    warm_parser.add_argument("names", nargs="*", help="Figures to build (default: all).")
+    warm_parser.add_argument("--force", action="store_true", help="Rebuild even if cached.")
+    subparsers.add_parser("clear", help="Delete all cached figures.")
+
+    args = parser.parse_args()
+    if args.command == "warm":
+        built = warm(args.names, force=args.force)
+        print(f"Built {len(built)} figure(s) into {FIGURE_CACHE_DIR}")
+    else:
+        clear()
+        print(f"Cleared {FIGURE_CACHE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
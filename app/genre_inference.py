@@ -0,0 +1,238 @@
+"""Infer genres for titles whose description matches no genre keyword.
+
+This is the genre filling from notebooks/Netflix_IMDB.ipynb as a batch job:
+descriptions are first matched against GENRE_KEYWORDS, and the ones that match
+nothing ("Unknown") are clustered with TF-IDF + KMeans, each cluster standing for
+the genre in CLUSTER_TO_GENRE.
+
+``fit`` fits the vectorizer and clusters once and saves them under MODEL_DIR.
+``assign`` then labels new titles against the saved model: their descriptions are
+matched and vectorized (in parallel for large batches) with the fitted
+vocabulary, and each goes to the nearest centroid, so a few hundred titles take milliseconds. With
+``--update`` the centroids also move towards the new titles, using the
+mini-batch k-means update (each centroid is the running mean of every title
+assigned to it), and the model is saved again. The vocabulary and IDF weights
+only change on a full ``fit``.
+
+    python app/genre_inference.py fit
+    python app/genre_inference.py assign new_titles.csv --output labelled.csv --update
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import data_store
+
+IMDB_PATH = os.path.join(data_store.BASE_DIR, "../data/cleaned_Netflix_IMDB.csv")
+MODEL_DIR = os.path.join(data_store.CACHE_DIR, "genre_model")
+
+UNKNOWN = "Unknown"
+
+GENRE_KEYWORDS = {
+    "Action": ["fight", "battle", "war", "explosion", "combat", "hero", "chase", "attack"],
+    "Comedy": ["funny", "comedy", "hilarious", "humor", "joke", "laugh"],
+    "Drama": ["drama", "emotional", "tragedy", "romance", "family", "life"],
+    "Sci-Fi": ["future", "alien", "space", "robot", "sci-fi", "technology", "cyber"],
+    "Horror": ["horror", "ghost", "scary", "creepy", "monster", "fear", "murder", "blood"],
+    "Fantasy": ["magic", "fantasy", "wizard", "dragon", "supernatural", "legend"],
+    "Thriller": ["thriller", "suspense", "mystery", "detective", "crime", "spy", "chase"],
+    "Romance": ["love", "relationship", "couple", "wedding", "heart"],
+    "Adventure": ["adventure", "explore", "journey", "quest", "treasure"],
+    "Animation": ["animation", "cartoon", "animated", "pixar", "disney"],
+    "Musical": ["music", "singing", "dance", "musical"],
+    "Crime": ["crime", "police", "detective", "gangster", "prison", "mafia"],
+}
+
+CLUSTER_TO_GENRE = {
+    0: "Action",
+    1: "Comedy",
+    2: "Drama",
+    3: "Horror",
+    4: "Sci-Fi",
+    5: "Romance",
+    6: "Thriller",
+    7: "Adventure",
+    8: "Fantasy",
+    9: "Crime",
+}
+
+MAX_FEATURES = 500
+RANDOM_STATE = 42
+
+# Descriptions per matching/vectorization task; smaller batches are labelled in-process.
+CHUNK_SIZE = 2000
+
+GenreModel = namedtuple("GenreModel", ["vectorizer", "centroids", "counts", "genres"])
+
+
+def keyword_genres(descriptions):
+    """Comma-joined GENRE_KEYWORDS genres whose keywords appear in each description, else UNKNOWN."""
+    genres = []
+    for description in descriptions:
+        text = description.lower() if isinstance(description, str) else ""
+        matched = [genre for genre, keywords in GENRE_KEYWORDS.items() if any(word in text for word in keywords)]
+        genres.append(", ".join(matched) or UNKNOWN)
+    return genres
+
+
+def fit(descriptions, n_clusters=len(CLUSTER_TO_GENRE)):
+    """Fit the vectorizer and clusters on ``descriptions`` (the ones no keyword matched)."""
+    from sklearn.cluster import KMeans
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(stop_words="english", max_features=MAX_FEATURES)
+    X = vectorizer.fit_transform(descriptions)
+    kmeans = KMeans(n_clusters=n_clusters, random_state=RANDOM_STATE).fit(X)
+    counts = np.bincount(kmeans.labels_, minlength=n_clusters)
+    genres = [CLUSTER_TO_GENRE.get(cluster, UNKNOWN) for cluster in range(n_clusters)]
+    return GenreModel(vectorizer, kmeans.cluster_centers_, counts, genres)
+
+
+def _label_chunk(vectorizer, descriptions):
+    genres = np.asarray(keyword_genres(descriptions), dtype=object)
+    unknown = genres == UNKNOWN
+    return genres, unknown, vectorizer.transform([d for d, u in zip(descriptions, unknown) if u])
+
+
+def label_keywords(model, descriptions, n_jobs=-1):
+    """Keyword genres of ``descriptions``, which are UNKNOWN, and the TF-IDF rows of those.
+
+    Batches over CHUNK_SIZE are split into chunks matched and vectorized in parallel.
+    """
+    descriptions = list(descriptions)
+    if len(descriptions) <= CHUNK_SIZE:
+        return _label_chunk(model.vectorizer, descriptions)
+    from joblib import Parallel, delayed
+
+    chunks = [descriptions[start:start + CHUNK_SIZE] for start in range(0, len(descriptions), CHUNK_SIZE)]
+    results = Parallel(n_jobs=n_jobs)(delayed(_label_chunk)(model.vectorizer, chunk) for chunk in chunks)
+    genres, unknown, X = zip(*results)
+    return np.concatenate(genres), np.concatenate(unknown), sp.vstack(X, format="csr")
+
+
+def nearest_centroid(model, X):
+    """Index of the nearest centroid to each row of the sparse matrix ``X``."""
+    # |x - c|^2 = |x|^2 - 2 x.c + |c|^2, and |x|^2 is the same for every centroid.
+    scores = np.asarray(X @ model.centroids.T)
+    return np.argmin((model.centroids ** 2).sum(axis=1) - 2 * scores, axis=1)
+
+
+def partial_fit(model, X, labels=None):
+    """Move each centroid to the mean of its previous titles and the new rows ``X`` assigned to it."""
+    labels = nearest_centroid(model, X) if labels is None else labels
+    k = len(model.centroids)
+    assignment = sp.csr_matrix((np.ones(len(labels)), (labels, np.arange(len(labels)))), shape=(k, len(labels)))
+    sums = np.asarray((assignment @ X).todense())
+    added = np.bincount(labels, minlength=k)
+    counts = model.counts + added
+    centroids = model.centroids.copy()
+    moved = added > 0
+    centroids[moved] = (model.centroids[moved] * model.counts[moved, None] + sums[moved]) / counts[moved, None]
+    return model._replace(centroids=centroids, counts=counts)
+
+
+def infer(model, descriptions, update=False, n_jobs=-1):
+    """Genres for ``descriptions`` and the (updated, if ``update``) model.
+
+    Keyword matches are used as-is; the rest get their nearest cluster's genre.
+    """
+    descriptions = pd.Series(descriptions).fillna("No description available")
+    genres, unknown, X = label_keywords(model, descriptions, n_jobs)
+    if unknown.any():
+        labels = nearest_centroid(model, X)
+        genres[unknown] = np.asarray(model.genres, dtype=object)[labels]
+        if update:
+            model = partial_fit(model, X, labels)
+    return pd.Series(genres, index=descriptions.index), model
+
+
+def save_model(model, model_dir=MODEL_DIR):
+    """Write the model to ``model_dir``, replacing the previous one atomically."""
+    import joblib
+
+    tmp_dir = f"{model_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    joblib.dump(model.vectorizer, os.path.join(tmp_dir, "vectorizer.joblib"))
+    np.save(os.path.join(tmp_dir, "centroids.npy"), model.centroids)
+    np.save(os.path.join(tmp_dir, "counts.npy"), model.counts)
+    with open(os.path.join(tmp_dir, "genres.json"), "w") as f:
+        json.dump(model.genres, f)
+
+    old_dir = f"{model_dir}.{os.getpid()}.old"
+    if os.path.exists(model_dir):
+        os.rename(model_dir, old_dir)
+    os.rename(tmp_dir, model_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def load_model(model_dir=MODEL_DIR):
+    import joblib
+
+    with open(os.path.join(model_dir, "genres.json")) as f:
+        genres = json.load(f)
+    return GenreModel(
+        joblib.load(os.path.join(model_dir, "vectorizer.joblib")),
+        np.load(os.path.join(model_dir, "centroids.npy")),
+        np.load(os.path.join(model_dir, "counts.npy")),
+        genres,
+    )
+
+
+def fit_source(source=IMDB_PATH, model_dir=MODEL_DIR):
+    descriptions = pd.read_csv(source)["description"].fillna("No description available")
+    unknown = descriptions[np.asarray(keyword_genres(descriptions)) == UNKNOWN]
+    model = fit(unknown)
+    save_model(model, model_dir)
+    return {"descriptions": len(descriptions), "clustered": len(unknown), "vocabulary": len(model.vectorizer.vocabulary_)}
+
+
+def assign_file(path, output_path=None, update=False, model_dir=MODEL_DIR):
+    """Fill the missing or UNKNOWN ``genres`` of the titles in ``path`` from their descriptions."""
+    titles = pd.read_csv(path)
+    titles["genres"] = titles.get("genres", pd.Series(np.nan, index=titles.index)).astype(object)
+    missing = titles["genres"].isna() | (titles["genres"] == UNKNOWN)
+    model = load_model(model_dir)
+
+    start = time.perf_counter()
+    genres, model = infer(model, titles.loc[missing, "description"], update=update)
+    seconds = time.perf_counter() - start
+    titles.loc[missing, "genres"] = genres.to_numpy()
+
+    output_path = output_path or path
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    titles.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, output_path)
+    if update:
+        save_model(model, model_dir)
+    return {"titles": len(titles), "assigned": int(missing.sum()), "infer_seconds": round(seconds, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Infer genres from title descriptions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fit_parser = subparsers.add_parser("fit", help="Fit and save the model from a catalogue.")
+    fit_parser.add_argument("--source", default=IMDB_PATH)
+    assign_parser = subparsers.add_parser("assign", help="Fill missing genres of a CSV with a description column.")
+    assign_parser.add_argument("path")
+    assign_parser.add_argument("--output", help="Where to write the labelled CSV (default: in place).")
+    assign_parser.add_argument("--update", action="store_true", help="Also update the centroids with the new titles.")
+
+    args = parser.parse_args()
+    if args.command == "fit":
+        summary = fit_source(args.source)
+    else:
+        summary = assign_file(args.path, args.output, update=args.update)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import multiprocessing
+import os
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = f"0.0.0.0:{os.environ.get('PORT', 8050)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# Import wsgi.py (and so load the data) once in the master; workers share it.
+preload_app = True
+timeout = 120
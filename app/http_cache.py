@@ -0,0 +1,182 @@
+"""Compressed, cache-validated responses for the Dash server.
+
+Layout, dependency, callback, component-suite and API (see api) responses only
+change when the data files or the dashboard code do. Each one gets a strong ETag computed from the
+request (method, path, query and body) plus the published data version (see
+rebuild) and code version, so:
+
+* a client that already has the payload gets a 304 without the callback running;
+* the compressed payload is kept in memory (up to CACHE_BYTES), with its
+  STORED_HEADERS, and served again to every client that sends the same request.
+  Responses that set their own Cache-Control (e.g. Dash's fingerprinted component
+  suites, cached for a year) keep it; the rest are sent with ``no-cache``.
+
+Other JSON, HTML, JS and CSS responses are compressed but not cached. Brotli is
+used when the ``brotli`` package is installed and the client accepts it;
+otherwise gzip.
+"""
+import functools
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import dash
+import flask
+
+import figure_cache
+import rebuild
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Upper bound on the compressed payloads kept in memory, per process.
+CACHE_BYTES = 64 << 20
+
+# Smaller bodies are sent as-is; compressing them saves less than the header costs.
+MIN_COMPRESS_BYTES = 500
+
+COMPRESSIBLE_TYPES = {"application/json", "text/html", "text/css", "application/javascript", "text/javascript"}
+CACHEABLE_PATHS = ("/_dash-layout", "/_dash-dependencies", "/_dash-update-component", "/_dash-component-suites/",
+                   "/api/")
+# Headers of the original response that cached copies are served with.
+STORED_HEADERS = ("Content-Type", "Cache-Control", "Vary", "Content-Encoding")
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+
+@functools.cache
+def code_version():
+    # Callbacks live in app.py, the API in api.py and figures in visualization.py.
+    digest = hashlib.sha256(dash.__version__.encode())
+    digest.update(figure_cache.code_version().encode())
+    for module in ("app.py", "api.py"):
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), module), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def request_key(request):
+    digest = hashlib.sha256()
+    for part in (rebuild.current_version(), code_version(), request.method, request.full_path):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()[:32]
+
+
+def negotiate(request):
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality("br") > 0:
+        return "br"
+    if accepted.quality("gzip") > 0:
+        return "gzip"
+    return "identity"
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def cache_get(key):
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+        return entry
+
+
+def cache_put(key, entry):
+    global _cache_bytes
+    size = len(entry[0])
+    if size > CACHE_BYTES:
+        return
+    with _lock:
+        if key in _cache:
+            return
+        _cache[key] = entry
+        _cache_bytes += size
+        while _cache_bytes > CACHE_BYTES:
+            _, (body, _) = _cache.popitem(last=False)
+            _cache_bytes -= len(body)
+
+
+def clear():
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+
+def _finish(response, etag, encoding=None):
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    if encoding and encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    if "Cache-Control" not in response.headers:
+        # Cache, but revalidate with the ETag before reuse.
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def before_request():
+    request = flask.request
+    if not request.path.startswith(CACHEABLE_PATHS):
+        return None
+    encoding = negotiate(request)
+    etag = f"{request_key(request)}-{encoding}"
+    flask.g.http_cache = {"etag": etag, "encoding": encoding, "hit": True}
+
+    entry = cache_get(etag)
+    if request.if_none_match.contains(etag):
+        response = flask.Response(status=304)
+        if entry is not None:
+            # A 304 carries the caching headers the full response would have.
+            response.headers.extend((name, value) for name, value in entry[1] if name in ("Cache-Control", "Vary"))
+        return _finish(response, etag)
+    if entry is not None:
+        body, headers = entry
+        return _finish(flask.Response(body, headers=headers), etag)
+    flask.g.http_cache["hit"] = False
+    return None
+
+
+def after_request(response):
+    state = flask.g.get("http_cache")
+    if state and state["hit"]:
+        return response
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.mimetype not in COMPRESSIBLE_TYPES or "Content-Encoding" in response.headers):
+        return response
+
+    body = response.get_data()
+    flask.g.uncompressed_bytes = len(body)
+    encoding = state["encoding"] if state else negotiate(flask.request)
+    if len(body) < MIN_COMPRESS_BYTES:
+        encoding = "identity"
+    body = compress(body, encoding)
+    response.set_data(body)
+
+    if state:
+        response = _finish(response, state["etag"], encoding)
+        headers = [(name, value) for name, value in response.headers if name in STORED_HEADERS]
+        cache_put(state["etag"], (body, headers))
+        return response
+    response.vary.add("Accept-Encoding")
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(server):
+    server.before_request(before_request)
+    server.after_request(after_request)
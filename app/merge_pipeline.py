@@ -0,0 +1,360 @@
+"""Build netflix_final_merged.csv from the three cleaned_*.csv inputs.
+
+This is the processing from notebooks/Netflix_Overall_DataProcessing.ipynb:
+the IMDb and Netflix catalogues are concatenated, collapsed to one row per
+(title, year_month), joined to the nearest trading day's stock prices, and
+missing IMDb scores/votes are filled with the per-type mean. Before that, Netflix
+titles take the IMDb score and votes of the IMDb title they match (see
+title_matching), so only unmatched ones are imputed.
+
+A full run rebuilds everything. An incremental run reuses the state saved by the
+previous run and only processes rows appended to the inputs since then: new
+(title, year_month) groups are re-collapsed and re-joined, titles after the old
+last trading day are re-joined against the new prices, and the per-type
+imputation sums are updated in place. Appended IMDb rows can be better matches
+for earlier Netflix titles, so then every Netflix title is matched again and the
+groups of those whose match changed are re-collapsed too. The output is
+published atomically.
+
+    python app/merge_pipeline.py            # incremental, falls back to a full run
+    python app/merge_pipeline.py --full
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import title_matching
+
+DATA_DIR = os.path.join(data_store.BASE_DIR, "../data")
+IMDB_PATH = os.path.join(DATA_DIR, "cleaned_Netflix_IMDB.csv")
+SHOWS_PATH = os.path.join(DATA_DIR, "cleaned_Netflix_Shows.csv")
+STOCKS_PATH = data_store.STOCKS_PATH
+STATE_DIR = os.path.join(data_store.CACHE_DIR, "merge")
+
+CONTENT_COLUMNS = ["title", "type", "release_date", "imdb_score", "imdb_votes", "genres", "country", "director"]
+GROUP_KEYS = ["title", "year_month"]
+# merge_asof suffixes the content's year_month, since the stock table has one too.
+JOINED_KEYS = ["title", "year_month_x"]
+IMPUTED_COLUMNS = ["imdb_score", "imdb_votes"]
+# What a Netflix title takes from its matched IMDb title.
+MATCHED_COLUMNS = ["matched_title", "matched_date"] + IMPUTED_COLUMNS
+CONTENT_CUTOFF = "2022-01-01"
+
+# Bump when the saved state changes shape so old state forces a full run.
+STATE_FORMAT = 3
+
+
+class FullRebuildRequired(Exception):
+    """The saved state cannot be extended incrementally (missing, or an input was rewritten)."""
+
+
+def _normalize_type(types):
+    return types.str.upper().replace({"TV SHOW": "SHOW", "Movie": "MOVIE"})
+
+
+def prepare_imdb(df):
+    df = df.copy()
+    df["type"] = _normalize_type(df["type"])
+    df["release_date"] = pd.to_datetime(df["release_date"])
+    # Left empty so a matched Netflix title can fill them in; see group_content.
+    for column in ("country", "director"):
+        if column not in df.columns:
+            df[column] = np.nan
+    return df[CONTENT_COLUMNS]
+
+
+def prepare_shows(df, matches=None):
+    """``matches`` holds the MATCHED_COLUMNS of each row, NaN where unmatched.
+
+    A matched title takes the title and release date of its IMDb title, so the
+    two are grouped into one row.
+    """
+    df = df.rename(columns={"date_added": "release_date"})
+    df["release_date"] = pd.to_datetime(df["release_date"], errors="coerce")
+    df["genres"] = df["listed_in"] if "listed_in" in df.columns else None
+    df["type"] = _normalize_type(df["type"])
+    for column in IMPUTED_COLUMNS:
+        df[column] = np.nan if matches is None else matches[column].to_numpy()
+    if matches is not None:
+        matched = matches["matched_title"].notna().to_numpy()
+        df.loc[matched, "title"] = matches["matched_title"].to_numpy()[matched]
+        df.loc[matched, "release_date"] = matches["matched_date"].to_numpy()[matched]
+    return df[CONTENT_COLUMNS]
+
+
+def imdb_titles(imdb):
+    """The IMDb catalogue as matching targets, with their release dates, scores and votes."""
+    titles = title_matching.title_table(imdb).assign(matched_date=pd.to_datetime(imdb["release_date"]).to_numpy())
+    return titles.assign(**{column: pd.to_numeric(imdb[column]).to_numpy() for column in IMPUTED_COLUMNS})
+
+
+def match_shows(shows_titles, imdb_titles):
+    """Netflix titles with the MATCHED_COLUMNS of their IMDb title (NaN if none), and the match report."""
+    start = time.perf_counter()
+    matches = title_matching.match_titles(shows_titles, imdb_titles)
+    report = title_matching.match_report(matches, len(shows_titles), time.perf_counter() - start)
+    matched = imdb_titles.iloc[matches.pairs["right"]].rename(columns={"title": "matched_title"})
+    matched.index = matches.pairs["left"].to_numpy()
+    shows_titles = shows_titles[title_matching.TITLE_COLUMNS].reset_index(drop=True)
+    return shows_titles.join(matched[MATCHED_COLUMNS]), report
+
+
+def prepare_content(imdb, shows, row_offsets=(0, 0), shows_matches=None):
+    """Concatenate the catalogues, keeping each row's source and position for ordering."""
+    imdb = prepare_imdb(imdb).assign(source=0, row=np.arange(len(imdb)) + row_offsets[0])
+    shows = prepare_shows(shows, shows_matches).assign(source=1, row=np.arange(len(shows)) + row_offsets[1])
+    content = pd.concat([imdb, shows], ignore_index=True)
+    content["year_month"] = content["release_date"].dt.to_period("M")
+    return content
+
+
+def group_content(content):
+    """One row per (title, year_month) released before CONTENT_CUTOFF, taking the first non-null value of each column.
+
+    Rows after the cutoff stay in the content, as a later match can date them earlier.
+    """
+    content = content[content["release_date"] < CONTENT_CUTOFF]
+    content = content.sort_values(["source", "row"], kind="stable")
+    grouped = content.drop(columns=["source", "row"]).groupby(GROUP_KEYS, as_index=False).first()
+    return grouped.fillna({"country": "Unknown", "director": "Unknown"})
+
+
+def prepare_stocks(stocks):
+    stocks = stocks.copy()
+    stocks["date"] = pd.to_datetime(stocks["date"])
+    stocks["year_month"] = stocks["date"].dt.to_period("M")
+    return stocks.sort_values("date", kind="stable")
+
+
+def join_stocks(grouped, stocks):
+    # Ties on release_date keep (title, year_month) order so incremental runs match full ones.
+    grouped = grouped.sort_values("release_date", kind="stable")
+    return pd.merge_asof(grouped, stocks, left_on="release_date", right_on="date", direction="nearest")
+
+
+def imputation_sums(joined):
+    """Per-type sums and counts of the non-null imputed columns."""
+    sums = joined.groupby("type")[IMPUTED_COLUMNS].sum()
+    counts = joined.groupby("type")[IMPUTED_COLUMNS].count()
+    return {column: {t: [float(sums.at[t, column]), int(counts.at[t, column])] for t in sums.index}
+            for column in IMPUTED_COLUMNS}
+
+
+def finalize(joined, sums):
+    """Impute the per-type means and drop titles matched to rows without stock indicators."""
+    merged = joined.copy()
+    for column in IMPUTED_COLUMNS:
+        means = {t: total / count if count else np.nan for t, (total, count) in sums[column].items()}
+        merged[column] = merged[column].fillna(merged["type"].map(means))
+    return merged.dropna(subset=["daily_return", "volatility", "MA30"])
+
+
+def _prefix_hash(path, size):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = size
+        while remaining:
+            chunk = f.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def _input_state(path):
+    size = os.path.getsize(path)
+    return {"size": size, "sha256": _prefix_hash(path, size)}
+
+
+def read_appended(path, previous):
+    """Rows appended to ``path`` since ``previous`` was recorded, or FullRebuildRequired."""
+    size = os.path.getsize(path)
+    if size < previous["size"] or _prefix_hash(path, previous["size"]) != previous["sha256"]:
+        raise FullRebuildRequired(f"{os.path.basename(path)} was modified, not appended to")
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(previous["size"])
+        tail = f.read()
+    return pd.read_csv(io.BytesIO(header + tail))
+
+
+def write_csv_atomic(df, path):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def save_state(state_dir, content, joined, stocks, titles, sums, inputs, rows, output_path):
+    os.makedirs(state_dir, exist_ok=True)
+    content.to_pickle(os.path.join(state_dir, "content.pkl"))
+    joined.to_pickle(os.path.join(state_dir, "joined.pkl"))
+    stocks.to_pickle(os.path.join(state_dir, "stocks.pkl"))
+    for name, table in titles.items():
+        table.to_pickle(os.path.join(state_dir, f"{name}_titles.pkl"))
+    state = {
+        "format": STATE_FORMAT,
+        "inputs": inputs,
+        "sums": sums,
+        "rows": rows,
+        "output": {"path": os.path.abspath(output_path), "sha256": data_store.file_hash(output_path)},
+    }
+    tmp_path = os.path.join(state_dir, f"state.json.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, os.path.join(state_dir, "state.json"))
+
+
+def load_state(state_dir, output_path):
+    try:
+        with open(os.path.join(state_dir, "state.json")) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        raise FullRebuildRequired("no saved state")
+    if state.get("format") != STATE_FORMAT:
+        raise FullRebuildRequired("saved state has an old format")
+    output = state["output"]
+    if output["path"] != os.path.abspath(output_path) or not os.path.exists(output_path) \
+            or data_store.file_hash(output_path) != output["sha256"]:
+        raise FullRebuildRequired("the published dataset no longer matches the saved state")
+    content = pd.read_pickle(os.path.join(state_dir, "content.pkl"))
+    joined = pd.read_pickle(os.path.join(state_dir, "joined.pkl"))
+    stocks = pd.read_pickle(os.path.join(state_dir, "stocks.pkl"))
+    titles = {name: pd.read_pickle(os.path.join(state_dir, f"{name}_titles.pkl")) for name in ("imdb", "shows")}
+    return state, content, joined, stocks, titles
+
+
+def run_full(imdb_path=IMDB_PATH, shows_path=SHOWS_PATH, stocks_path=STOCKS_PATH,
+             output_path=data_store.DATA_PATH, state_dir=STATE_DIR):
+    inputs = {name: _input_state(path) for name, path in
+              (("imdb", imdb_path), ("shows", shows_path), ("stocks", stocks_path))}
+    imdb = pd.read_csv(imdb_path)
+    shows = pd.read_csv(shows_path)
+    titles = {"imdb": imdb_titles(imdb)}
+    titles["shows"], matching = match_shows(title_matching.title_table(shows), titles["imdb"])
+    content = prepare_content(imdb, shows, shows_matches=titles["shows"])
+    stocks = prepare_stocks(pd.read_csv(stocks_path))
+
+    joined = join_stocks(group_content(content), stocks)
+    sums = imputation_sums(joined)
+    merged = finalize(joined, sums)
+
+    write_csv_atomic(merged, output_path)
+    rows = {"imdb": len(imdb), "shows": len(shows)}
+    save_state(state_dir, content, joined, stocks, titles, sums, inputs, rows, output_path)
+    return {"mode": "full", "rows": len(merged), "regrouped": len(joined), "rejoined": len(joined),
+            "matching": matching}
+
+
+def run_incremental(imdb_path=IMDB_PATH, shows_path=SHOWS_PATH, stocks_path=STOCKS_PATH,
+                    output_path=data_store.DATA_PATH, state_dir=STATE_DIR):
+    state, content, joined, stocks, titles = load_state(state_dir, output_path)
+    previous = state["inputs"]
+
+    new_imdb = read_appended(imdb_path, previous["imdb"])
+    new_shows = read_appended(shows_path, previous["shows"])
+    new_stocks = read_appended(stocks_path, previous["stocks"])
+    inputs = {name: _input_state(path) for name, path in
+              (("imdb", imdb_path), ("shows", shows_path), ("stocks", stocks_path))}
+
+    last_trading_day = stocks["date"].max()
+    if len(new_stocks):
+        new_stocks = prepare_stocks(new_stocks)
+        if new_stocks["date"].min() <= last_trading_day:
+            raise FullRebuildRequired("appended stock rows are not after the last trading day")
+        stocks = pd.concat([stocks, new_stocks], ignore_index=True)
+
+    old_shows = titles["shows"]
+    titles["imdb"] = pd.concat([titles["imdb"], imdb_titles(new_imdb)], ignore_index=True)
+    if len(new_imdb):
+        titles["shows"], matching = match_shows(
+            pd.concat([old_shows, title_matching.title_table(new_shows)], ignore_index=True), titles["imdb"])
+    else:
+        new_matched, matching = match_shows(title_matching.title_table(new_shows), titles["imdb"])
+        titles["shows"] = pd.concat([old_shows, new_matched], ignore_index=True)
+
+    # Earlier Netflix titles whose match changed take the new IMDb title.
+    old_matches = old_shows[MATCHED_COLUMNS]
+    new_matches = titles["shows"][MATCHED_COLUMNS].iloc[:len(old_shows)]
+    if (old_matches["matched_title"].notna() & new_matches["matched_title"].isna()).any():
+        raise FullRebuildRequired("a matched Netflix title lost its IMDb match")
+    changed = ~(old_matches.eq(new_matches) | (old_matches.isna() & new_matches.isna())).all(axis=1).to_numpy()
+    rematched = content["source"].eq(1) & content["row"].isin(np.flatnonzero(changed))
+    rematched_keys = content.loc[rematched, GROUP_KEYS]
+    matches = new_matches.iloc[content.loc[rematched, "row"]]
+    content.loc[rematched, IMPUTED_COLUMNS] = matches[IMPUTED_COLUMNS].to_numpy()
+    content.loc[rematched, "title"] = matches["matched_title"].to_numpy()
+    content.loc[rematched, "release_date"] = matches["matched_date"].to_numpy()
+    content.loc[rematched, "year_month"] = content.loc[rematched, "release_date"].dt.to_period("M")
+    rematched_keys = pd.concat([rematched_keys, content.loc[rematched, GROUP_KEYS]])
+
+    new_content = prepare_content(new_imdb, new_shows, (state["rows"]["imdb"], state["rows"]["shows"]),
+                                  titles["shows"].iloc[len(old_shows):])
+    if len(new_content):
+        content = pd.concat([content, new_content], ignore_index=True)
+
+    # Groups touched by new or rematched titles are re-collapsed from all of their rows.
+    new_keys = pd.MultiIndex.from_frame(pd.concat([new_content[GROUP_KEYS], rematched_keys])).unique()
+    regrouped = group_content(content[pd.MultiIndex.from_frame(content[GROUP_KEYS]).isin(new_keys)])
+
+    # Titles after the old last trading day may now have a nearer price.
+    regroup = pd.MultiIndex.from_frame(joined[JOINED_KEYS]).isin(new_keys)
+    after_last = joined["release_date"].gt(last_trading_day).to_numpy() & (len(new_stocks) > 0)
+    stale = regroup | after_last
+    kept_titles = joined.loc[after_last & ~regroup].rename(columns={"year_month_x": "year_month"})
+    rejoined = join_stocks(pd.concat([regrouped, kept_titles[regrouped.columns]], ignore_index=True), stocks)
+
+    sums = state["sums"]
+    for column in IMPUTED_COLUMNS:
+        _update_sums(sums[column], joined[stale], column, sign=-1)
+        _update_sums(sums[column], rejoined, column, sign=1)
+
+    joined = pd.concat([joined[~stale], rejoined], ignore_index=True)
+    joined = joined.sort_values(JOINED_KEYS, kind="stable").sort_values("release_date", kind="stable")
+    merged = finalize(joined.reset_index(drop=True), sums)
+
+    write_csv_atomic(merged, output_path)
+    rows = {"imdb": state["rows"]["imdb"] + len(new_imdb), "shows": state["rows"]["shows"] + len(new_shows)}
+    save_state(state_dir, content, joined, stocks, titles, sums, inputs, rows, output_path)
+    return {"mode": "incremental", "rows": len(merged), "regrouped": len(regrouped),
+            "rejoined": len(rejoined), "new_stock_rows": len(new_stocks), "rematched": int(rematched.sum()),
+            "matching": matching}
+
+
+def _update_sums(sums, rows, column, sign):
+    values = rows.dropna(subset=[column])
+    for t, group in values.groupby("type"):
+        total, count = sums.get(t, [0.0, 0])
+        sums[t] = [total + sign * float(group[column].sum()), count + sign * len(group)]
+
+
+def run(full=False, **paths):
+    if not full:
+        try:
+            return run_incremental(**paths)
+        except FullRebuildRequired as exc:
+            print(f"Running a full rebuild: {exc}")
+    return run_full(**paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build netflix_final_merged.csv from the cleaned inputs.")
+    parser.add_argument("--full", action="store_true", help="Ignore saved state and rebuild everything.")
+    parser.add_argument("--output", default=data_store.DATA_PATH, help="Where to publish the merged CSV.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = run(full=args.full, output_path=args.output)
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Timing, memory and payload-size histograms, served at /metrics.
+
+Figure builds (see visualization.figure) and Dash requests are measured for wall
+time, CPU time (of the handling thread) and, when NETFLIX_TRACE_MEMORY=1, the peak
+memory allocated while they ran (tracemalloc; roughly doubles allocation cost, and
+concurrent requests in one process inflate each other's figures). Responses are
+also measured for body size before and after compression.
+
+``/metrics`` renders everything in the Prometheus text format. The metrics are per
+process: under gunicorn each scrape reads whichever worker answers it.
+
+Setting NETFLIX_PROFILING=1 lets a request ask for a profile with an
+``X-Profile: 1`` header; the cProfile stats are written under PROFILE_DIR and the
+file name returned in an ``X-Profile-File`` header (read it with ``pstats``).
+"""
+import bisect
+import contextlib
+import cProfile
+import os
+import threading
+import time
+import tracemalloc
+
+import flask
+
+TRACE_MEMORY = os.environ.get("NETFLIX_TRACE_MEMORY") == "1"
+PROFILING = os.environ.get("NETFLIX_PROFILING") == "1"
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "cache", "profiles")
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(10))  # 1 KB .. 256 MB
+
+_registry = {}
+# The Dash app's callback_map and the names its pattern-matching ids may take (see init_app).
+_callbacks = {"map": {}, "names": ()}
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (not cumulative) plus +Inf, then the sum.
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in series:
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = ",".join(pairs + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {cumulative}")
+            label_text = "{" + ",".join(pairs) + "}" if pairs else ""
+            lines.append(f"{self.name}_sum{label_text} {total}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+figure_seconds = Histogram("netflix_figure_build_seconds", "Wall time of figure builds.",
+                           ("figure",), SECONDS_BUCKETS)
+figure_cpu_seconds = Histogram("netflix_figure_build_cpu_seconds", "CPU time of figure builds.",
+                               ("figure",), SECONDS_BUCKETS)
+figure_alloc_bytes = Histogram("netflix_figure_build_allocated_bytes",
+                               "Peak memory allocated during figure builds (NETFLIX_TRACE_MEMORY=1).",
+                               ("figure",), BYTES_BUCKETS)
+request_seconds = Histogram("netflix_request_seconds", "Wall time of Dash requests.",
+                            ("endpoint", "cache"), SECONDS_BUCKETS)
+request_cpu_seconds = Histogram("netflix_request_cpu_seconds", "CPU time of Dash requests.",
+                                ("endpoint", "cache"), SECONDS_BUCKETS)
+request_alloc_bytes = Histogram("netflix_request_allocated_bytes",
+                                "Peak memory allocated during Dash requests (NETFLIX_TRACE_MEMORY=1).",
+                                ("endpoint", "cache"), BYTES_BUCKETS)
+response_bytes = Histogram("netflix_response_bytes", "Uncompressed response body size.",
+                           ("endpoint",), BYTES_BUCKETS)
+response_wire_bytes = Histogram("netflix_response_wire_bytes", "Response body size as sent.",
+                                ("endpoint",), BYTES_BUCKETS)
+
+_local = threading.local()
+
+
+class _Measurement:
+    """Wall time, CPU time and peak allocation of a block; nests (e.g. a figure build in a request)."""
+
+    def __init__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        self.memory = TRACE_MEMORY and tracemalloc.is_tracing()
+        if self.memory:
+            stack = _local.__dict__.setdefault("stack", [])
+            current, peak = tracemalloc.get_traced_memory()
+            # reset_peak() below would lose the enclosing block's peak so far.
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.start, self.peak = current, current
+            stack.append(self)
+
+    def stop(self):
+        """Returns (wall seconds, CPU seconds, allocated bytes or None)."""
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        allocated = None
+        if self.memory:
+            peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            stack = _local.stack
+            stack.remove(self)
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            allocated = peak - self.start
+        return wall, cpu, allocated
+
+
+@contextlib.contextmanager
+def measure_figure(name):
+    measurement = _Measurement()
+    try:
+        yield
+    finally:
+        wall, cpu, allocated = measurement.stop()
+        figure_seconds.observe(wall, name)
+        figure_cpu_seconds.observe(cpu, name)
+        if allocated is not None:
+            figure_alloc_bytes.observe(allocated, name)
+
+
+def _registered_outputs(output):
+    """``id.property`` of each output of a callback_map key, without allow_duplicate suffixes."""
+    return {part.split("@")[0] for part in output.strip(".").split("...")}
+
+
+def endpoint_label(request):
+    """Callback requests are labelled by output (the figure name for lazy graphs), others by path or route.
+
+    Only outputs of registered callbacks are label values, so made-up requests
+    are all labelled "callback".
+    """
+    if request.path in ("/", "/_dash-layout", "/_dash-dependencies"):
+        return request.path
+    if request.path.startswith("/_dash-component-suites/"):
+        return "component-suites"
+    if request.path.startswith("/api/"):
+        # The route, not the path, so made-up paths can't add label values.
+        rule = request.url_rule.rule if request.url_rule is not None else ""
+        return rule if rule.startswith("/api/") else "other"
+    if request.path != "/_dash-update-component":
+        return "other"
+    try:
+        body = request.get_json(silent=True, cache=True)
+    except (TypeError, ValueError):
+        return "callback"
+    if not isinstance(body, dict) or not isinstance(body.get("output"), str) \
+            or body["output"] not in _callbacks["map"]:
+        return "callback"
+    registered = _registered_outputs(body["output"])
+    outputs = body.get("outputs")
+    outputs = outputs if isinstance(outputs, list) else [outputs]
+    ids = []
+    for output in outputs:
+        output_id = output.get("id") if isinstance(output, dict) else None
+        label = "callback"
+        if isinstance(output_id, dict):
+            # A pattern-matching id is filled in by the client: only known names are kept.
+            if output_id.get("name") in _callbacks["names"] \
+                    and output.get("property") in {key.rsplit(".", 1)[-1] for key in registered}:
+                label = f"{output_id['name']}.{output.get('property')}"
+        elif f"{output_id}.{output.get('property')}" in registered:
+            label = f"{output_id}.{output.get('property')}"
+        ids.append(label)
+    return ",".join(sorted(set(ids))) or "callback"
+
+
+def before_request():
+    request = flask.request
+    if request.path == "/metrics":
+        return
+    state = flask.g.metrics = {"measurement": _Measurement(), "profile": None}
+    if PROFILING and request.headers.get("X-Profile") == "1":
+        state["profile"] = cProfile.Profile()
+        state["profile"].enable()
+
+
+def after_request(response):
+    state = flask.g.pop("metrics", None)
+    if state is None:
+        return response
+    profile = state["profile"]
+    if profile is not None:
+        profile.disable()
+    wall, cpu, allocated = state["measurement"].stop()
+
+    request = flask.request
+    endpoint = endpoint_label(request)
+    cache_state = flask.g.get("http_cache")
+    cache = "none" if cache_state is None else "hit" if cache_state["hit"] else "miss"
+    request_seconds.observe(wall, endpoint, cache)
+    request_cpu_seconds.observe(cpu, endpoint, cache)
+    if allocated is not None:
+        request_alloc_bytes.observe(allocated, endpoint, cache)
+    if response.status_code == 200 and not response.direct_passthrough:
+        wire = response.calculate_content_length() or 0
+        response_wire_bytes.observe(wire, endpoint)
+        # Set by http_cache when it compressed this response; cached payloads are only measured as sent.
+        body = flask.g.get("uncompressed_bytes", None if "Content-Encoding" in response.headers else wire)
+        if body is not None:
+            response_bytes.observe(body, endpoint)
+
+    if profile is not None:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        filename = f"{time.time_ns() // 1000}-{os.getpid()}-{endpoint[:60].replace('/', '_')}.prof"
+        profile.dump_stats(os.path.join(PROFILE_DIR, filename))
+        response.headers["X-Profile-File"] = filename
+    return response
+
+
+def render():
+    return "\n".join(histogram.render() for histogram in _registry.values()) + "\n"
+
+
+def metrics_view():
+    return flask.Response(render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(server, callback_map=None, names=()):
+    """Register the hooks and /metrics; call before http_cache.init_app so the timing covers its work.
+
+    ``callback_map`` is the Dash app's, read at request time, and ``names`` the
+    ``name`` values its pattern-matching ids take (the figure names).
+    """
+    _callbacks["map"] = {} if callback_map is None else callback_map
+    _callbacks["names"] = names
+    if TRACE_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    server.before_request(before_request)
+    server.after_request(after_request)
+    server.add_url_rule("/metrics", "metrics", metrics_view)
@@ -0,0 +1,175 @@
+"""Background rebuilds of the figure cache when the data files change.
+
+Every process serves unfiltered figures from one *published* data version (see
+figure_cache). Requests check, at most every CHECK_INTERVAL seconds, whether the
+data files have a new version:
+
+* if the new version's figures are all cached already, it is published;
+* otherwise one process (whichever takes LOCK_PATH first) rebuilds its column
+  caches and then every figure in parallel on a process pool, and publishes the
+  version once the whole set is written. The other processes pick it up on their
+  next check.
+
+Publishing swaps a single reference, so each request for a cached figure reads
+either the old set or the new one, never a mix; the memoized datasets behind
+filtered figures are cleared at the same time. Figure files of old versions are
+deleted by the first check GRACE_SECONDS after the swap, once requests (in every
+process) that started on them have finished. That is left to a check rather than
+a timer because the first publish runs in the gunicorn master (see wsgi.py), whose
+threads don't carry over into the forked workers. Nothing else deletes them: figures built on a
+cache miss or by ``figure_cache.py warm`` only ever add files, and only for the
+version whose data they were built from.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import data_store
+import figure_cache
+import visualization
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CHECK_INTERVAL = 5
+GRACE_SECONDS = 120
+LOCK_PATH = os.path.join(figure_cache.FIGURE_CACHE_DIR, "rebuild.lock")
+
+logger = logging.getLogger(__name__)
+
+_state = {"published": None, "building": None, "failed": None, "checked": float("-inf"), "retire_at": None}
+_lock = threading.Lock()
+
+
+def published_version():
+    return _state["published"]
+
+
+def current_version():
+    """The published data version, or the files' current version before the first publish."""
+    return _state["published"] or figure_cache.data_version()
+
+
+def publish(version, reset=True):
+    """Serve figures of data ``version`` from now on, and have check() retire the others after GRACE_SECONDS.
+
+    The memoized datasets are cleared too, unless ``reset`` is False because they
+    were built from ``version``'s files.
+    """
+    with _lock:
+        if _state["published"] == version:
+            return
+        _state["published"] = version
+        _state["retire_at"] = time.monotonic() + GRACE_SECONDS
+    if reset:
+        visualization.reset_datasets()
+
+
+def _build_figure(name, version):
+    figure_cache.write_figure(name, version)
+    return name
+
+
+def _pool_context():
+    # Workers start from a clean interpreter with the plotting code imported, not a
+    # fork of a threaded server whose memoized datasets hold the old data.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["visualization"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def build_all(version, names=None, workers=None):
+    """Build every figure of data ``version`` in parallel; returns the names built."""
+    names = list(names or visualization.plot_functions_order)
+    for path in data_store.DATA_SOURCES:
+        data_store.ensure_cache(path)
+    workers = workers or min(len(names), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        return list(pool.map(_build_figure, names, [version] * len(names)))
+
+
+def _take_lock():
+    """The open rebuild lock file if this process got it, else None."""
+    os.makedirs(os.path.dirname(LOCK_PATH), exist_ok=True)
+    lock_file = open(LOCK_PATH, "a")
+    if fcntl is None:
+        return lock_file
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def _retire():
+    keep = {version for version in (_state["published"], _state["building"]) if version}
+    figure_cache.retire(keep)
+
+
+def _rebuild(version, lock_file):
+    try:
+        # Another process may have finished this version while we waited for the lock.
+        if not figure_cache.is_complete(version):
+            start = time.perf_counter()
+            build_all(version)
+            logger.info("Rebuilt figures for data version %s in %.1fs", version[:12], time.perf_counter() - start)
+        publish(version)
+    except Exception:
+        # Not retried until the data changes again; the published version keeps being served.
+        _state["failed"] = version
+        logger.exception("Rebuilding figures for data version %s failed", version[:12])
+    finally:
+        lock_file.close()
+        with _lock:
+            _state["building"] = None
+
+
+def check():
+    """Publish the data files' current version, rebuilding its figures in the background first if needed.
+
+    Also retires the old versions' figures once their grace period is over.
+    """
+    now = time.monotonic()
+    with _lock:
+        if now - _state["checked"] < CHECK_INTERVAL:
+            return
+        _state["checked"] = now
+        retire = _state["retire_at"] is not None and now >= _state["retire_at"]
+        if retire:
+            _state["retire_at"] = None
+        building = _state["building"]
+    if retire:
+        threading.Thread(target=_retire, daemon=True).start()
+    if building:
+        return
+
+    version = figure_cache.data_version()
+    if version in (_state["published"], _state["failed"]):
+        return
+    if figure_cache.is_complete(version):
+        publish(version)
+        return
+
+    with _lock:
+        if _state["building"]:
+            return
+        _state["building"] = version
+    lock_file = _take_lock()
+    if lock_file is None:
+        # Another process is building it.
+        with _lock:
+            _state["building"] = None
+        return
+    threading.Thread(target=_rebuild, args=(version, lock_file), daemon=True).start()
+
+
+def init_app(server):
+    server.before_request(check)
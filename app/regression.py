@@ -0,0 +1,121 @@
+"""Closed-form simple linear regression and correlation over many ranges at once.
+
+Every statistic of a least-squares line y = intercept + slope * x over a range of
+points follows from six sums (n, x, y, xx, xy, yy). With cumulative sums of those,
+the fit of any contiguous range costs a handful of array lookups, so a batch of
+eras, or every sliding window of a series, is fitted in one vectorized pass.
+"""
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+Fit = namedtuple("Fit", ["slope", "intercept", "r2", "pearson", "n"])
+Interval = namedtuple("Interval", ["low", "high"])
+FitIntervals = namedtuple("FitIntervals", ["slope", "intercept", "r2", "pearson"])
+
+
+def _fits_from_sums(n, sx, sy, sxx, sxy, syy, x_shift=0.0, y_shift=0.0):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cxx = sxx - sx * sx / n
+        cxy = sxy - sx * sy / n
+        cyy = syy - sy * sy / n
+        degenerate = (n < 2) | (cxx <= 0)
+        slope = np.where(degenerate, np.nan, cxy / cxx)
+        # Intercept of the line in the original (unshifted) coordinates.
+        intercept = sy / n + y_shift - slope * (sx / n + x_shift)
+        pearson = np.where(degenerate | (cyy <= 0), np.nan, cxy / np.sqrt(cxx * cyy))
+    return Fit(slope, intercept, pearson ** 2, pearson, n)
+
+
+def range_fits(x, y, starts, stops):
+    """Fit ``y`` on ``x`` over each range ``[starts[i], stops[i])``; returns a Fit of arrays.
+
+    Points with a NaN in ``x`` or ``y`` are left out of every range.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    # Shift to the means before summing, so the cumulative sums don't lose precision.
+    x_shift = x[keep].mean() if keep.any() else 0.0
+    y_shift = y[keep].mean() if keep.any() else 0.0
+    dx = np.where(keep, x - x_shift, 0.0)
+    dy = np.where(keep, y - y_shift, 0.0)
+
+    columns = np.stack([keep.astype(float), dx, dy, dx * dx, dx * dy, dy * dy])
+    cumulative = np.concatenate([np.zeros((6, 1)), np.cumsum(columns, axis=1)], axis=1)
+    sums = cumulative[:, np.asarray(stops)] - cumulative[:, np.asarray(starts)]
+    return _fits_from_sums(*sums, x_shift=x_shift, y_shift=y_shift)
+
+
+def segment_fits(x, y, offsets):
+    """Fit each segment ``[offsets[i], offsets[i + 1])`` of points stored back to back."""
+    offsets = np.asarray(offsets)
+    return range_fits(x, y, offsets[:-1], offsets[1:])
+
+
+def sliding_fits(x, y, window):
+    """Fit every run of ``window`` consecutive points; fit i covers points i .. i + window - 1."""
+    starts = np.arange(max(len(x) - window + 1, 0))
+    return range_fits(x, y, starts, starts + window)
+
+
+def _reset_pool():
+    global _pool, _pool_lock
+    _pool, _pool_lock = None, threading.Lock()
+
+
+def _executor():
+    """The thread pool shared by every bootstrap_intervals call, one thread per CPU."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="bootstrap")
+        return _pool
+
+
+_reset_pool()
+# A forked child (e.g. a gunicorn worker) doesn't inherit the pool's threads, so it starts its own.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool)
+
+
+def _bootstrap_chunk(x, y, offsets, samples, seed):
+    rng = np.random.default_rng(seed)
+    lengths = np.diff(offsets)
+    segment = np.repeat(np.arange(len(lengths)), lengths)
+    # Resample every segment with replacement, for all samples of this chunk at once.
+    draws = offsets[segment] + (rng.random((samples, len(segment))) * lengths[segment]).astype(np.int64)
+    xs, ys = x[draws], y[draws]
+    sums = [np.add.reduceat(values, offsets[:-1], axis=1)
+            for values in (np.ones_like(xs), xs, ys, xs * xs, xs * ys, ys * ys)]
+    return _fits_from_sums(*sums)
+
+
+def bootstrap_intervals(x, y, offsets, samples=1000, confidence=0.95, seed=0, n_jobs=None):
+    """Percentile bootstrap intervals of each segment's fit; returns FitIntervals of Intervals.
+
+    Samples are split into ``n_jobs`` chunks (default one per CPU) resampled on the
+    shared thread pool; numpy releases the GIL for the heavy array work. Segments
+    must be non-empty and free of NaNs.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    chunks = np.array_split(np.arange(samples), n_jobs)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+
+    results = list(_executor().map(lambda args: _bootstrap_chunk(x, y, offsets, *args),
+                                   [(len(chunk), seed) for chunk, seed in zip(chunks, seeds) if len(chunk)]))
+
+    tail = (1 - confidence) / 2 * 100
+    intervals = {}
+    for field in FitIntervals._fields:
+        values = np.concatenate([getattr(result, field) for result in results], axis=0)
+        with np.errstate(invalid="ignore"):
+            low, high = np.nanpercentile(values, [tail, 100 - tail], axis=0) if len(values) else (np.nan, np.nan)
+        intervals[field] = Interval(low, high)
+    return FitIntervals(**intervals)
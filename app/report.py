@@ -0,0 +1,248 @@
+"""Export every dashboard figure into one self-contained offline HTML report.
+
+Figures come from the figure cache (see figure_cache): the ones not cached for
+the current data version are built first, in parallel on a process pool (see
+rebuild.build_all), and the rest are reused as they are. The report embeds a
+single copy of plotly.js. Values that appear more than once across the figures
+(data arrays shared between traces or figures, the layout template) are stored
+once in a table that the page resolves before plotting.
+
+Dashboard controls served by callbacks have no server to call in the report, so
+STATIC_CONTROLS replaces them with plotly's own: the production map gets a slider
+over every year, each step carrying that year's data.
+
+The report records the cache keys of its figures, so an export whose figures are
+all unchanged leaves the existing file alone unless ``--force`` is given.
+
+    python app/report.py --output snapshots/netflix_report.html
+"""
+import argparse
+import collections
+import datetime
+import hashlib
+import html
+import json
+import os
+import re
+import time
+
+import plotly.offline
+
+import app as dashboard
+import data_store
+import figure_cache
+import rebuild
+import visualization
+
+REPORT_PATH = os.path.join(data_store.CACHE_DIR, "report", "netflix_report.html")
+
+# Smaller repeated values cost more as references than they save.
+MIN_SHARED_BYTES = 256
+
+# Part of the report key, so reports written by an older layout are rewritten.
+REPORT_FORMAT = 2
+
+_KEY_PATTERN = re.compile(r'<meta name="report-key" content="([0-9a-f]+)">')
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="report-key" content="{key}">
+<title>Netflix Data Analysis Report</title>
+<style>
+body {{ background: black; color: white; font-family: sans-serif; margin: 0; padding: 20px; }}
+h1, h2, h3, p {{ text-align: center; }}
+h2 {{ margin-top: 60px; }}
+.figure {{ width: 100%; margin-bottom: 50px; }}
+.generated {{ color: #aaa; font-size: 14px; }}
+</style>
+<script>{plotlyjs}</script>
+</head>
+<body>
+<h1>Netflix Data Analysis Report</h1>
+<p class="generated">Generated {generated} from data version {version}</p>
+{sections}
+<script type="application/json" id="report-data">{data}</script>
+<script>
+(function () {{
+  var data = JSON.parse(document.getElementById("report-data").textContent);
+  var shared = [];
+  function resolve(node) {{
+    if (Array.isArray(node)) {{
+      return node.map(resolve);
+    }}
+    if (node && typeof node === "object") {{
+      if (Object.keys(node).length === 1 && "$shared" in node) {{
+        var value = shared[node["$shared"]];
+        // Plotly may write into layout objects; arrays and typed-array specs are only read.
+        return Array.isArray(value) || "bdata" in value ? value : structuredClone(value);
+      }}
+      var out = {{}};
+      for (var key in node) {{
+        out[key] = resolve(node[key]);
+      }}
+      return out;
+    }}
+    return node;
+  }}
+  data.shared.forEach(function (value) {{ shared.push(resolve(value)); }});
+  data.figures.forEach(function (entry) {{
+    var figure = resolve(entry.figure);
+    Plotly.newPlot(entry.id, figure.data, figure.layout, {{responsive: true}});
+  }});
+}})();
+</script>
+</body>
+</html>
+"""
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"), sort_keys=True)
+
+
+def share_values(figures):
+    """Replace values repeated across ``figures`` by ``{"$shared": i}`` references into a table.
+
+    Returns (figures, table). A shared value's own repeated parts are shared too,
+    and always refer to earlier table entries.
+    """
+    counts = collections.Counter()
+
+    def count(node):
+        if isinstance(node, (dict, list)):
+            text = _dumps(node)
+            if len(text) >= MIN_SHARED_BYTES:
+                counts[text] += 1
+                if counts[text] > 1:
+                    # Its parts were counted the first time it was seen.
+                    return
+            for child in node.values() if isinstance(node, dict) else node:
+                count(child)
+
+    for figure in figures:
+        count(figure)
+
+    table = []
+    ids = {}
+
+    def replace(node):
+        if not isinstance(node, (dict, list)):
+            return node
+        text = _dumps(node)
+        if text in ids:
+            return {"$shared": ids[text]}
+        if isinstance(node, dict):
+            new = {key: replace(value) for key, value in node.items()}
+        else:
+            new = [replace(value) for value in node]
+        if counts[text] < 2:
+            return new
+        ids[text] = len(table)
+        table.append(new)
+        return {"$shared": ids[text]}
+
+    return [replace(figure) for figure in figures], table
+
+
+def country_year_slider(figure):
+    """The production map with a slider over every year, instead of the dashboard's year callback."""
+    country_frames = visualization.get_dataset("country_frames", visualization.NO_FILTERS)
+    steps = []
+    for year in country_frames.years:
+        frame = visualization.country_frame(year, country_frames)
+        locations = [country_frames.countries[code] for code in frame["codes"]]
+        steps.append({"method": "restyle", "label": str(year),
+                      "args": [{"locations": [locations], "z": [frame["z"]]}, [0]]})
+    # The cached figure shows the first year.
+    figure["layout"]["sliders"] = [{"active": 0, "steps": steps, "currentvalue": {"prefix": "Year: "},
+                                    "pad": {"t": 30}}]
+    return figure
+
+
+# Figures whose dashboard controls are callbacks, and how the report makes them static.
+STATIC_CONTROLS = {"plot_country_production_growth": country_year_slider}
+
+
+def report_key(version, names):
+    keys = f"{REPORT_FORMAT}:" + "".join(figure_cache.figure_key(name, version) for name in names)
+    return hashlib.sha256(keys.encode()).hexdigest()[:16]
+
+
+def existing_key(path):
+    try:
+        with open(path) as f:
+            match = _KEY_PATTERN.search(f.read(4096))
+    except OSError:
+        return None
+    return match and match.group(1)
+
+
+def render_sections(names):
+    parts = []
+    previous_section = None
+    for name in names:
+        section_title, description = dashboard.chart_descriptions.get(name, ("", ""))
+        if section_title and section_title != previous_section:
+            parts.append(f"<h2>{html.escape(section_title)}</h2>")
+            previous_section = section_title
+        parts.append(
+            f'<div class="figure"><h3>{html.escape(name.replace("_", " ").title())}</h3>'
+            f"<p>{html.escape(description)}</p><div id=\"{name}\"></div></div>"
+        )
+    return "\n".join(parts)
+
+
+def render(names, version):
+    figures = [json.loads(figure_cache.load_figure_json(name, version)) for name in names]
+    figures = [STATIC_CONTROLS[name](figure) if name in STATIC_CONTROLS else figure
+               for name, figure in zip(names, figures)]
+    figures, table = share_values(figures)
+    data = {"shared": table, "figures": [{"id": name, "figure": figure} for name, figure in zip(names, figures)]}
+    return PAGE.format(
+        key=report_key(version, names),
+        plotlyjs=plotly.offline.get_plotlyjs(),
+        generated=datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M UTC"),
+        version=version[:12],
+        sections=render_sections(names),
+        # "</" would end the script element early; "<\/" is the same JSON string.
+        data=json.dumps(data, separators=(",", ":")).replace("</", "<\\/"),
+    )
+
+
+def export(path=REPORT_PATH, names=None, workers=None, force=False):
+    """Write the report to ``path``, building the figures that aren't cached; returns a summary."""
+    names = list(names or visualization.plot_functions_order)
+    version = figure_cache.data_version()
+    if not force and existing_key(path) == report_key(version, names):
+        return {"path": path, "written": False, "built": 0}
+
+    start = time.perf_counter()
+    missing = [name for name in names if force or not figure_cache.is_complete(version, [name])]
+    if missing:
+        rebuild.build_all(version, missing, workers)
+    build_seconds = time.perf_counter() - start
+
+    page = render(names, version)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(page)
+    os.replace(tmp_path, path)
+    return {"path": path, "written": True, "built": len(missing), "build_seconds": round(build_seconds, 2),
+            "seconds": round(time.perf_counter() - start, 2), "bytes": len(page.encode())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the dashboard figures as an offline HTML report.")
+    parser.add_argument("names", nargs="*", help="Figures to include (default: all, in dashboard order).")
+    parser.add_argument("--output", default=REPORT_PATH)
+    parser.add_argument("--workers", type=int, help="Build processes (default: one per CPU).")
+    parser.add_argument("--force", action="store_true", help="Rebuild every figure and rewrite the report.")
+    args = parser.parse_args()
+    print(json.dumps(export(args.output, args.names, args.workers, args.force)))
+
+
+if __name__ == "__main__":
+    main()
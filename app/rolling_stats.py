@@ -0,0 +1,180 @@
+"""Streaming daily_return, 30-day volatility and MA30 for the stock table.
+
+These match the columns computed in notebooks/Netflix_Stock.ipynb:
+
+    daily_return = close.pct_change()
+    volatility   = daily_return.rolling(30).std()
+    MA30         = close.rolling(30).mean()
+
+but each new trading day is folded in with an O(1) update of sliding-window
+accumulators instead of recomputing the whole history. A backfill is the same
+sequence of updates, and the state round-trips exactly through JSON, so a
+backfill, a replay and a resumed run all give bit-identical results.
+
+To append new raw price rows to cleaned_Netflix_stocks.csv:
+
+    python app/rolling_stats.py append new_prices.csv
+"""
+import argparse
+import json
+import math
+import os
+from collections import deque
+
+import pandas as pd
+
+import data_store
+import merge_pipeline
+
+WINDOW = 30
+STATE_PATH = os.path.join(data_store.CACHE_DIR, "stock_indicators.json")
+PRICE_COLUMNS = ["date", "open", "high", "low", "close", "adj_close", "volume"]
+
+
+class SlidingWindow:
+    """Mean and sample variance of the last ``size`` values, using a sliding Welford update."""
+
+    def __init__(self, size, values=(), mean=0.0, m2=0.0):
+        self.size = size
+        self.values = deque(values, maxlen=size)
+        self.mean = mean
+        self.m2 = m2
+
+    def push(self, x):
+        if len(self.values) < self.size:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        else:
+            oldest = self.values[0]
+            self.values.append(x)
+            old_mean = self.mean
+            self.mean += (x - oldest) / self.size
+            self.m2 += (x - oldest) * (x - self.mean + oldest - old_mean)
+        # Rounding can push a near-zero M2 slightly negative.
+        self.m2 = max(self.m2, 0.0)
+
+    @property
+    def full(self):
+        return len(self.values) == self.size
+
+    def std(self):
+        return math.sqrt(self.m2 / (self.size - 1)) if self.full else math.nan
+
+    def average(self):
+        return self.mean if self.full else math.nan
+
+    def to_dict(self):
+        return {"values": list(self.values), "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, size, state):
+        return cls(size, state["values"], state["mean"], state["m2"])
+
+
+class RollingIndicators:
+    """Incremental daily_return, volatility (rolling std of returns) and MA30 (rolling mean of closes)."""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.last_close = None
+        self.last_date = None
+        self.closes = SlidingWindow(window)
+        self.returns = SlidingWindow(window)
+
+    def update(self, close, date=None):
+        """Fold in the next trading day's close and return (daily_return, volatility, MA30)."""
+        daily_return = math.nan
+        if self.last_close is not None:
+            daily_return = close / self.last_close - 1
+            self.returns.push(daily_return)
+        self.closes.push(close)
+        self.last_close = close
+        self.last_date = date
+        return daily_return, self.returns.std(), self.closes.average()
+
+    def backfill(self, closes, dates=None):
+        """Replay a price history; returns a DataFrame of the three indicators per row."""
+        dates = list(dates) if dates is not None else [None] * len(closes)
+        rows = [self.update(float(close), date) for close, date in zip(closes, dates)]
+        return pd.DataFrame(rows, columns=["daily_return", "volatility", "MA30"])
+
+    def to_dict(self):
+        return {
+            "window": self.window,
+            "last_close": self.last_close,
+            "last_date": self.last_date,
+            "closes": self.closes.to_dict(),
+            "returns": self.returns.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        indicators = cls(state["window"])
+        indicators.last_close = state["last_close"]
+        indicators.last_date = state["last_date"]
+        indicators.closes = SlidingWindow.from_dict(indicators.window, state["closes"])
+        indicators.returns = SlidingWindow.from_dict(indicators.window, state["returns"])
+        return indicators
+
+
+def save_indicators(indicators, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(indicators.to_dict(), f)
+    os.replace(tmp_path, path)
+
+
+def load_indicators(stocks_path=merge_pipeline.STOCKS_PATH, path=STATE_PATH):
+    """Restore the saved window state, or rebuild it by replaying the whole stock table once."""
+    stocks = pd.read_csv(stocks_path, usecols=["date", "close"])
+    last_date = str(stocks["date"].iloc[-1]) if len(stocks) else None
+    try:
+        with open(path) as f:
+            indicators = RollingIndicators.from_dict(json.load(f))
+        if indicators.last_date == last_date:
+            return indicators
+    except (OSError, ValueError, KeyError):
+        pass
+
+    indicators = RollingIndicators()
+    indicators.backfill(stocks["close"], stocks["date"].astype(str))
+    return indicators
+
+
+def append_prices(new_prices, stocks_path=merge_pipeline.STOCKS_PATH, state_path=STATE_PATH):
+    """Compute indicators for new raw price rows and append them to the stock table.
+
+    Rows on or before the table's last date are skipped. The table is only appended to,
+    so the merge pipeline can pick the new rows up incrementally.
+    """
+    indicators = load_indicators(stocks_path, state_path)
+    new_prices = new_prices[PRICE_COLUMNS].copy()
+    new_prices["date"] = pd.to_datetime(new_prices["date"]).dt.strftime("%Y-%m-%d")
+    new_prices = new_prices.sort_values("date", kind="stable").drop_duplicates("date", keep="last")
+    if indicators.last_date is not None:
+        new_prices = new_prices[new_prices["date"] > indicators.last_date]
+
+    computed = indicators.backfill(new_prices["close"], new_prices["date"])
+    rows = pd.concat([new_prices.reset_index(drop=True), computed], axis=1)
+    with open(stocks_path, "a", newline="") as f:
+        rows.to_csv(f, header=False, index=False)
+    save_indicators(indicators, state_path)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the stock table's rolling indicators.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    append_parser = subparsers.add_parser("append", help="Append raw price rows (date, open, high, low, close, adj_close, volume).")
+    append_parser.add_argument("prices", help="CSV of new trading days.")
+    args = parser.parse_args()
+
+    rows = append_prices(pd.read_csv(args.prices))
+    print(f"Appended {len(rows)} trading day(s) to {merge_pipeline.STOCKS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
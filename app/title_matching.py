@@ -0,0 +1,228 @@
+"""Match titles between two catalogues by normalized title, release year and type.
+
+Titles are reduced to keys: accents and case are folded, "&" becomes "and",
+and punctuation is dropped. A title whose key appears in the other catalogue is
+matched on it, whatever the release years. The rest are only compared with
+titles sharing a block: a word of their key, or two adjacent words. Blocks are
+looked up in an inverted index, so the comparisons grow with the number of titles
+rather than with the product of the two catalogues. Blocks of more than
+MAX_BLOCK_SIZE titles ("the", "love") are too common to narrow anything down and
+are left out of the index; in a large catalogue most single words are, and the
+word pairs ("love actually") do the blocking. A compared pair is
+scored by the Jaccard similarity of the character trigrams of the keys. It is
+accepted at MIN_SIMILARITY or more, if both keys have the same numbers (so
+sequels stay apart) and the release years are at most MAX_YEAR_GAP apart. Keys
+that differ by whole words ("the haunted house", "haunted house") are more
+often different titles of a franchise, and need the same release year or
+WORD_SIMILARITY. Exact matches may be up to MAX_EXACT_YEAR_GAP years apart, and
+a show of the left catalogue any number of years after its match: the Netflix
+catalogue dates a show by its latest season and IMDb by its first.
+
+Each title gets its best candidate: the highest similarity, then the same type,
+then the closest release year (the first in the other catalogue on a full tie).
+
+    python app/title_matching.py                 # match rate and throughput on the cleaned inputs
+    python app/title_matching.py --scale 100     # on the inputs repeated 100 times
+"""
+import argparse
+import json
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import data_store
+
+DATA_DIR = os.path.join(data_store.BASE_DIR, "../data")
+IMDB_PATH = os.path.join(DATA_DIR, "cleaned_Netflix_IMDB.csv")
+SHOWS_PATH = os.path.join(DATA_DIR, "cleaned_Netflix_Shows.csv")
+
+NGRAM = 3
+MIN_SIMILARITY = 0.75
+MAX_YEAR_GAP = 1
+MAX_EXACT_YEAR_GAP = 3
+WORD_SIMILARITY = 0.9
+MAX_BLOCK_SIZE = 50
+
+TITLE_COLUMNS = ["title", "type", "release_year"]
+
+Matches = namedtuple("Matches", ["pairs", "compared"])
+
+
+def normalize_titles(titles):
+    """Matching keys of ``titles``; NaN where nothing but punctuation is left."""
+    keys = (pd.Series(titles, dtype=object)
+            .str.normalize("NFKD")
+            .str.replace(r"[\u0300-\u036f]", "", regex=True)
+            .str.casefold()
+            .str.replace("&", " and ", regex=False)
+            .str.replace(r"[\W_]+", " ", regex=True)
+            .str.strip())
+    return keys.mask(keys == "").astype(object)
+
+
+def _ngram_matrix(keys):
+    """Binary (key, trigram) matrix of ``keys``, padded so short words still have trigrams."""
+    padded = [f" {key} " for key in keys]
+    lengths = np.fromiter(map(len, padded), dtype=np.int64, count=len(padded))
+    chars = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    # Each trigram packed into one integer: three code points of at most 21 bits.
+    counts = lengths - NGRAM + 1
+    firsts = np.cumsum(counts) - counts
+    positions = np.arange(counts.sum()) + np.repeat(np.cumsum(lengths) - lengths - firsts, counts)
+    grams = np.zeros(len(positions), dtype=np.uint64)
+    for offset in range(NGRAM):
+        grams = (grams << np.uint64(21)) | chars[positions + offset]
+    grams = pd.DataFrame({"key": np.repeat(np.arange(len(keys)), counts), "gram": grams}).drop_duplicates()
+    columns, vocabulary = pd.factorize(grams["gram"])
+    return sp.csr_matrix((np.ones(len(grams), dtype=np.float32), (grams["key"].to_numpy(), columns)),
+                         shape=(len(keys), len(vocabulary)))
+
+
+def similarities(left_keys, right_keys, left, right):
+    """Trigram Jaccard similarity of each pair ``(left_keys[left[i]], right_keys[right[i]])``."""
+    # Only the keys in some pair need their trigrams.
+    left_used, left = np.unique(left, return_inverse=True)
+    right_used, right = np.unique(right, return_inverse=True)
+    keys = np.concatenate([np.asarray(left_keys, dtype=object)[left_used],
+                           np.asarray(right_keys, dtype=object)[right_used]])
+    grams = _ngram_matrix(keys)
+    right = right + len(left_used)
+    shared = np.asarray(grams[left].multiply(grams[right]).sum(axis=1)).ravel()
+    sizes = np.diff(grams.indptr)
+    return shared / (sizes[left] + sizes[right] - shared)
+
+
+def _blocks(keys):
+    """(key position, block hash) for every distinct word and adjacent word pair of each key."""
+    words = pd.Series(keys).str.split()
+    blocks = (words + words.map(lambda w: [f"{a} {b}" for a, b in zip(w, w[1:])])).explode().dropna()
+    # A hash collision only adds a candidate pair; the strings would take far more memory.
+    frame = pd.DataFrame({"key": blocks.index.to_numpy(), "block": pd.util.hash_array(blocks.to_numpy())})
+    return frame.drop_duplicates()
+
+
+def candidate_pairs(left_keys, right_keys):
+    """Positions (left, right) of the key pairs to compare, and whether each is an exact match."""
+    right_index = pd.Index(right_keys)
+    exact_right = right_index.get_indexer(left_keys)
+    exact = exact_right >= 0
+
+    # Inverted index of the right keys' blocks, without the ones too large to be useful.
+    right_blocks = _blocks(right_keys)
+    block_sizes = right_blocks["block"].value_counts()
+    right_blocks = right_blocks[right_blocks["block"].map(block_sizes) <= MAX_BLOCK_SIZE]
+    left_blocks = _blocks(np.asarray(left_keys, dtype=object)[~exact])
+    left_blocks["key"] = np.flatnonzero(~exact)[left_blocks["key"].to_numpy()]
+    blocked = left_blocks.merge(right_blocks, on="block", suffixes=("_left", "_right"))
+    blocked = blocked[["key_left", "key_right"]].drop_duplicates()
+
+    left = np.concatenate([np.flatnonzero(exact), blocked["key_left"].to_numpy()])
+    right = np.concatenate([exact_right[exact], blocked["key_right"].to_numpy()])
+    return left, right, np.arange(len(left)) < exact.sum()
+
+
+def _numbers(keys):
+    return pd.Series(keys).str.findall(r"\d+").map(" ".join).to_numpy()
+
+
+def _word_difference(left_keys, right_keys):
+    """Whether one key of each pair is the other with whole words added."""
+    return np.fromiter((a != b and (a <= b or b <= a) for a, b in
+                        zip(map(set, pd.Series(left_keys).str.split()), map(set, pd.Series(right_keys).str.split()))),
+                       dtype=bool, count=len(left_keys))
+
+
+def match_titles(left, right):
+    """Best match in ``right`` for each row of ``left``; both have title, type and release_year.
+
+    Returns Matches: ``pairs`` has one row per matched left row (left and right
+    positions, similarity, whether the keys are equal), ``compared`` the number
+    of key pairs scored.
+    """
+    left_keys = normalize_titles(left["title"].to_numpy())
+    right_keys = normalize_titles(right["title"].to_numpy())
+    left_codes, left_unique = pd.factorize(left_keys)
+    right_codes, right_unique = pd.factorize(right_keys)
+
+    key_left, key_right, exact = candidate_pairs(left_unique, right_unique)
+    similarity = np.ones(len(key_left))
+    fuzzy = ~exact
+    similarity[fuzzy] = similarities(left_unique, right_unique, key_left[fuzzy], key_right[fuzzy])
+    compared = len(key_left)
+    keep = (similarity >= MIN_SIMILARITY) & (_numbers(left_unique)[key_left] == _numbers(right_unique)[key_right])
+    key_left, key_right, similarity, exact = key_left[keep], key_right[keep], similarity[keep], exact[keep]
+    words = np.zeros(len(key_left), dtype=bool)
+    words[~exact] = _word_difference(left_unique[key_left[~exact]], right_unique[key_right[~exact]])
+    key_pairs = pd.DataFrame({"left_key": key_left, "right_key": key_right, "similarity": similarity,
+                              "exact": exact, "words": words & (similarity < WORD_SIMILARITY)})
+
+    # Expand the key pairs to the rows carrying those keys.
+    left_rows = pd.DataFrame({"left_key": left_codes, "left": np.arange(len(left)),
+                              "left_type": left["type"].to_numpy(), "left_year": left["release_year"].to_numpy()})
+    right_rows = pd.DataFrame({"right_key": right_codes, "right": np.arange(len(right)),
+                               "right_type": right["type"].to_numpy(), "right_year": right["release_year"].to_numpy()})
+    pairs = (left_rows[left_codes >= 0].merge(key_pairs, on="left_key")
+             .merge(right_rows[right_codes >= 0], on="right_key"))
+
+    signed_gap = (pairs["left_year"] - pairs["right_year"]).to_numpy(dtype=float)
+    year_gap = np.abs(signed_gap)
+    max_gap = np.where(pairs["exact"], MAX_EXACT_YEAR_GAP, np.where(pairs["words"], 0, MAX_YEAR_GAP))
+    later_season = pairs["exact"].to_numpy() & (signed_gap > 0) & (pairs["left_type"] == "SHOW").to_numpy() \
+        & (pairs["right_type"] == "SHOW").to_numpy()
+    keep = ~(year_gap > max_gap) | later_season
+    pairs = pairs[keep].assign(year_gap=year_gap[keep])
+    different_type = (pairs["left_type"] != pairs["right_type"]).to_numpy()
+    # Unknown years rank after every known gap.
+    order = np.lexsort((pairs["right"].to_numpy(), np.nan_to_num(pairs["year_gap"].to_numpy(), nan=np.inf),
+                        different_type, -pairs["similarity"].to_numpy(), pairs["left"].to_numpy()))
+    best = pairs.iloc[order].drop_duplicates("left")
+    best = best[["left", "right", "similarity", "exact"]].reset_index(drop=True)
+    return Matches(best, compared)
+
+
+def match_report(matches, titles, seconds):
+    return {
+        "titles": titles,
+        "matched": len(matches.pairs),
+        "match_rate": round(len(matches.pairs) / titles, 4) if titles else None,
+        "exact": int(matches.pairs["exact"].sum()),
+        "compared": matches.compared,
+        "seconds": round(seconds, 3),
+        "titles_per_second": round(titles / seconds) if seconds else None,
+    }
+
+
+def title_table(df):
+    """Title, type (MOVIE/SHOW) and release year of a cleaned catalogue, in its row order."""
+    return pd.DataFrame({
+        "title": df["title"].to_numpy(),
+        "type": df["type"].str.upper().replace({"TV SHOW": "SHOW"}).to_numpy(),
+        "release_year": pd.to_numeric(df["release_year"], errors="coerce").to_numpy(),
+    })
+
+
+def _repeat(titles, scale):
+    """``titles`` ``scale`` times, each copy's titles suffixed as in benchmarks/synthetic.py."""
+    copies = [titles.assign(title=titles["title"].astype(str) + (f" #{copy}" if copy else ""))
+              for copy in range(scale)]
+    return pd.concat(copies, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match the Netflix catalogue to the IMDb titles.")
+    parser.add_argument("--scale", type=int, default=1, help="Repeat both catalogues this many times.")
+    args = parser.parse_args()
+
+    shows = _repeat(title_table(pd.read_csv(SHOWS_PATH)), args.scale)
+    imdb = _repeat(title_table(pd.read_csv(IMDB_PATH)), args.scale)
+    start = time.perf_counter()
+    matches = match_titles(shows, imdb)
+    print(json.dumps(match_report(matches, len(shows), time.perf_counter() - start)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,274 @@
+import functools
+import inspect
+from collections import namedtuple
+
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from sklearn.linear_model import LinearRegression
 import numpy as np
-import os
+import data_store
+import metrics
+import regression
+from downsample import downsample
+from event_study import event_study
+
+# Datasets and figures are registered by name and only computed on first use,
+# so importing this module does no data work.
+DATASETS = {}
+FIGURES = {}
+
+# Filtered datasets are memoized per distinct Filters value, up to this many each.
+DATASET_CACHE_SIZE = 64
+
+FigureSpec = namedtuple("FigureSpec", ["name", "inputs", "build"])
+
+# Global dashboard filters. Empty tuples (and a None year range) mean "everything".
+Filters = namedtuple("Filters", ["year_range", "types", "genres", "countries"])
+NO_FILTERS = Filters(None, (), (), ())
+
+
+# What makes a title a hit: at least this IMDb score and this many votes.
+HitThreshold = namedtuple("HitThreshold", ["score", "votes"])
+DEFAULT_HIT = HitThreshold(8.0, 100000)
+
+# Values the hit sliders can take; thresholds are snapped down onto them.
+HIT_SCORE_STEPS = np.round(np.arange(5.0, 10.0, 0.1), 1)
+HIT_VOTE_STEPS = np.array([0, 1000, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000, 2000000])
+
+# Eras compared by the quality vs. volatility chart, as (after, before) release-date
+# bounds (exclusive; None is open-ended). The default is before 2010 vs. after 2015.
+DEFAULT_ERAS = ((None, "2010"), ("2015", None))
+
+# Options a figure's build() forwards to the datasets with a parameter of that name.
+DATASET_OPTIONS = {"hit_threshold": DEFAULT_HIT, "eras": DEFAULT_ERAS}
+
+
+def make_filters(year_range=None, types=(), genres=(), countries=()):
+    """Normalize filter values (e.g. from Dash components) into a hashable Filters."""
+    return Filters(
+        tuple(int(year) for year in year_range) if year_range else None,
+        tuple(sorted(types or ())),
+        tuple(sorted(genres or ())),
+        tuple(sorted(countries or ())),
+    )
+
+
+def make_hit_threshold(score=DEFAULT_HIT.score, votes=DEFAULT_HIT.votes):
+    """Snap slider values down onto HIT_SCORE_STEPS and HIT_VOTE_STEPS as a hashable HitThreshold."""
+    score_bin = max(np.searchsorted(HIT_SCORE_STEPS, score + 1e-9, side="right") - 1, 0)
+    vote_bin = max(np.searchsorted(HIT_VOTE_STEPS, votes, side="right") - 1, 0)
+    return HitThreshold(float(HIT_SCORE_STEPS[score_bin]), int(HIT_VOTE_STEPS[vote_bin]))
+
+
+def make_eras(early_end, recent_start):
+    """Two eras: released before ``early_end`` and after ``recent_start`` (years)."""
+    return ((None, str(int(early_end))), (str(int(recent_start)), None))
+
+
+def dataset(func):
+    """Register a memoized dataset builder under its function name."""
+    cached = functools.lru_cache(maxsize=DATASET_CACHE_SIZE)(func)
+    DATASETS[func.__name__] = cached
+    return cached
+
+
+def reset_datasets():
+    """Forget every memoized dataset, so they are rebuilt from the current data files."""
+    for cached in DATASETS.values():
+        cached.cache_clear()
+
+
+def get_dataset(name, *args):
+    return DATASETS[name](*args)
+
+
+def dataset_options(name):
+    """The DATASET_OPTIONS that dataset ``name`` takes, in parameter order."""
+    return [param for param in inspect.signature(DATASETS[name]).parameters if param in DATASET_OPTIONS]
+
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_PATH = os.path.join(BASE_DIR, "../data/netflix_final_merged.csv")
+def figure(*inputs):
+    """Register a plot function whose arguments are the named datasets.
 
-df = pd.read_csv(DATA_PATH)
-df["release_date"] = pd.to_datetime(df["release_date"])
-df["year"] = df["release_date"].dt.year
+    The datasets are built for the ``filters`` passed to the figure, plus any
+    DATASET_OPTIONS (e.g. ``hit_threshold``) they take. Any input passed explicitly by
+    keyword is used as-is instead of the shared dataset; other keyword arguments are
+    passed through to the plot function.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def build(filters=NO_FILTERS, **kwargs):
+            with metrics.measure_figure(func.__name__):
+                options = {name: kwargs.pop(name, default) for name, default in DATASET_OPTIONS.items()}
+                for name in inputs:
+                    if name not in kwargs:
+                        kwargs[name] = get_dataset(name, filters, *(options[option] for option in dataset_options(name)))
+                return func(**kwargs)
+
+        FIGURES[func.__name__] = FigureSpec(func.__name__, inputs, build)
+        return build
+
+    return decorator
+
+
+@dataset
+def df():
+    # Only the stock columns the charts use are joined onto the titles.
+    df = data_store.load_merged(price_columns=["close", "volatility"])
+    df["year"] = df["release_date"].dt.year
+    df["high_quality"] = df["imdb_score"] >= 7.5
+    df["genres"] = df["genres"].astype(str).str.lower().str.replace("dramas", "drama").str.replace("comedies", "comedy")
+    return df
+
+# Multi-label columns (genres, country) are comma-joined strings. Each distinct
+# combination gets an integer code, and a LabelIndex stores the label codes of every
+# combination in CSR form: combination i has labels codes[offsets[i]:offsets[i + 1]].
+LabelIndex = namedtuple("LabelIndex", ["labels", "combos", "codes", "offsets"])
+
+def label_index(values):
+    """Factorize comma-joined label strings into (per-value combination codes, LabelIndex)."""
+    combo_codes, combos = pd.factorize(values)
+    combos = np.asarray(combos, dtype=object)
+    parts = pd.Series(combos, dtype=object).str.split(", ")
+    codes, labels = pd.factorize(parts.explode().to_numpy(dtype=object), sort=True)
+    offsets = np.zeros(len(combos) + 1, dtype=np.int64)
+    np.cumsum(parts.str.len().to_numpy(dtype=np.int64), out=offsets[1:])
+    return combo_codes, LabelIndex(list(labels), combos, codes.astype(np.int32), offsets)
+
+def combos_with_any(index, label_mask):
+    """Boolean per combination: does it contain any label for which ``label_mask`` is True?"""
+    entry_combos = np.repeat(np.arange(len(index.combos)), np.diff(index.offsets))
+    return np.bincount(entry_combos[label_mask[index.codes]], minlength=len(index.combos)) > 0
+
+def label_counts(index, combo_codes, weights, groups, n_groups):
+    """Sum ``weights`` into an n_groups x labels matrix, once for each label of each row's combination."""
+    lengths = np.diff(index.offsets)[combo_codes]
+    rows = np.repeat(np.arange(len(combo_codes)), lengths)
+    within = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    labels = index.codes[index.offsets[combo_codes][rows] + within]
+    n_labels = len(index.labels)
+    counts = np.bincount(groups[rows] * n_labels + labels, weights=weights[rows], minlength=n_groups * n_labels)
+    return counts.reshape(n_groups, n_labels)
+
+Cube = namedtuple("Cube", ["cells", "dated", "genres", "countries"])
+
+CELL_KEYS = ["year", "type", "genre_combo", "country_combo"]
+
+@dataset
+def cube():
+    """Titles pre-aggregated by release year, type, genre combination and country combination.
+
+    Every chart is a rollup of these cells, and filters only ever scan the cells,
+    never the title rows; their number is bounded by the years and combinations,
+    not by the titles. ``dated`` splits each cell by release date, for the charts
+    that need finer time detail: its ``cell`` column is the row of the cell in
+    ``cells``, and its stock columns come from the as-of join on ``release_date``,
+    so ``close`` and ``volatility`` are constant within a row. ``genres`` and
+    ``countries`` are the LabelIndexes behind the cells' combination codes.
+    """
+    df = get_dataset("df")
+    genre_combo, genres = label_index(df["genres"])
+    country_combo, countries = label_index(df["country"].astype(str))
+
+    dated = df.assign(genre_combo=genre_combo, country_combo=country_combo).groupby(
+        [*CELL_KEYS, "release_date"], observed=True
+    ).agg(
+        titles=("title", "size"),
+        score_sum=("imdb_score", "sum"),
+        score_count=("imdb_score", "count"),
+        high_quality=("high_quality", "sum"),
+        close=("close", "first"),
+        volatility=("volatility", "first"),
+    ).reset_index()
+    dated["type"] = dated["type"].astype(str)
+    dated["cell"] = dated.groupby(CELL_KEYS, sort=False, observed=True).ngroup()
+
+    grouped = dated.assign(
+        close_sum=dated["close"] * dated["titles"],
+        volatility_sum=dated["volatility"] * dated["titles"],
+    ).groupby("cell")
+    cells = grouped[CELL_KEYS].first().join(
+        grouped[["titles", "score_sum", "score_count", "high_quality", "close_sum", "volatility_sum"]].sum()
+    ).reset_index(drop=True)
+    dated = dated[["cell", "year", "release_date", "titles", "score_sum", "score_count", "high_quality",
+                   "close", "volatility"]]
+
+    return Cube(cells, dated, genres, countries)
+
+def filter_mask(frame, filters):
+    """Boolean mask of the rows of ``frame`` (cube cells or titles with combo codes) matching ``filters``."""
+    cube = get_dataset("cube")
+    mask = np.ones(len(frame), dtype=bool)
+    if filters.year_range:
+        mask &= frame["year"].between(*filters.year_range).to_numpy()
+    if filters.types:
+        mask &= frame["type"].isin(filters.types).to_numpy()
+    if filters.genres:
+        selected = combos_with_any(cube.genres, np.isin(cube.genres.labels, filters.genres))
+        mask &= selected[frame["genre_combo"].to_numpy()]
+    if filters.countries:
+        selected = combos_with_any(cube.countries, np.isin(cube.countries.labels, filters.countries))
+        mask &= selected[frame["country_combo"].to_numpy()]
+    return mask
+
+@dataset
+def cube_slice(filters):
+    cells = get_dataset("cube").cells
+    if filters == NO_FILTERS:
+        return cells
+    return cells[filter_mask(cells, filters)]
+
+@dataset
+def dated_slice(filters):
+    """The cube's ``dated`` rows of the cells matching ``filters``."""
+    cube = get_dataset("cube")
+    if filters == NO_FILTERS:
+        return cube.dated
+    return cube.dated[filter_mask(cube.cells, filters)[cube.dated["cell"].to_numpy()]]
+
+def label_counts_by_year(cells, combo_column, index):
+    """Titles per (year, label), as a years x labels frame, from cells of label combinations."""
+    grouped = cells.groupby(["year", combo_column])["titles"].sum()
+    years, year_codes = np.unique(grouped.index.get_level_values("year"), return_inverse=True)
+    counts = label_counts(index, grouped.index.get_level_values(combo_column).to_numpy(),
+                          grouped.to_numpy(), year_codes, len(years))
+    return pd.DataFrame(counts.astype(np.int64), index=pd.Index(years, name="year"),
+                        columns=pd.Index(index.labels))
+
+def weighted_median(values, weights):
+    """Median of ``values`` with each value repeated ``weights`` times."""
+    order = np.argsort(values, kind="stable")
+    values = values[order]
+    cumulative = np.cumsum(weights[order])
+    total = cumulative[-1]
+    lower = values[np.searchsorted(cumulative, (total - 1) // 2, side="right")]
+    upper = values[np.searchsorted(cumulative, total // 2, side="right")]
+    return (lower + upper) / 2
+
+@dataset
+def yearly(filters):
+    yearly = get_dataset("cube_slice", filters).groupby("year")[
+        ["titles", "score_sum", "score_count", "high_quality", "close_sum"]
+    ].sum().reset_index()
+    yearly["imdb_score"] = yearly["score_sum"] / yearly["score_count"]
+    yearly["high_quality_ratio"] = yearly["high_quality"] / yearly["titles"]
+    yearly["close"] = yearly["close_sum"] / yearly["titles"]
+    return yearly
+
+@dataset
+def yearly_by_type(filters):
+    yearly_by_type = get_dataset("cube_slice", filters).groupby(["year", "type"])[
+        ["titles", "score_sum", "score_count"]
+    ].sum().reset_index()
+    yearly_by_type["count"] = yearly_by_type["titles"]
+    yearly_by_type["imdb_score"] = yearly_by_type["score_sum"] / yearly_by_type["score_count"]
+    return yearly_by_type
 
 ### 1. Netflix IMDb Score Trend Over Time**
-def plot_imdb_score_trend():
-    fig = px.line(df.groupby('year')['imdb_score'].mean().reset_index(),
+@figure("yearly")
+def plot_imdb_score_trend(yearly):
+    fig = px.line(yearly[['year', 'imdb_score']],
                   x='year', y='imdb_score',
                   title="Netflix IMDb Score Trend Over Time",
                   labels={"imdb_score": "Average IMDb Score", "year": "Year"},
@@ -35,9 +288,9 @@ def plot_imdb_score_trend():
     return fig
 
 ### 2. High-Quality Content Proportion Over Time**
-df['high_quality'] = df['imdb_score'] >= 7.5
-def plot_high_quality_proportion():
-    df_quality = df.groupby('year')['high_quality'].mean().reset_index()
+@figure("yearly")
+def plot_high_quality_proportion(yearly):
+    df_quality = yearly[['year', 'high_quality_ratio']].rename(columns={'high_quality_ratio': 'high_quality'})
 
     fig = go.Figure()
 
@@ -74,8 +327,9 @@ def plot_high_quality_proportion():
     return fig
 
 ### 3. Movie vs. TV Show Production Trend**
-def plot_movie_vs_tv_production():
-    df_type = df.groupby(['year', 'type']).size().reset_index(name='count')
+@figure("yearly_by_type")
+def plot_movie_vs_tv_production(yearly_by_type):
+    df_type = yearly_by_type[['year', 'type', 'count']]
 
     fig = px.line(df_type, x='year', y='count', color='type',
                   title="Movie vs. TV Show Production Trend",
@@ -101,8 +355,9 @@ def plot_movie_vs_tv_production():
     return fig
 
 ### 4. Movie vs. TV Show IMDb Score Trend**
-def plot_movie_vs_tv_imdb():
-    df_score = df.groupby(['year', 'type'])['imdb_score'].mean().reset_index()
+@figure("yearly_by_type")
+def plot_movie_vs_tv_imdb(yearly_by_type):
+    df_score = yearly_by_type[['year', 'type', 'imdb_score']]
 
     fig = px.line(df_score, x='year', y='imdb_score', color='type',
                   title="Movie vs. TV Show IMDb Score Trend",
@@ -121,46 +376,92 @@ def plot_movie_vs_tv_imdb():
     return fig
 
 ### 5. Netflix Content Releases & Stock Price Over Time**
-df_stock = df.groupby('year').agg({'close': 'mean', 'title': 'count'}).reset_index()
-df_stock['high_quality_ratio'] = df.groupby('year')['high_quality'].sum().reset_index(drop=True) / df_stock['title']
-
-def plot_stock_vs_releases():
-    df_stock['price_change'] = df_stock['close'].pct_change() * 100
-    df_stock['price_change'] = df_stock['price_change'].rolling(window=5, min_periods=2).mean()
-    df_stock['price_change'] = df_stock['price_change'].fillna(0)
-
+# Levels of the time aggregation pyramids, finest first, as pandas period frequencies.
+TIME_LEVELS = {"day": "D", "week": "W", "month": "M", "quarter": "Q", "year": "Y"}
+# Hover date format of the x axis at each level.
+LEVEL_HOVER_FORMATS = {"day": "%b %d, %Y", "week": "%b %d, %Y", "month": "%b %Y", "quarter": "%b %Y", "year": "%Y"}
+
+def zoom_level(pyramid, x_range, points):
+    """The finest level of ``pyramid`` with at most ``points`` rows in ``x_range``, and those rows.
+
+    One row either side of the range is kept, so lines run on to the plot edges.
+    """
+    start, end = (pd.Timestamp(bound) for bound in x_range)
+    for level in TIME_LEVELS:
+        frame = pyramid[level]
+        first = frame["date"].searchsorted(start, side="left")
+        last = frame["date"].searchsorted(end, side="right")
+        if last - first <= points or level == "year":
+            return level, frame.iloc[max(first - 1, 0):last + 1]
+
+def release_stock_changes(frame):
+    frame['high_quality_ratio'] = frame['high_quality'] / frame['title'] * 100
+    frame['high_quality_ratio'] = frame['high_quality_ratio'].fillna(0)
+
+    frame['price_change'] = frame['close'].pct_change() * 100
+    frame['price_change'] = frame['price_change'].rolling(window=5, min_periods=2).mean()
+    frame['price_change'] = frame['price_change'].fillna(0)
+    return frame
+
+@dataset
+def release_pyramid(filters):
+    """Releases, high-quality releases and the title-weighted close, per period at every TIME_LEVELS level.
+
+    Only periods with releases get a row; ``date`` is the start of the period.
+    """
+    cells = get_dataset("dated_slice", filters)
+    cells = cells.assign(close_sum=cells["close"] * cells["titles"])
+    pyramid = {}
+    for level, freq in TIME_LEVELS.items():
+        periods = cells.groupby(cells["release_date"].dt.to_period(freq))[["titles", "high_quality", "close_sum"]].sum()
+        pyramid[level] = release_stock_changes(pd.DataFrame({
+            "date": periods.index.to_timestamp(how="start"),
+            "close": (periods["close_sum"] / periods["titles"]).to_numpy(),
+            "title": periods["titles"].to_numpy(),
+            "high_quality": periods["high_quality"].to_numpy(),
+        }))
+    return pyramid
+
+@dataset
+def df_stock(filters):
+    df_stock = get_dataset("release_pyramid", filters)["year"].copy()
+    df_stock.insert(0, "year", df_stock["date"].dt.year)
+    return df_stock
+
+@figure("df_stock")
+def plot_stock_vs_releases(df_stock):
     fig = go.Figure()
 
     fig.add_trace(go.Scatter(
-        x=df_stock['year'], y=df_stock['close'],
+        x=df_stock['date'], y=df_stock['close'],
         mode='lines',
         name='Stock Price',
         line=dict(color='#E50914', width=2),
-        hovertemplate='Year: %{x}<br>Stock Price: %{y:.2f} USD'
+        hovertemplate='Date: %{x}<br>Stock Price: %{y:.2f} USD'
     ))
 
     fig.add_trace(go.Scatter(
-        x=df_stock['year'], y=df_stock['title'],
+        x=df_stock['date'], y=df_stock['title'],
         mode='lines',
         name='Content Releases',
         line=dict(color='white', dash='dash'),
         yaxis='y2',
-        hovertemplate='Year: %{x}<br>Content Releases: %{y}'
+        hovertemplate='Date: %{x}<br>Content Releases: %{y}'
     ))
 
     fig.add_trace(go.Scatter(
-        x=df_stock['year'], y=df_stock['price_change'],
+        x=df_stock['date'], y=df_stock['price_change'],
         mode='lines+markers',
         name='Stock Price Change (%)',
         line=dict(color='orange', width=2),
         yaxis='y2',
-        hovertemplate='Year: %{x}<br>Stock Change: %{y:.2f}%'
+        hovertemplate='Date: %{x}<br>Stock Change: %{y:.2f}%'
     ))
 
     fig.update_layout(
         title="Netflix Content Releases & Stock Price Over Time",
         title_font=dict(size=18, color="white"),
-        xaxis_title="Year",
+        xaxis=dict(title="Year", hoverformat="%Y"),
         yaxis=dict(title="Stock Price (USD)", side="left", tickfont=dict(color="white")),
         yaxis2=dict(title="Content Releases & Stock Price Change (%)", overlaying='y', side="right", tickfont=dict(color="white")),
 
@@ -182,20 +483,8 @@ def plot_stock_vs_releases():
     return fig
 
 ### 6. High-Quality Content & Stock Price Over Time**
-df['high_quality'] = df['imdb_score'] >= 7.5
-
-df_stock = df.groupby('year').agg(
-    {'close': 'mean', 'title': 'count', 'high_quality': 'sum'}
-).reset_index()
-
-df_stock['high_quality_ratio'] = df_stock['high_quality'] / df_stock['title'] * 100
-df_stock['price_change'] = df_stock['close'].pct_change().fillna(0) * 100
-df_stock['price_change'] = df_stock['price_change'].rolling(window=5, min_periods=2).mean()
-
-df_stock['high_quality_ratio'] = df_stock['high_quality_ratio'].fillna(0)
-df_stock['price_change'] = df_stock['price_change'].fillna(0)
-
-def plot_stock_vs_quality():
+@figure("df_stock")
+def plot_stock_vs_quality(df_stock):
     fig = go.Figure()
 
     fig.add_trace(go.Scatter(
@@ -253,66 +542,99 @@ def plot_stock_vs_quality():
     return fig
 
 ### 7. Impact of IMDb Score on Stock Volatility**
-df["release_date"] = pd.to_datetime(df["release_date"])
-
-df_early = df[df["release_date"] < "2010"].copy()
-df_recent = df[df["release_date"] > "2015"].copy()
-
-df_early = df_early.set_index("release_date").resample("QE")[["imdb_score", "volatility"]].mean().reset_index()
-df_recent = df_recent.set_index("release_date").resample("QE")[["imdb_score", "volatility"]].mean().reset_index()
-
-def fit_trendline(df, x_col, y_col):
-    df = df.dropna(subset=[x_col, y_col]).copy()
-    X = df[[x_col]]
-    y = df[y_col]
-
-    if len(X) > 1 and len(y) > 1:
-        model = LinearRegression().fit(X, y)
-        df.loc[:, "trendline"] = model.predict(X)
-    else:
-        df.loc[:, "trendline"] = np.nan
-
-    return df
-
-df_early = fit_trendline(df_early, "imdb_score", "volatility")
-df_recent = fit_trendline(df_recent, "imdb_score", "volatility")
-
-corr_early = df_early["imdb_score"].corr(df_early["volatility"])
-corr_recent = df_recent["imdb_score"].corr(df_recent["volatility"])
-
-def plot_quality_vs_stock_volatility():
-    fig = make_subplots(rows=1, cols=2, subplot_titles=(
-        f"Early Years (<2010): Corr={corr_early:.2f}", 
-        f"Recent Years (>2015): Corr={corr_recent:.2f}"
-    ))
-
-    fig.add_trace(go.Scatter(
-        x=df_early["imdb_score"], 
-        y=df_early["volatility"], 
-        mode='markers', name="Early Years",
-        marker=dict(color="#FF4C4C", size=8, opacity=0.8)
-    ), row=1, col=1)
-
-    fig.add_trace(go.Scatter(
-        x=df_early["imdb_score"], 
-        y=df_early["trendline"], 
-        mode='lines', name="Trend (Early)", 
-        line=dict(color="#FFAA4C", width=2)
-    ), row=1, col=1)
-
-    fig.add_trace(go.Scatter(
-        x=df_recent["imdb_score"], 
-        y=df_recent["volatility"], 
-        mode='markers', name="Recent Years",
-        marker=dict(color="#E50914", size=8, opacity=0.8)
-    ), row=1, col=2)
-
-    fig.add_trace(go.Scatter(
-        x=df_recent["imdb_score"], 
-        y=df_recent["trendline"], 
-        mode='lines', name="Trend (Recent)", 
-        line=dict(color="#FFC14C", width=2)
-    ), row=1, col=2)
+def quarterly_quality_volatility(cells):
+    cells = cells.assign(volatility_sum=cells["volatility"] * cells["titles"])
+    quarterly = cells.set_index("release_date").resample("QE")[
+        ["score_sum", "score_count", "volatility_sum", "titles"]
+    ].sum()
+    df = pd.DataFrame({
+        "release_date": quarterly.index,
+        "imdb_score": (quarterly["score_sum"] / quarterly["score_count"]).to_numpy(),
+        "volatility": (quarterly["volatility_sum"] / quarterly["titles"]).to_numpy(),
+    })
+    return df.dropna(subset=["imdb_score", "volatility"]).reset_index(drop=True)
+
+def era_mask(cells, era):
+    after, before = era
+    mask = np.ones(len(cells), dtype=bool)
+    if after is not None:
+        mask &= (cells["release_date"] > after).to_numpy()
+    if before is not None:
+        mask &= (cells["release_date"] < before).to_numpy()
+    return mask
+
+def era_label(era):
+    after, before = era
+    if after is None:
+        return f"<{before}"
+    if before is None:
+        return f">{after}"
+    return f"{after}-{before}"
+
+EraFit = namedtuple("EraFit", ["era", "points", "slope", "intercept", "pearson", "pearson_interval"])
+
+# Bootstrap samples behind the correlation intervals; 0 turns them off.
+ERA_BOOTSTRAP_SAMPLES = 1000
+
+@dataset
+def quality_volatility_eras(filters, eras=DEFAULT_ERAS):
+    """Quarterly IMDb score vs. stock volatility per era, with every era's trendline fitted in one pass."""
+    cells = get_dataset("dated_slice", filters)
+    frames = [quarterly_quality_volatility(cells[era_mask(cells, era)]) for era in eras]
+    offsets = np.concatenate([[0], np.cumsum([len(frame) for frame in frames])])
+    points = pd.concat(frames, ignore_index=True)
+    fits = regression.segment_fits(points["imdb_score"], points["volatility"], offsets)
+
+    intervals = [(np.nan, np.nan)] * len(eras)
+    fitted = np.flatnonzero(fits.n >= 2)
+    if ERA_BOOTSTRAP_SAMPLES and len(fitted):
+        kept = np.concatenate([np.arange(offsets[i], offsets[i + 1]) for i in fitted])
+        ci = regression.bootstrap_intervals(
+            points["imdb_score"].to_numpy()[kept], points["volatility"].to_numpy()[kept],
+            np.concatenate([[0], np.cumsum(fits.n[fitted].astype(np.int64))]), samples=ERA_BOOTSTRAP_SAMPLES)
+        for position, i in enumerate(fitted):
+            intervals[i] = (ci.pearson.low[position], ci.pearson.high[position])
+
+    era_fits = []
+    for i, (era, frame) in enumerate(zip(eras, frames)):
+        frame = frame.assign(trendline=fits.intercept[i] + fits.slope[i] * frame["imdb_score"])
+        era_fits.append(EraFit(era, frame, fits.slope[i], fits.intercept[i], fits.pearson[i], intervals[i]))
+    return era_fits
+
+ERA_COLORS = [("#FF4C4C", "#FFAA4C"), ("#FF8C69", "#FFD27F"), ("#E50914", "#FFC14C")]
+
+@figure("quality_volatility_eras")
+def plot_quality_vs_stock_volatility(quality_volatility_eras):
+    names = ["Early" if i == 0 else "Recent" if i == len(quality_volatility_eras) - 1 else "Middle"
+             for i in range(len(quality_volatility_eras))]
+
+    def title(name, era_fit):
+        low, high = era_fit.pearson_interval
+        interval = f" (95% CI {low:.2f} to {high:.2f})" if not np.isnan(low) else ""
+        corr = f"{era_fit.pearson:.2f}" if not np.isnan(era_fit.pearson) else "n/a"
+        return f"{name} Years ({era_label(era_fit.era)}): Corr={corr}{interval}"
+
+    fig = make_subplots(rows=1, cols=len(quality_volatility_eras), subplot_titles=[
+        title(name, era_fit) for name, era_fit in zip(names, quality_volatility_eras)
+    ])
+
+    for i, (name, era_fit) in enumerate(zip(names, quality_volatility_eras)):
+        marker_color, line_color = ERA_COLORS[0 if i == 0 else -1 if name == "Recent" else 1]
+        fig.add_trace(go.Scatter(
+            x=era_fit.points["imdb_score"], 
+            y=era_fit.points["volatility"], 
+            mode='markers', name=f"{name} Years",
+            marker=dict(color=marker_color, size=8, opacity=0.8)
+        ), row=1, col=i + 1)
+
+        fig.add_trace(go.Scatter(
+            x=era_fit.points["imdb_score"], 
+            y=era_fit.points["trendline"], 
+            mode='lines', name=f"Trend ({name})", 
+            line=dict(color=line_color, width=2)
+        ), row=1, col=i + 1)
+
+        fig.update_xaxes(title_text=f"IMDb Score ({name} Years)", row=1, col=i + 1)
 
     fig.update_layout(
         title="Does Content Quality Affect Stock Volatility? (Early vs. Recent)",
@@ -322,31 +644,131 @@ def plot_quality_vs_stock_volatility():
         font=dict(color="white"),
     )
 
-    fig.update_xaxes(title_text="IMDb Score (Early Years)", row=1, col=1)
-    fig.update_xaxes(title_text="IMDb Score (Recent Years)", row=1, col=2)
-
     return fig
 
 ### 8. Impact of Hit Shows on Netflix Stock**
-hit_shows = df[(df['imdb_score'] >= 8.0) & (df['imdb_votes'] >= 100000)].copy()
-hit_shows["year"] = hit_shows["release_date"].dt.year
+HitIndex = namedtuple("HitIndex", ["titles", "order", "bin_offsets", "years", "at_least"])
+
+@dataset
+def hit_index():
+    """Threshold index over every title, for any (score, votes) hit definition on the slider steps.
+
+    ``titles`` are the title rows (with the cube's combination codes, so filters apply
+    to them). ``order`` lists them by score bin, and within a bin by votes descending;
+    score bin ``s`` is ``order[bin_offsets[s]:bin_offsets[s + 1]]``. ``at_least[y, s, v]``
+    counts the titles of ``years[y]`` with score >= HIT_SCORE_STEPS[s] and votes >=
+    HIT_VOTE_STEPS[v]: a per-year (score, votes) histogram, cumulated from the top.
+    """
+    df = get_dataset("df")
+    cube = get_dataset("cube")
+    titles = df.assign(
+        genre_combo=pd.Index(cube.genres.combos).get_indexer(df["genres"]),
+        country_combo=pd.Index(cube.countries.combos).get_indexer(df["country"].astype(str)),
+    )
 
-def plot_impact_of_hit_shows_on_stock(df=df):
+    scores = titles["imdb_score"].to_numpy()
+    votes = titles["imdb_votes"].fillna(-1).to_numpy()
+    # Titles below the lowest step (or without a score or votes) can never be hits.
+    score_bins = np.searchsorted(HIT_SCORE_STEPS, scores + 1e-9, side="right") - 1
+    vote_bins = np.searchsorted(HIT_VOTE_STEPS, votes, side="right") - 1
+    indexed = np.flatnonzero((score_bins >= 0) & (vote_bins >= 0) & ~np.isnan(scores))
+
+    order = indexed[np.lexsort((-votes[indexed], score_bins[indexed]))]
+    bin_offsets = np.searchsorted(score_bins[order], np.arange(len(HIT_SCORE_STEPS) + 1))
+
+    years, year_codes = np.unique(titles["year"].to_numpy()[indexed], return_inverse=True)
+    shape = (len(years), len(HIT_SCORE_STEPS), len(HIT_VOTE_STEPS))
+    flat = np.ravel_multi_index((year_codes, score_bins[indexed], vote_bins[indexed]), shape)
+    histogram = np.bincount(flat, minlength=np.prod(shape)).reshape(shape)
+    at_least = histogram[:, ::-1, ::-1].cumsum(axis=1).cumsum(axis=2)[:, ::-1, ::-1]
+    return HitIndex(titles, order, bin_offsets, years, at_least)
+
+def hit_bins(hit_threshold):
+    return (int(np.searchsorted(HIT_SCORE_STEPS, hit_threshold.score + 1e-9, side="right") - 1),
+            int(np.searchsorted(HIT_VOTE_STEPS, hit_threshold.votes, side="right") - 1))
+
+@dataset
+def hit_titles(hit_threshold=DEFAULT_HIT):
+    """Title rows of every hit, in catalogue order.
+
+    Only reads, from each score bin at or above the threshold, the prefix of titles
+    with enough votes, so the cost follows the number of hits, not of titles.
+    """
+    index = get_dataset("hit_index")
+    score_bin, vote_bin = hit_bins(hit_threshold)
+    votes = index.titles["imdb_votes"].to_numpy()
+    min_votes = HIT_VOTE_STEPS[vote_bin]
+    rows = []
+    for start, stop in zip(index.bin_offsets[score_bin:-1], index.bin_offsets[score_bin + 1:]):
+        in_bin = index.order[start:stop]
+        rows.append(in_bin[:np.searchsorted(-votes[in_bin], -min_votes, side="right")])
+    rows = np.sort(np.concatenate(rows)) if rows else np.array([], dtype=np.int64)
+    return index.titles.iloc[rows]
+
+@dataset
+def hit_shows(filters, hit_threshold=DEFAULT_HIT):
+    hit_titles = get_dataset("hit_titles", hit_threshold)
+    if filters == NO_FILTERS:
+        return hit_titles
+    return hit_titles[filter_mask(hit_titles, filters)]
+
+# The stock line is downsampled to roughly one point per horizontal pixel, and
+# traces with more points than WEBGL_POINTS are drawn with WebGL.
+STOCK_LINE_POINTS = 1000
+WEBGL_POINTS = 5000
+
+@dataset
+def stock_prices():
+    """Daily closing prices, one row per trading day."""
+    stocks = data_store.load_stocks()[["date", "close"]]
+    return stocks.sort_values("date", kind="stable").drop_duplicates("date").reset_index(drop=True)
+
+def release_span_prices(filters):
+    # Daily closes over the span of the selected titles' release dates.
+    cells = get_dataset("dated_slice", filters)
+    prices = get_dataset("stock_prices")
+    if cells.empty:
+        return prices.iloc[:0]
+    return prices[prices["date"].between(cells["release_date"].min(), cells["release_date"].max())]
+
+@dataset
+def stock_trend(filters):
+    return downsample(release_span_prices(filters), "date", "close", STOCK_LINE_POINTS).rename(
+        columns={"date": "release_date"}
+    )
+
+@dataset
+def stock_pyramid(filters):
+    """The closes of stock_trend at every TIME_LEVELS level: each period's last close, on its trading day."""
+    prices = release_span_prices(filters)
+    return {
+        level: prices[~prices["date"].dt.to_period(freq).duplicated(keep="last").to_numpy()].reset_index(drop=True)
+        for level, freq in TIME_LEVELS.items()
+    }
+
+def scatter_trace(points, **kwargs):
+    return (go.Scattergl if points > WEBGL_POINTS else go.Scatter)(**kwargs)
+
+@figure("stock_trend", "hit_shows")
+def plot_impact_of_hit_shows_on_stock(stock_trend, hit_shows):
+    hit_shows = hit_shows.copy()
     hit_shows["release_date_jitter"] = hit_shows["release_date"].astype(np.int64) // 10**9
     hit_shows["release_date_jitter"] += np.random.uniform(-5, 5, size=len(hit_shows))
     hit_shows["release_date_jitter"] = pd.to_datetime(hit_shows["release_date_jitter"], unit="s")
 
     fig = go.Figure()
 
-    fig.add_trace(go.Scatter(
-        x=df["release_date"], y=df["close"],
+    fig.add_trace(scatter_trace(
+        len(stock_trend),
+        x=stock_trend["release_date"], y=stock_trend["close"],
         mode="lines",
         name="Netflix Stock Trend",
         line=dict(color="lightgrey", width=1.5, dash="solid"),
         opacity=0.8
     ))
 
-    fig.add_trace(go.Scatter(
+    fig.add_trace(scatter_trace(
+        len(hit_shows),
         x=hit_shows["release_date_jitter"], 
         y=hit_shows["close"],
         mode="markers",
@@ -393,29 +815,111 @@ def plot_impact_of_hit_shows_on_stock(df=df):
     return fig
 
 
-### 9. Netflix Annual Hit Shows vs. Stock Price**
-df = pd.read_csv(DATA_PATH)
-
-df["release_date"] = pd.to_datetime(df["release_date"])
-df["year"] = df["release_date"].dt.year
-df["close"] = pd.to_numeric(df["close"], errors="coerce")
-
-df["high_quality"] = df["imdb_score"] >= 7.5
+### 8b. Stock Returns Around Releases**
+# Event windows, in trading days from the release.
+EVENT_WINDOWS = np.arange(1, 31)
+
+@dataset
+def release_events():
+    """Event study of every distinct release date in the catalogue, as (dates, EventStudy)."""
+    dates = np.unique(get_dataset("cube").dated["release_date"].to_numpy())
+    prices = get_dataset("stock_prices")
+    return dates, event_study(prices["date"].to_numpy(), prices["close"].to_numpy(), dates, EVENT_WINDOWS)
+
+@dataset
+def release_event_study(filters, hit_threshold=DEFAULT_HIT):
+    """Title-weighted mean abnormal return and volatility change per event window, for all titles and hits."""
+    cells = get_dataset("dated_slice", filters)
+    by_date = cells.groupby("release_date")[["titles"]].sum()
+    hit_dates = get_dataset("hit_shows", filters, hit_threshold)["release_date"].value_counts()
+    by_date["hits"] = hit_dates.reindex(by_date.index, fill_value=0)
+
+    # Filters and hit definitions only change the weights of the catalogue's events.
+    dates, events = get_dataset("release_events")
+    rows = np.searchsorted(dates, by_date.index.to_numpy())
+    study = events._replace(**{field: getattr(events, field)[rows] for field in events._fields if field != "windows"})
+
+    frames = []
+    for group, column in [("All titles", "titles"), ("Hit shows", "hits")]:
+        weights = by_date[column].to_numpy(dtype=float)[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = {
+                name: np.nansum(values * weights, axis=0) / np.sum(weights * ~np.isnan(values), axis=0) * 100
+                for name, values in [("abnormal_return", study.abnormal), ("volatility_change", study.volatility_change)]
+            }
+        frames.append(pd.DataFrame({"window": study.windows, "group": group, **means,
+                                    "titles": np.sum(weights * ~np.isnan(study.abnormal), axis=0).astype(int)}))
+    return pd.concat(frames, ignore_index=True)
+
+@figure("release_event_study")
+def plot_release_event_study(release_event_study):
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                        subplot_titles=["Mean Abnormal Return", "Mean Volatility Change"])
+    colors = {"All titles": "lightgrey", "Hit shows": "#E50914"}
+
+    for group, frame in release_event_study.groupby("group", sort=False):
+        for row, column in [(1, "abnormal_return"), (2, "volatility_change")]:
+            fig.add_trace(go.Scatter(
+                x=frame["window"], y=frame[column],
+                mode="lines+markers",
+                name=group,
+                legendgroup=group,
+                showlegend=row == 1,
+                line=dict(color=colors[group], width=2),
+                marker=dict(size=5),
+                customdata=frame["titles"],
+                hovertemplate="%{x} trading days: %{y:.2f}%<br>Titles: %{customdata}<extra>" + group + "</extra>"
+            ), row=row, col=1)
+        fig.add_hline(y=0, line_width=1, line_dash="dash", line_color="gray")
 
-hit_shows = df[(df["imdb_score"] >= 8.0) & (df["imdb_votes"] >= 100000)].copy()
-hit_shows["year"] = hit_shows["release_date"].dt.year
+    fig.update_layout(
+        title=dict(text="Netflix Stock Returns Around Title Releases", font=dict(size=18)),
+        legend=dict(x=0.02, y=1.15, orientation="h", font=dict(size=12)),
+        font=dict(color="white"),
+        template="plotly_dark"
+    )
+    fig.update_xaxes(title_text="Trading Days After Release", row=2, col=1)
+    fig.update_yaxes(title_text="Abnormal Return (%)", row=1, col=1)
+    fig.update_yaxes(title_text="Volatility Change (%)", row=2, col=1)
 
-hit_shows_per_year = hit_shows.groupby("year").size().reset_index(name="hit_count")
+    return fig
 
-hit_shows_per_year["hit_count_smoothed"] = (
-    hit_shows_per_year["hit_count"].rolling(window=5, min_periods=1).mean()
-)
+def series_meta(raw, window=1, name=None):
+    """Trace ``meta`` for the page's series controls: the trace's unsmoothed values, the
+    rolling-mean window it is drawn with (1 for never smoothed) and its legend name without one.
+    """
+    return {"raw": [None if pd.isna(value) else float(value) for value in raw], "window": window, "name": name}
 
-df_sampled = df.resample("YE", on="release_date")["close"].median().reset_index()
+### 9. Netflix Annual Hit Shows vs. Stock Price**
+HIT_COUNT_WINDOW = 5
 
-df_sampled["year"] = df_sampled["release_date"].dt.year
+@dataset
+def hit_shows_per_year(filters, hit_threshold=DEFAULT_HIT):
+    if filters == NO_FILTERS:
+        index = get_dataset("hit_index")
+        hits = pd.Series(index.at_least[(slice(None), *hit_bins(hit_threshold))], index=index.years)
+    else:
+        hits = get_dataset("hit_shows", filters, hit_threshold)["year"].value_counts().sort_index()
+    hit_shows_per_year = hits[hits > 0].rename("hit_count").rename_axis("year").reset_index()
 
-def plot_hit_shows_vs_stock_long_term():
+    hit_shows_per_year["hit_count_smoothed"] = (
+        hit_shows_per_year["hit_count"].rolling(window=HIT_COUNT_WINDOW, min_periods=1).mean()
+    )
+    return hit_shows_per_year
+
+@dataset
+def df_sampled(filters):
+    # Median close over the titles released each year, with empty years left as gaps.
+    cells = get_dataset("dated_slice", filters)
+    medians = {
+        year: weighted_median(group["close"].to_numpy(), group["titles"].to_numpy())
+        for year, group in cells.groupby("year")
+    }
+    years = range(min(medians), max(medians) + 1) if medians else []
+    return pd.DataFrame({"year": list(years), "close": [medians.get(year, np.nan) for year in years]})
+
+@figure("df_sampled", "hit_shows_per_year")
+def plot_hit_shows_vs_stock_long_term(df_sampled, hit_shows_per_year):
     fig = go.Figure()
 
     fig.add_trace(go.Scatter(
@@ -424,14 +928,16 @@ def plot_hit_shows_vs_stock_long_term():
         mode="lines",
         name="Netflix Stock Trend",
         line=dict(color="white", width=2),
-        opacity=0.8
+        opacity=0.8,
+        meta=series_meta(df_sampled["close"])
     ))
 
     fig.add_trace(go.Scatter(
         x=hit_shows_per_year["year"],
         y=hit_shows_per_year["hit_count_smoothed"],
         mode="lines+markers",
-        name="Hit Shows Per Year (Smoothed)",
+        name=f"Hit Shows Per Year ({HIT_COUNT_WINDOW}-year average)",
+        meta=series_meta(hit_shows_per_year["hit_count"], HIT_COUNT_WINDOW, "Hit Shows Per Year"),
         line=dict(color="red", width=2, dash="solid"),
         marker=dict(size=5, color="red"),
         opacity=0.8,
@@ -452,7 +958,7 @@ def plot_hit_shows_vs_stock_long_term():
             showgrid=True, gridcolor="gray"
         ),
         yaxis2=dict(
-            title="Hit Shows Per Year (Smoothed)",
+            title="Hit Shows Per Year",
             overlaying="y",
             side="right",
             tickfont=dict(color="white"),
@@ -476,26 +982,24 @@ def plot_hit_shows_vs_stock_long_term():
     return fig
 
 ### 10. Netflix Content Genre Trends Over Time**
-df["release_date"] = pd.to_datetime(df["release_date"], errors="coerce")
-df["year"] = df["release_date"].dt.year
-
-df["genres"] = df["genres"].astype(str).str.lower().str.replace("dramas", "drama").str.replace("comedies", "comedy")
-
-df_exploded_genres = df.assign(genres=df["genres"].str.split(", ")).explode("genres")
+@dataset
+def genre_trend_filtered(filters):
+    cube = get_dataset("cube")
+    counts = label_counts_by_year(get_dataset("cube_slice", filters), "genre_combo", cube.genres)
+    counts.columns.name = "genres"
 
-df_exploded_genres = df_exploded_genres.dropna(subset=["release_date"])
-df_exploded_genres["year"] = df_exploded_genres["release_date"].dt.year
+    genre_trend = counts.stack()
+    genre_trend = genre_trend[genre_trend > 0].rename("title").reset_index()
 
-genre_trend = df_exploded_genres.groupby(["year", "genres"])["title"].count().reset_index()
+    genre_trend["total_per_year"] = genre_trend.groupby("year")["title"].transform("sum")
 
-genre_trend["total_per_year"] = genre_trend.groupby("year")["title"].transform("sum")
+    genre_trend["percentage"] = genre_trend["title"] / genre_trend["total_per_year"]
 
-genre_trend["percentage"] = genre_trend["title"] / genre_trend["total_per_year"]
+    top_genres = genre_trend.groupby("genres")["title"].sum().nlargest(10).index
+    return genre_trend[genre_trend["genres"].isin(top_genres)]
 
-top_genres = genre_trend.groupby("genres")["title"].sum().nlargest(10).index
-genre_trend_filtered = genre_trend[genre_trend["genres"].isin(top_genres)]
-
-def plot_genre_trends():
+@figure("genre_trend_filtered")
+def plot_genre_trends(genre_trend_filtered):
     fig = px.area(
         genre_trend_filtered, 
         x="year", 
@@ -527,16 +1031,25 @@ def plot_genre_trends():
     return fig
 
 ### 11. Trend of International Content Over Time**
-df["release_date"] = pd.to_datetime(df["release_date"], errors="coerce")
-df["year"] = df["release_date"].dt.year
-
-df["is_international"] = df["genres"].astype(str).str.contains("international", case=False, na=False)
-
-international_trend = df.groupby("year")["is_international"].mean().reset_index()
-
-international_trend["smoothed"] = international_trend["is_international"].rolling(window=3, min_periods=1).mean()
-
-def plot_international_trend():
+INTERNATIONAL_WINDOW = 3
+
+@dataset
+def international_trend(filters):
+    cube = get_dataset("cube")
+    cells = get_dataset("cube_slice", filters)
+    international_labels = np.array(["international" in genre for genre in cube.genres.labels], dtype=bool)
+    is_international = combos_with_any(cube.genres, international_labels)
+    cells = cells.assign(international=cells["titles"] * is_international[cells["genre_combo"].to_numpy()])
+    international_trend = cells.groupby("year")[["international", "titles"]].sum()
+    international_trend = (international_trend["international"] / international_trend["titles"]).rename(
+        "is_international"
+    ).reset_index()
+
+    international_trend["smoothed"] = international_trend["is_international"].rolling(window=INTERNATIONAL_WINDOW, min_periods=1).mean()
+    return international_trend
+
+@figure("international_trend")
+def plot_international_trend(international_trend):
     fig = px.line(
         international_trend,
         x="year", 
@@ -548,7 +1061,8 @@ def plot_international_trend():
 
     fig.update_traces(
         line=dict(color="#E50914", width=3),
-        marker=dict(size=8, color="white", line=dict(width=2, color="#E50914"))
+        marker=dict(size=8, color="white", line=dict(width=2, color="#E50914")),
+        meta=series_meta(international_trend["is_international"], INTERNATIONAL_WINDOW)
     )
 
     fig.update_layout(
@@ -581,39 +1095,56 @@ def plot_international_trend():
 
     return fig
 
-### 12. Netflix Content Production Growth by Country**
-df_cleaned = df[df["country"] != "Unknown"].copy()
+# Yearly series the page can re-smooth, log-scale and normalize without a round trip
+# (see assets/series_controls.js), with the smoothing window each is built with.
+SMOOTHING_WINDOWS = {
+    "plot_hit_shows_vs_stock_long_term": HIT_COUNT_WINDOW,
+    "plot_international_trend": INTERNATIONAL_WINDOW,
+}
+MAX_SMOOTHING_WINDOW = 10
 
-df_cleaned = df_cleaned.assign(country=df_cleaned["country"].str.split(", ")).explode("country")
-
-df_country_trend = df_cleaned.groupby(["year", "country"])["title"].count().reset_index()
-df_country_trend.rename(columns={"title": "content_count"}, inplace=True)
-
-df_total_per_year = df_country_trend.groupby("year")["content_count"].sum().reset_index()
-df_total_per_year.rename(columns={"content_count": "total_content"}, inplace=True)
-
-df_country_trend = df_country_trend.merge(df_total_per_year, on="year")
-df_country_trend["percentage"] = df_country_trend["content_count"] / df_country_trend["total_content"]
-
-all_years = df_country_trend["year"].unique()
-all_countries = df_cleaned["country"].unique()
-full_index = pd.MultiIndex.from_product([all_years, all_countries], names=["year", "country"])
-df_country_trend = df_country_trend.set_index(["year", "country"]).reindex(full_index, fill_value=0).reset_index()
-
-df_country_trend = df_country_trend[df_country_trend["percentage"] > 0]
-
-def plot_country_production_growth():
-    fig = px.choropleth(
-        df_country_trend,
-        locations="country",
+### 12. Netflix Content Production Growth by Country**
+CountryFrames = namedtuple("CountryFrames", ["countries", "years", "frames"])
+
+@dataset
+def country_frames(filters):
+    """Sparse year -> (country codes, percentages) index for the production map.
+
+    Only (year, country) pairs with at least one title are stored, and country
+    codes index into the shared ``countries`` list.
+    """
+    cube = get_dataset("cube")
+    cells = get_dataset("cube_slice", filters)
+    cells = cells[cube.countries.combos[cells["country_combo"].to_numpy()] != "Unknown"]
+
+    counts = label_counts_by_year(cells, "country_combo", cube.countries)
+    percentages = counts.to_numpy() / counts.to_numpy().sum(axis=1, keepdims=True)
+
+    frames = {}
+    for year, row_counts, row_percentages in zip(counts.index, counts.to_numpy(), percentages):
+        codes = np.flatnonzero(row_counts)
+        frames[int(year)] = (codes, row_percentages[codes])
+    return CountryFrames(cube.countries.labels, sorted(frames), frames)
+
+def country_frame(year, country_frames=None):
+    """Return the JSON-ready frame for ``year``; years without titles give an empty frame."""
+    country_frames = country_frames or get_dataset("country_frames", NO_FILTERS)
+    codes, percentages = country_frames.frames.get(year, ([], []))
+    return {"codes": list(map(int, codes)), "z": list(map(float, percentages))}
+
+@figure("country_frames")
+def plot_country_production_growth(country_frames, year=None):
+    if year is None:
+        year = country_frames.years[0] if country_frames.years else None
+    codes, percentages = country_frames.frames.get(year, (np.array([], dtype=int), np.array([])))
+
+    fig = go.Figure(go.Choropleth(
+        locations=[country_frames.countries[code] for code in codes],
+        z=percentages,
         locationmode="country names",
-        color="percentage",
-        animation_frame="year",
-        title="Netflix Content Production Growth by Country (2003-2021)",
-        color_continuous_scale="YlOrRd",
-        range_color=(0, 1),
-        labels={"percentage": "Percentage of Netflix Titles"},
-    )
+        coloraxis="coloraxis",
+        hovertemplate="%{location}<br>Percentage of Netflix Titles=%{z}<extra></extra>",
+    ))
 
     fig.update_layout(
         template="plotly_dark",
@@ -631,6 +1162,7 @@ def plot_country_production_growth():
         title_text="Netflix Content Production Growth by Country (2003-2021)",
         title_x=0.18,
         title_font=dict(size=20, color="white"),
+        coloraxis=dict(colorscale="YlOrRd", cmin=0, cmax=1),
         coloraxis_colorbar=dict(
         title="Percentage of Netflix Titles",
         thicknessmode="pixels", thickness=25,
@@ -640,6 +1172,20 @@ def plot_country_production_growth():
 
     return fig
 
+ZoomSpec = namedtuple("ZoomSpec", ["pyramid", "points", "traces"])
+
+# Figures whose time series are redrawn from a pyramid level when zoomed: the
+# pyramid dataset, the most points a trace may get, and (trace index, column) pairs.
+ZOOMABLE = {
+    "plot_stock_vs_releases": ZoomSpec("release_pyramid", 400, [(0, "close"), (1, "title"), (2, "price_change")]),
+    "plot_impact_of_hit_shows_on_stock": ZoomSpec("stock_pyramid", STOCK_LINE_POINTS, [(0, "close")]),
+}
+
+def zoom_traces(name, filters, x_range):
+    """The pyramid level and rows to draw figure ``name``'s ZOOMABLE traces from for ``x_range``."""
+    spec = ZOOMABLE[name]
+    return zoom_level(get_dataset(spec.pyramid, filters), x_range, spec.points)
+
 plot_functions_order = [
     "plot_imdb_score_trend",
     "plot_high_quality_proportion",
@@ -649,6 +1195,7 @@ plot_functions_order = [
     "plot_stock_vs_quality",
     "plot_quality_vs_stock_volatility",
     "plot_impact_of_hit_shows_on_stock",
+    "plot_release_event_study",
     "plot_hit_shows_vs_stock_long_term",
     "plot_genre_trends",
     "plot_international_trend",
@@ -0,0 +1,47 @@
+"""Production entry point for the dashboard.
+
+    gunicorn -c app/gunicorn.conf.py wsgi:server
+
+The config preloads this module in the gunicorn master, so the column caches,
+the unfiltered datasets and the figure cache are built once and the workers
+fork from a process that already holds them. Column data is memory-mapped from
+data/cache/ and shared through the page cache; the frames built on top of it are
+shared copy-on-write. Filtered datasets are still memoized per worker, up to
+visualization.DATASET_CACHE_SIZE each.
+"""
+import gc
+
+import app as dashboard
+import data_store
+import figure_cache
+import rebuild
+import visualization
+
+server = dashboard.app.server
+
+
+def warm_dataset(name):
+    # With the same arguments as a figure's build() and zoom_traces, so the workers hit these entries.
+    options = [visualization.DATASET_OPTIONS[option] for option in visualization.dataset_options(name)]
+    visualization.get_dataset(name, visualization.NO_FILTERS, *options)
+
+
+def preload():
+    """Build everything the unfiltered dashboard needs before the workers fork."""
+    version = figure_cache.data_version()
+    for path in data_store.DATA_SOURCES:
+        data_store.ensure_cache(path)
+    for spec in visualization.FIGURES.values():
+        for name in spec.inputs:
+            warm_dataset(name)
+    for spec in visualization.ZOOMABLE.values():
+        warm_dataset(spec.pyramid)
+    figure_cache.warm()
+    # The datasets were just built from this version's files; keep them for the workers.
+    rebuild.publish(version, reset=False)
+    # Move everything allocated so far out of the collector's reach, so garbage
+    # collections in the workers don't write to (and so copy) the shared pages.
+    gc.freeze()
+
+
+preload()
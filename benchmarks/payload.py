@@ -0,0 +1,96 @@
+"""Compare the first page payload of the eager and lazy dashboard layouts.
+
+Run from the repository root:
+
+    python benchmarks/payload.py
+"""
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../app"))
+
+import app as dashboard  # noqa: E402
+import figure_cache  # noqa: E402
+import http_cache  # noqa: E402
+import visualization  # noqa: E402
+
+# Rough downlink of a slow mobile connection, used to turn bytes into seconds.
+SLOW_LINK_BYTES_PER_SECOND = 400_000 / 8
+
+
+def timed_request(client, method, path, status=200, **kwargs):
+    start = time.perf_counter()
+    response = getattr(client, method)(path, **kwargs)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == status, (path, response.status_code)
+    return response, elapsed
+
+
+def lazy_figure_request(name):
+    graph_id = {"type": "dashboard-graph", "name": name}
+    store_id = {"type": "graph-visible", "name": name}
+    output = json.dumps({"name": ["MATCH"], "type": "dashboard-graph"}, separators=(",", ":")) + ".figure"
+    return {
+        "output": output,
+        "outputs": {"id": graph_id, "property": "figure"},
+        "inputs": [
+            {"id": store_id, "property": "data", "value": True},
+            {"id": "dashboard-filters", "property": "data", "value": {}},
+        ],
+        "changedPropIds": [json.dumps(store_id, separators=(",", ":")) + ".data"],
+        "state": [
+            {"id": "country-year-slider", "property": "value", "value": None},
+            {"id": "hit-score-slider", "property": "value", "value": None},
+            {"id": "hit-votes-slider", "property": "value", "value": None},
+            {"id": "era-split-slider", "property": "value", "value": None},
+        ],
+    }
+
+
+def measure(lazy):
+    dashboard.app.layout = dashboard.build_layout(lazy=lazy)
+    client = dashboard.app.server.test_client()
+
+    http_cache.clear()
+    headers = {"Accept-Encoding": "identity"}
+    layout, layout_seconds = timed_request(client, "get", "/_dash-layout", headers=headers)
+    layout = layout.get_data()
+    first_chart_seconds = layout_seconds
+    first_chart_bytes = len(layout)
+    if lazy:
+        first = visualization.plot_functions_order[0]
+        figure, figure_seconds = timed_request(client, "post", "/_dash-update-component",
+                                               json=lazy_figure_request(first), headers=headers)
+        first_chart_seconds += figure_seconds
+        first_chart_bytes += len(figure.get_data())
+    first_chart_seconds += first_chart_bytes / SLOW_LINK_BYTES_PER_SECOND
+
+    # The same page with compression, then a returning visitor revalidating it.
+    compressed, _ = timed_request(client, "get", "/_dash-layout", headers={"Accept-Encoding": "br, gzip"})
+    revalidated, revalidate_seconds = timed_request(
+        client, "get", "/_dash-layout", status=304,
+        headers={"Accept-Encoding": "br, gzip", "If-None-Match": compressed.headers["ETag"]})
+    return {
+        "layout_bytes": len(layout),
+        "layout_gzip_bytes": len(gzip.compress(layout)),
+        "layout_wire_bytes": len(compressed.get_data()),
+        "layout_encoding": compressed.headers.get("Content-Encoding", "identity"),
+        "layout_server_ms": round(layout_seconds * 1000, 1),
+        "bytes_before_first_chart": first_chart_bytes,
+        "time_to_first_chart_s": round(first_chart_seconds, 2),
+        "revalidate_bytes": len(revalidated.get_data()),
+        "revalidate_server_ms": round(revalidate_seconds * 1000, 1),
+    }
+
+
+def main():
+    figure_cache.warm()
+    results = {"eager": measure(lazy=False), "lazy": measure(lazy=True)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
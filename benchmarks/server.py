@@ -0,0 +1,160 @@
+"""Measure per-worker memory and throughput of the gunicorn deployment.
+
+For each worker count, starts ``gunicorn -c app/gunicorn.conf.py wsgi:server``,
+sends a mix of unfiltered and filtered figure requests from concurrent clients,
+and reads each worker's RSS, PSS (RSS with shared pages split between the
+processes sharing them) and USS (private memory) from /proc. Linux only.
+
+    python benchmarks/server.py --workers 1 2 4 --seconds 20
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT_DIR, "app"))
+
+import visualization  # noqa: E402
+
+FILTERS = [
+    {},
+    {"year_range": [2015, 2021]},
+    {"types": ["MOVIE"]},
+    {"types": ["SHOW"], "year_range": [2010, 2021]},
+    {"genres": ["drama"]},
+    {"countries": ["United States"]},
+]
+
+
+def figure_request(name, filters):
+    """The body Dash posts when a lazy section becomes visible (see benchmarks/payload.py)."""
+    graph_id = {"type": "dashboard-graph", "name": name}
+    store_id = {"type": "graph-visible", "name": name}
+    return {
+        "output": json.dumps({"name": ["MATCH"], "type": "dashboard-graph"}, separators=(",", ":")) + ".figure",
+        "outputs": {"id": graph_id, "property": "figure"},
+        "inputs": [
+            {"id": store_id, "property": "data", "value": True},
+            {"id": "dashboard-filters", "property": "data", "value": filters},
+        ],
+        "changedPropIds": [json.dumps(store_id, separators=(",", ":")) + ".data"],
+        "state": [
+            {"id": "country-year-slider", "property": "value", "value": None},
+            {"id": "hit-score-slider", "property": "value", "value": None},
+            {"id": "hit-votes-slider", "property": "value", "value": None},
+            {"id": "era-split-slider", "property": "value", "value": None},
+        ],
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def worker_pids(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def memory_mb(pid):
+    """RSS, PSS and USS of ``pid`` in MB, from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    uss = fields["Private_Clean"] + fields["Private_Dirty"]
+    return {"rss": round(fields["Rss"] / 1024, 1), "pss": round(fields["Pss"] / 1024, 1),
+            "uss": round(uss / 1024, 1)}
+
+
+def wait_until_ready(url, process, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            if requests.get(url + "/_dash-layout", timeout=5).status_code == 200:
+                return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise TimeoutError("gunicorn did not start")
+
+
+def load(url, seconds, clients, seed=0):
+    """Send figure requests from ``clients`` threads for ``seconds``; returns (requests, errors)."""
+    names = visualization.plot_functions_order
+    counts = {"ok": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client(index):
+        rng = random.Random(seed + index)
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            body = figure_request(rng.choice(names), rng.choice(FILTERS))
+            response = session.post(url + "/_dash-update-component", json=body, timeout=60)
+            with lock:
+                counts["ok" if response.status_code == 200 else "errors"] += 1
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts["ok"], counts["errors"]
+
+
+def measure(workers, seconds, clients):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT_DIR, "app/gunicorn.conf.py"),
+         "--bind", f"127.0.0.1:{port}", "wsgi:server"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(url, process)
+        pids = worker_pids(process.pid)
+        idle = [memory_mb(pid) for pid in pids]
+        ok, errors = load(url, seconds, clients)
+        loaded = [memory_mb(pid) for pid in pids]
+        return {
+            "workers": workers,
+            "requests_per_second": round(ok / seconds, 1),
+            "errors": errors,
+            "master": memory_mb(process.pid),
+            "workers_idle": idle,
+            "workers_loaded": loaded,
+            "total_pss_mb": round(memory_mb(process.pid)["pss"] + sum(m["pss"] for m in loaded), 1),
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the gunicorn deployment.")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--clients", type=int, default=8)
+    args = parser.parse_args()
+
+    results = [measure(workers, args.seconds, args.clients) for workers in args.workers]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
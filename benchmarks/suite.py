@@ -0,0 +1,182 @@
+"""Benchmark data loading, aggregation and figure builds at several data scales.
+
+Each scale runs in a fresh interpreter pointed at its own data file and column
+cache (through NETFLIX_DATA_PATH and NETFLIX_CACHE_DIR), so import time and peak
+RSS are measured from a clean process. Scales other than 1 use the synthetic
+tables from benchmarks/synthetic.py, generated on first use.
+
+    python benchmarks/suite.py run --scales 1 10 100
+    python benchmarks/suite.py compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+
+Results are written to benchmarks/results/<commit>.json.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCHMARK_DIR, "../app")
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+sys.path.insert(0, APP_DIR)
+
+# Datasets kept between plots; everything derived from them is rebuilt per plot
+# so each plot's time includes its own aggregation.
+BASE_DATASETS = ("df", "cube")
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, round(time.perf_counter() - start, 4)
+
+
+def run_worker():
+    """Measure the current process's data files; prints one JSON object."""
+    start = time.perf_counter()
+    import visualization
+    import_s = round(time.perf_counter() - start, 4)
+    import data_store
+    import plotly.io as pio
+
+    had_cache = data_store._read_manifest(data_store.DATA_PATH) is not None
+    manifest, cache_s = timed(data_store.ensure_cache)
+    _, load_s = timed(visualization.get_dataset, "df")
+    _, cube_s = timed(visualization.get_dataset, "cube")
+    result = {
+        "rows": manifest["rows"],
+        "import_s": import_s,
+        "cache_s": cache_s,
+        "cache_built": not had_cache,
+        "load_s": load_s,
+        "cube_s": cube_s,
+        "cube_cells": len(visualization.get_dataset("cube").cells),
+        "peak_rss_mb_after_load": peak_rss_mb(),
+        "plots": {},
+    }
+
+    for name in visualization.plot_functions_order:
+        for dataset_name, cached in visualization.DATASETS.items():
+            if dataset_name not in BASE_DATASETS:
+                cached.cache_clear()
+        fig, build_s = timed(visualization.FIGURES[name].build)
+        payload, serialize_s = timed(pio.to_json, fig, validate=False)
+        result["plots"][name] = {
+            "build_s": build_s,
+            "serialize_s": serialize_s,
+            "bytes": len(payload),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    json.dump(result, sys.stdout)
+
+
+def measure_scale(scale, cold=False):
+    import synthetic
+
+    data_path = os.path.abspath(synthetic.ensure(scale))
+    cache_dir = os.path.join(synthetic.SYNTHETIC_DIR, f"cache-x{scale}")
+    if cold:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    env = dict(os.environ, NETFLIX_DATA_PATH=data_path, NETFLIX_CACHE_DIR=cache_dir)
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "worker"],
+                            env=env, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(output)
+
+
+def commit_id():
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=BENCHMARK_DIR, capture_output=True, text=True).stdout.strip()
+
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    return commit + ("-dirty" if git("status", "--porcelain", "--untracked-files=no") else "")
+
+
+def run(scales, cold=False, output=None):
+    results = {
+        "commit": commit_id(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scales": {},
+    }
+    for scale in scales:
+        print(f"x{scale} ...", file=sys.stderr)
+        results["scales"][str(scale)] = measure_scale(scale, cold)
+
+    output = output or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    return output, results
+
+
+def summary_rows(results):
+    """Flatten results into {(scale, metric): value} for comparison."""
+    rows = {}
+    for scale, result in results["scales"].items():
+        for key in ("import_s", "cache_s", "load_s", "cube_s", "peak_rss_mb"):
+            rows[(scale, key)] = result[key]
+        for name, plot in result["plots"].items():
+            for key in ("build_s", "bytes"):
+                rows[(scale, f"{name}.{key}")] = plot[key]
+    return rows
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = summary_rows(json.load(f))
+    with open(new_path) as f:
+        new = summary_rows(json.load(f))
+
+    print(f"{'scale':>6}  {'metric':<55} {'old':>12} {'new':>12} {'ratio':>7}")
+    for key in sorted(old.keys() & new.keys(), key=lambda key: (int(key[0]), key[1])):
+        ratio = new[key] / old[key] if old[key] else float("nan")
+        print(f"{'x' + key[0]:>6}  {key[1]:<55} {old[key]:>12} {new[key]:>12} {ratio:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's data and figure pipeline.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the suite and save the results as JSON.")
+    run_parser.add_argument("--scales", nargs="+", type=int, default=[1, 10, 100])
+    run_parser.add_argument("--cold", action="store_true", help="Rebuild each scale's column cache first.")
+    run_parser.add_argument("--output", help="Results file (default: benchmarks/results/<commit>.json).")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two results files.")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+
+    subparsers.add_parser("worker", help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.command == "worker":
+        run_worker()
+    elif args.command == "run":
+        output, results = run(args.scales, args.cold, args.output)
+        for scale, result in results["scales"].items():
+            slowest = max(result["plots"].items(), key=lambda item: item[1]["build_s"])
+            print(f"x{scale}: {result['rows']} rows, import {result['import_s']}s, load {result['load_s']}s, "
+                  f"cube {result['cube_s']}s, peak RSS {result['peak_rss_mb']} MB, "
+                  f"slowest plot {slowest[0]} {slowest[1]['build_s']}s")
+        print(f"Saved {output}")
+    else:
+        compare(args.old, args.new)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Generate scaled-up copies of netflix_final_merged.csv for benchmarking.
+
+Each copy keeps the schema, release dates and stock columns of the real file and
+repeats its titles ``scale`` times. Repeated titles get a suffix and jittered IMDb
+score and votes, so hits, quality shares and genre/country mixes stay realistic.
+
+    python benchmarks/synthetic.py 10 100 1000
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../app"))
+
+import data_store  # noqa: E402
+
+SYNTHETIC_DIR = os.path.join(data_store.CACHE_DIR, "synthetic")
+
+# Copies written per to_csv call; bounds memory for the largest scales.
+COPIES_PER_CHUNK = 10
+
+
+def synthetic_path(scale, directory=SYNTHETIC_DIR):
+    return os.path.join(directory, f"netflix_merged_x{scale}.csv")
+
+
+def jittered_copy(base, copy, rng):
+    frame = base.copy()
+    if copy:
+        frame["title"] = frame["title"] + f" #{copy}"
+        frame["imdb_score"] = (frame["imdb_score"] + rng.normal(0, 0.3, len(frame))).clip(1, 10).round(1)
+        frame["imdb_votes"] = (frame["imdb_votes"] * rng.lognormal(0, 0.5, len(frame))).round()
+    return frame
+
+
+def generate(scale, path=None, source=data_store.DATA_PATH, seed=0):
+    """Write a merged table with ``scale`` times the rows of ``source``; returns its path."""
+    path = path or synthetic_path(scale)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    base = pd.read_csv(source)
+    rng = np.random.default_rng(seed)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        for start in range(0, scale, COPIES_PER_CHUNK):
+            copies = range(start, min(start + COPIES_PER_CHUNK, scale))
+            chunk = pd.concat([jittered_copy(base, copy, rng) for copy in copies], ignore_index=True)
+            chunk.to_csv(f, header=start == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def ensure(scale, source=data_store.DATA_PATH):
+    """Return the synthetic file for ``scale``, generating it on first use."""
+    if scale == 1:
+        return source
+    path = synthetic_path(scale)
+    if not os.path.exists(path):
+        generate(scale, path, source)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate scaled-up merged datasets.")
+    parser.add_argument("scales", nargs="+", type=int, help="Multiples of the current row count.")
+    parser.add_argument("--output-dir", default=SYNTHETIC_DIR)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for scale in args.scales:
+        path = generate(scale, synthetic_path(scale, args.output_dir), seed=args.seed)
+        print(f"x{scale}: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
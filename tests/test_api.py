@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+import api
+import visualization
+
+
+def filtered_titles(filters):
+    """The title rows matching ``filters``, filtered directly rather than through the cube."""
+    df = visualization.get_dataset("df")
+    countries = df["country"].astype(str).str.split(", ")
+    mask = (df["year"].between(*filters.year_range) & df["type"].isin(filters.types)
+            & countries.map(lambda labels: bool(set(labels) & set(filters.countries))))
+    return df[mask]
+
+
+def test_aggregate_matches_a_groupby_of_the_titles():
+    filters = visualization.make_filters((2010, 2020), ["MOVIE"], countries=["United States", "India"])
+    result = api.aggregate(("year", "genre"), ("titles", "imdb_score", "high_quality_ratio", "share"), filters)
+
+    titles = filtered_titles(filters)
+    by_genre = titles.assign(genre=titles["genres"].str.split(", ")).explode("genre")
+    expected = by_genre.groupby(["year", "genre"]).agg(
+        titles=("title", "size"), imdb_score=("imdb_score", "mean"), high_quality_ratio=("high_quality", "mean"),
+    ).reset_index()
+    expected["share"] = expected["titles"] / expected["year"].map(titles.groupby("year").size())
+
+    assert len(expected) > 50
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected, check_dtype=False)
+
+
+def test_aggregate_without_groups_totals_the_filtered_titles():
+    filters = visualization.make_filters((2015, 2018), ["SHOW"], countries=["Japan"])
+    result = api.aggregate((), ("titles", "imdb_score"), filters)
+
+    titles = filtered_titles(filters)
+    assert len(titles) > 10
+    assert result["titles"].tolist() == [len(titles)]
+    np.testing.assert_allclose(result["imdb_score"], titles["imdb_score"].mean())
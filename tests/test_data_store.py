@@ -0,0 +1,55 @@
+import os
+
+import pandas as pd
+import pytest
+
+import data_store
+
+
+@pytest.fixture
+def csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_store, "CACHE_DIR", str(tmp_path / "cache"))
+    builds = []
+    build_cache = data_store.build_cache
+    monkeypatch.setattr(data_store, "build_cache", lambda path: builds.append(path) or build_cache(path))
+    path = str(tmp_path / "titles.csv")
+    pd.DataFrame({"title": ["Ozark", "Dark"], "type": ["SHOW", "SHOW"], "imdb_score": [8.5, 8.7]}).to_csv(
+        path, index=False)
+    return path, builds
+
+
+def test_cache_is_reused_while_the_csv_is_unchanged(csv):
+    path, builds = csv
+    first = data_store.ensure_cache(path)
+    os.utime(path, ns=(first["mtime_ns"] + 10 ** 9,) * 2)  # touched, not changed
+
+    assert data_store.ensure_cache(path)["columns_dir"] == first["columns_dir"]
+    assert len(builds) == 1
+    assert data_store._load_table(path).to_dict("list") == pd.read_csv(path).to_dict("list")
+
+
+def test_cache_is_rebuilt_when_the_format_changes(csv, monkeypatch):
+    path, builds = csv
+    data_store.ensure_cache(path)
+    monkeypatch.setattr(data_store, "CACHE_FORMAT", data_store.CACHE_FORMAT + 1)
+
+    manifest = data_store.ensure_cache(path)
+
+    assert len(builds) == 2
+    assert manifest["format"] == data_store.CACHE_FORMAT
+    assert data_store.ensure_cache(path) == manifest
+    assert len(builds) == 2
+
+
+def test_cache_is_rebuilt_when_the_csv_changes(csv):
+    path, builds = csv
+    old = data_store.ensure_cache(path)
+    with open(path, "a") as f:
+        f.write("Narcos,SHOW,8.8\n")
+
+    manifest = data_store.ensure_cache(path)
+
+    assert len(builds) == 2
+    assert manifest["rows"] == 3
+    assert not os.path.exists(old["columns_dir"])
+    assert data_store._load_table(path)["title"].tolist() == ["Ozark", "Dark", "Narcos"]
@@ -0,0 +1,42 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+import event_study
+
+DAYS = pd.bdate_range("2020-01-01", periods=300).to_numpy()
+CLOSES = 50 * np.exp(np.cumsum(np.random.default_rng(11).normal(0, 0.02, len(DAYS))))
+ESTIMATION = 40
+
+
+def naive_window(event_date, window):
+    """One event window computed day by day: (return, abnormal, pre volatility, post volatility)."""
+    day = next((i for i, trading_day in enumerate(DAYS) if trading_day >= event_date), len(DAYS))
+    first = day - 1 - window - ESTIMATION
+    if first < 0 or day - 1 + window >= len(CLOSES):
+        return (math.nan,) * 4
+    log_returns = [math.log(CLOSES[i] / CLOSES[i - 1]) for i in range(first + 1, day + window)]
+    estimation, pre, post = (log_returns[:ESTIMATION], log_returns[ESTIMATION:ESTIMATION + window],
+                             log_returns[ESTIMATION + window:])
+    simple = CLOSES[day - 1 + window] / CLOSES[day - 1] - 1
+    expected = math.exp(sum(estimation) / ESTIMATION * window) - 1
+    std = (lambda values: np.std(values, ddof=1)) if window >= 2 else (lambda values: math.nan)
+    return simple, simple - expected, std(pre), std(post)
+
+
+def test_windows_match_a_naive_loop():
+    # Trading days, weekends (mapped to Monday) and dates near both ends of the series.
+    events = np.concatenate([DAYS[[0, 30, 60, 150, 280, 299]],
+                             np.array(["2020-05-02", "2020-07-04", "2021-06-01"], dtype="datetime64[ns]")])
+    windows = [1, 2, 5, 20]
+    study = event_study.event_study(DAYS, CLOSES, events, windows, estimation=ESTIMATION)
+
+    for i, event in enumerate(events):
+        for j, window in enumerate(windows):
+            expected = naive_window(event, window)
+            actual = (study.returns[i, j], study.abnormal[i, j], study.pre_volatility[i, j],
+                      study.post_volatility[i, j])
+            np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-12, err_msg=f"{event} {window}")
+    np.testing.assert_allclose(study.volatility_change, study.post_volatility / study.pre_volatility - 1)
+    assert np.isfinite(study.returns).any() and np.isnan(study.returns).any()
@@ -0,0 +1,44 @@
+import re
+
+import pytest
+
+import app as dashboard
+import http_cache
+
+
+@pytest.fixture
+def client():
+    http_cache.clear()
+    return dashboard.app.server.test_client()
+
+
+def test_cached_asset_keeps_its_headers(client):
+    page = client.get("/").get_data(as_text=True)
+    url = re.search(r'src="(/_dash-component-suites/[^"]+)"', page).group(1)
+
+    first = client.get(url, headers={"Accept-Encoding": "gzip"})
+    second = client.get(url, headers={"Accept-Encoding": "gzip"})
+
+    assert "max-age=31536000" in first.headers["Cache-Control"]
+    for header in ("Cache-Control", "Content-Type", "Vary", "Content-Encoding", "ETag"):
+        assert second.headers[header] == first.headers[header]
+    assert second.data == first.data
+
+
+def test_not_modified_keeps_cache_control(client):
+    page = client.get("/").get_data(as_text=True)
+    url = re.search(r'src="(/_dash-component-suites/[^"]+)"', page).group(1)
+
+    etag = client.get(url).headers["ETag"]
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+
+
+def test_callback_responses_revalidate(client):
+    first = client.get("/_dash-layout")
+    second = client.get("/_dash-layout")
+
+    assert first.headers["Cache-Control"] == second.headers["Cache-Control"] == "no-cache"
+    assert second.headers["Content-Type"] == first.headers["Content-Type"]
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+import data_store
+import merge_pipeline
+
+IMDB = pd.DataFrame({
+    "title": ["3 Idiots", "Arrested Development", "Taxi Driver"],
+    "type": ["MOVIE", "SHOW", "MOVIE"],
+    "release_year": [2009, 2003, 1976],
+    "release_date": ["2009-01-01", "2003-01-01", "1976-01-01"],
+    "imdb_score": [8.4, 8.7, 8.3],
+    "imdb_votes": [385000.0, 312000.0, 795222.0],
+    "genres": ["Comedy, Drama", "Comedy", "Drama"],
+})
+SHOWS = pd.DataFrame({
+    "type": ["Movie", "TV Show", "Movie"],
+    "title": ["3 Idiots", "Arrested Development", "Dick Johnson Is Dead"],
+    "director": ["Rajkumar Hirani", "Unknown", "Kirsten Johnson"],
+    "country": ["India", "United States", "United States"],
+    "date_added": ["2019-12-31", "2018-05-29", "2021-09-25"],
+    "release_year": [2009, 2018, 2020],
+    "listed_in": ["Comedies, Dramas", "TV Comedies", "Documentaries"],
+})
+
+
+@pytest.fixture
+def paths(tmp_path):
+    paths = {"imdb_path": str(tmp_path / "imdb.csv"), "shows_path": str(tmp_path / "shows.csv"),
+             "stocks_path": data_store.STOCKS_PATH, "output_path": str(tmp_path / "merged.csv"),
+             "state_dir": str(tmp_path / "state")}
+    IMDB.to_csv(paths["imdb_path"], index=False)
+    SHOWS.to_csv(paths["shows_path"], index=False)
+    return paths
+
+
+def test_matched_titles_are_counted_once(paths):
+    merge_pipeline.run(full=True, **paths)
+    merged = pd.read_csv(paths["output_path"]).set_index("title")
+
+    assert sorted(merged.index) == ["3 Idiots", "Arrested Development", "Dick Johnson Is Dead"]
+    # The IMDb title's values first, the Netflix title's where IMDb has none.
+    assert merged.loc["3 Idiots", "imdb_score"] == 8.4
+    assert merged.loc["3 Idiots", "release_date"] == "2009-01-01"
+    assert merged.loc["3 Idiots", "genres"] == "Comedy, Drama"
+    assert merged.loc["3 Idiots", "country"] == "India"
+
+
+def test_incremental_run_matches_earlier_titles_once(paths):
+    IMDB.iloc[:1].to_csv(paths["imdb_path"], index=False)
+    merge_pipeline.run(full=True, **paths)
+    IMDB.iloc[1:].to_csv(paths["imdb_path"], mode="a", header=False, index=False)
+
+    summary = merge_pipeline.run(**paths)
+    merged = pd.read_csv(paths["output_path"])
+
+    assert summary["mode"] == "incremental"
+    assert summary["rematched"] == 1
+    assert merged["title"].tolist().count("Arrested Development") == 1
+    assert merged.set_index("title").loc["Arrested Development", "imdb_score"] == 8.7
+
+
+def test_incremental_run_equals_full_run(paths, tmp_path):
+    IMDB.iloc[:2].to_csv(paths["imdb_path"], index=False)
+    SHOWS.iloc[:1].to_csv(paths["shows_path"], index=False)
+    merge_pipeline.run(full=True, **paths)
+    IMDB.iloc[2:].to_csv(paths["imdb_path"], mode="a", header=False, index=False)
+    SHOWS.iloc[1:].to_csv(paths["shows_path"], mode="a", header=False, index=False)
+
+    assert merge_pipeline.run(**paths)["mode"] == "incremental"
+    full = dict(paths, output_path=str(tmp_path / "full.csv"), state_dir=str(tmp_path / "full_state"))
+    merge_pipeline.run(full=True, **full)
+    pd.testing.assert_frame_equal(pd.read_csv(paths["output_path"]), pd.read_csv(full["output_path"]))
+
+
+def test_old_state_or_rewritten_input_forces_a_full_run(paths, monkeypatch):
+    merge_pipeline.run(full=True, **paths)
+    assert merge_pipeline.run(**paths)["mode"] == "incremental"
+
+    IMDB.iloc[::-1].to_csv(paths["imdb_path"], index=False)
+    assert merge_pipeline.run(**paths)["mode"] == "full"
+
+    monkeypatch.setattr(merge_pipeline, "STATE_FORMAT", merge_pipeline.STATE_FORMAT + 1)
+    assert merge_pipeline.run(**paths)["mode"] == "full"
+    assert merge_pipeline.run(**paths)["mode"] == "incremental"
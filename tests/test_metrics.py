@@ -0,0 +1,41 @@
+import flask
+import pytest
+
+import app as dashboard
+import metrics
+
+
+@pytest.fixture
+def label():
+    server = dashboard.app.server
+    server.test_client().get("/")  # Dash fills callback_map on the first request.
+
+    def label(body):
+        with server.test_request_context("/_dash-update-component", method="POST", json=body):
+            return metrics.endpoint_label(flask.request)
+    return label
+
+
+def test_lazy_graph_is_labelled_by_figure(label):
+    body = {"output": '{"name":["MATCH"],"type":"dashboard-graph"}.figure',
+            "outputs": {"id": {"name": "plot_international_trend", "type": "dashboard-graph"},
+                        "property": "figure"}}
+    assert label(body) == "plot_international_trend.figure"
+
+
+def test_registered_output_is_its_own_label(label):
+    body = {"output": "country-frames.data", "outputs": {"id": "country-frames", "property": "data"}}
+    assert label(body) == "country-frames.data"
+
+
+def test_unregistered_outputs_are_one_label(label):
+    bodies = [
+        {"output": "attacker-0.p", "outputs": {"id": "attacker-0", "property": "p"}},
+        {"output": "country-frames.data", "outputs": {"id": "attacker-1", "property": "data"}},
+        {"output": '{"name":["MATCH"],"type":"dashboard-graph"}.figure',
+         "outputs": {"id": {"name": "attacker-2", "type": "dashboard-graph"}, "property": "figure"}},
+        {"output": '{"name":["MATCH"],"type":"dashboard-graph"}.figure',
+         "outputs": {"id": {"name": "plot_international_trend", "type": "dashboard-graph"}, "property": "x"}},
+        ["not", "an", "object"],
+    ]
+    assert {label(body) for body in bodies} == {"callback"}
@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+import figure_cache
+import rebuild
+
+
+@pytest.fixture
+def retired(monkeypatch):
+    for key, value in rebuild._state.items():
+        monkeypatch.setitem(rebuild._state, key, value)
+    calls = []
+    done = threading.Event()
+    monkeypatch.setattr(figure_cache, "retire", lambda keep: (calls.append(keep), done.set()))
+    monkeypatch.setattr(figure_cache, "data_version", lambda: "new")
+    monkeypatch.setattr(rebuild, "CHECK_INTERVAL", 0)
+    return calls, done
+
+
+def test_publish_leaves_retiring_to_a_later_check(retired, monkeypatch):
+    calls, done = retired
+    monkeypatch.setattr(rebuild, "GRACE_SECONDS", 0)
+    threads = threading.active_count()
+
+    rebuild.publish("new", reset=False)
+    # No timer thread: the publish may run in a process that is about to fork.
+    assert threading.active_count() == threads
+    assert calls == []
+
+    rebuild.check()
+    assert done.wait(5)
+    assert calls == [{"new"}]
+
+
+def test_check_waits_for_the_grace_period(retired, monkeypatch):
+    calls, done = retired
+    monkeypatch.setattr(rebuild, "GRACE_SECONDS", 3600)
+
+    rebuild.publish("new", reset=False)
+    rebuild.check()
+
+    assert not done.wait(0.1)
+    assert calls == []
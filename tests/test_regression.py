@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+import regression
+
+RNG = np.random.default_rng(7)
+X = RNG.normal(5, 2, 40)
+Y = 1.5 - 0.8 * X + RNG.normal(0, 1, 40)
+
+
+def lstsq(x, y):
+    (intercept, slope), *_ = np.linalg.lstsq(np.column_stack([np.ones(len(x)), x]), y, rcond=None)
+    return slope, intercept, np.corrcoef(x, y)[0, 1]
+
+
+def assert_fit(fit, i, x, y):
+    slope, intercept, pearson = lstsq(x, y)
+    assert fit.slope[i] == pytest.approx(slope)
+    assert fit.intercept[i] == pytest.approx(intercept)
+    assert fit.pearson[i] == pytest.approx(pearson)
+    assert fit.r2[i] == pytest.approx(pearson ** 2)
+    assert fit.n[i] == len(x)
+
+
+def test_segment_fits_match_lstsq():
+    offsets = [0, 10, 25, 40]
+    fit = regression.segment_fits(X, Y, offsets)
+    for i, (start, stop) in enumerate(zip(offsets, offsets[1:])):
+        assert_fit(fit, i, X[start:stop], Y[start:stop])
+
+
+def test_sliding_fits_match_lstsq():
+    fit = regression.sliding_fits(X, Y, 8)
+    assert len(fit.slope) == len(X) - 7
+    for i in range(len(X) - 7):
+        assert_fit(fit, i, X[i:i + 8], Y[i:i + 8])
+
+
+def test_range_fits_leave_out_nans():
+    y = Y.copy()
+    y[[3, 17]] = np.nan
+    fit = regression.range_fits(X, y, [0, 5], [20, 40])
+    keep = ~np.isnan(y)
+    assert_fit(fit, 0, X[:20][keep[:20]], y[:20][keep[:20]])
+    assert_fit(fit, 1, X[5:][keep[5:]], y[5:][keep[5:]])
+
+
+def test_degenerate_ranges_have_no_fit():
+    fit = regression.range_fits(X, Y, [0, 3], [1, 3])
+    assert np.isnan(fit.slope).all() and np.isnan(fit.pearson).all()
+
+
+def test_bootstrap_of_a_line_is_the_line():
+    y = 2.0 + 3.0 * X
+    slope, intercept, _ = lstsq(X, y)
+    intervals = regression.bootstrap_intervals(X, y, [0, 20, 40], samples=200)
+    for bound in intervals.slope:
+        np.testing.assert_allclose(bound, slope)
+    for bound in intervals.intercept:
+        np.testing.assert_allclose(bound, intercept)
+
+
+def test_bootstrap_intervals_contain_the_fit():
+    offsets = [0, 20, 40]
+    fit = regression.segment_fits(X, Y, offsets)
+    intervals = regression.bootstrap_intervals(X, Y, offsets, samples=500, seed=1, n_jobs=4)
+    again = regression.bootstrap_intervals(X, Y, offsets, samples=500, seed=1, n_jobs=4)
+
+    for field in regression.FitIntervals._fields:
+        low, high = getattr(intervals, field)
+        estimate = getattr(fit, field)
+        assert (low <= estimate).all() and (estimate <= high).all()
+        np.testing.assert_array_equal(getattr(again, field), getattr(intervals, field))
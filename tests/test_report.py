@@ -0,0 +1,46 @@
+import json
+import re
+
+import pytest
+
+import figure_cache
+import report
+import visualization
+
+
+def resolve(node, shared):
+    if isinstance(node, list):
+        return [resolve(value, shared) for value in node]
+    if isinstance(node, dict):
+        if list(node) == ["$shared"]:
+            return shared[node["$shared"]]
+        return {key: resolve(value, shared) for key, value in node.items()}
+    return node
+
+
+@pytest.fixture
+def page(tmp_path, monkeypatch):
+    monkeypatch.setattr(figure_cache, "FIGURE_CACHE_DIR", str(tmp_path))
+    return report.render(["plot_country_production_growth"], figure_cache.data_version())
+
+
+def exported_figure(page):
+    data = json.loads(re.search(r'<script type="application/json" id="report-data">(.*?)</script>', page).group(1))
+    shared = []
+    for value in data["shared"]:
+        shared.append(resolve(value, shared))
+    return resolve(data["figures"][0]["figure"], shared)
+
+
+def test_country_map_has_every_year(page):
+    years = visualization.get_dataset("country_frames", visualization.NO_FILTERS).years
+    figure = exported_figure(page)
+
+    steps = figure["layout"]["sliders"][0]["steps"]
+    assert len(years) > 1
+    assert [step["label"] for step in steps] == [str(year) for year in years]
+
+    for year, step in zip(years, steps):
+        frame = visualization.country_frame(year)
+        assert step["args"][0]["z"] == [frame["z"]]
+        assert len(step["args"][0]["locations"][0]) == len(frame["codes"])
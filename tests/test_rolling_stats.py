@@ -0,0 +1,32 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+import rolling_stats
+
+# A random walk, then a flat stretch whose variance the sliding update only reaches up to rounding.
+CLOSES = pd.Series(np.concatenate([100 * np.exp(np.cumsum(np.random.default_rng(3).normal(0, 0.02, 150))),
+                                   np.full(40, 95.0)]))
+
+
+def test_backfill_matches_pandas_rolling():
+    indicators = rolling_stats.RollingIndicators().backfill(CLOSES)
+    returns = CLOSES.pct_change()
+
+    np.testing.assert_allclose(indicators["daily_return"], returns, rtol=1e-12)
+    np.testing.assert_allclose(indicators["volatility"], returns.rolling(rolling_stats.WINDOW).std(),
+                               rtol=1e-8, atol=1e-9)
+    np.testing.assert_allclose(indicators["MA30"], CLOSES.rolling(rolling_stats.WINDOW).mean(), rtol=1e-12)
+    assert (indicators["volatility"].iloc[-10:] >= 0).all()
+
+
+def test_resumed_state_continues_exactly():
+    whole = rolling_stats.RollingIndicators().backfill(CLOSES)
+
+    first = rolling_stats.RollingIndicators()
+    first.backfill(CLOSES[:100])
+    resumed = rolling_stats.RollingIndicators.from_dict(json.loads(json.dumps(first.to_dict())))
+    rest = resumed.backfill(CLOSES[100:])
+
+    pd.testing.assert_frame_equal(rest, whole.iloc[100:].reset_index(drop=True), check_exact=True)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+import title_matching
+
+
+def titles(*rows):
+    return pd.DataFrame(rows, columns=title_matching.TITLE_COLUMNS)
+
+
+def matched(left, right):
+    pairs = title_matching.match_titles(left, right).pairs
+    return dict(zip(pairs["left"], pairs["right"]))
+
+
+def test_exact_keys_match_across_case_and_punctuation():
+    left = titles(("Fun with Dick & Jane", "MOVIE", 2005), ("13TH", "MOVIE", 2016))
+    right = titles(("13th", "MOVIE", 2016), ("Fun with Dick and Jane", "MOVIE", 2005))
+
+    assert matched(left, right) == {0: 1, 1: 0}
+
+
+def test_fuzzy_keys_match_within_the_year_gap():
+    left = titles(("Violet Evergarden: Eternity and the Auto Memory Doll", "MOVIE", 2019))
+    right = titles(("Violet Evergarden: Eternity and the Auto Memories Doll", "MOVIE", 2020))
+
+    assert matched(left, right) == {0: 0}
+    assert matched(left.assign(release_year=2017), right) == {}
+
+
+def test_exact_keys_match_within_their_year_gap():
+    right = titles(("True Grit", "MOVIE", 2010))
+    gap = title_matching.MAX_EXACT_YEAR_GAP
+
+    assert matched(titles(("TRUE GRIT", "MOVIE", 2010 - gap)), right) == {0: 0}
+    assert matched(titles(("TRUE GRIT", "MOVIE", 2010 - gap - 1)), right) == {}
+    assert matched(titles(("TRUE GRIT", "MOVIE", np.nan)), right) == {0: 0}
+
+
+def test_shows_match_their_first_season():
+    right = titles(("Criminal Minds", "SHOW", 2005))
+
+    assert matched(titles(("Criminal Minds", "SHOW", 2017)), right) == {0: 0}
+    assert matched(titles(("Criminal Minds", "SHOW", 2000)), right) == {}
+    assert matched(titles(("Criminal Minds", "MOVIE", 2017)), right) == {}
+
+
+def test_closest_year_wins():
+    left = titles(("Attack on Titan", "SHOW", 2014))
+    right = titles(("Attack on Titan", "SHOW", 2011), ("Attack on Titan", "SHOW", 2013))
+
+    assert matched(left, right) == {0: 1}
+
+
+def test_rejected_pairs():
+    right = titles(("Toy Story 2", "MOVIE", 1999), ("The Haunted House", "MOVIE", 2016))
+    left = titles(("Toy Story 3", "MOVIE", 1999),  # another number
+                  ("The Haunting", "MOVIE", 2016),  # too far off
+                  ("Haunted House", "MOVIE", 2017))  # a word short, a year apart
+
+    assert matched(left, right) == {}
+    # A word short is accepted in the same year.
+    assert matched(titles(("Haunted House", "MOVIE", 2016)), right) == {0: 1}
+
+
+def test_report_counts_exact_matches_by_method():
+    # Every trigram of "mamama" is one of "mama": similarity 1, but not the same key.
+    left = titles(("Go Mama", "MOVIE", 2019), ("Yes Day", "MOVIE", 2021))
+    right = titles(("Go Mamama", "MOVIE", 2019), ("YES DAY", "MOVIE", 2021))
+    matches = title_matching.match_titles(left, right)
+
+    assert matches.pairs["similarity"].tolist() == [1, 1]
+    report = title_matching.match_report(matches, len(left), 1.0)
+    assert (report["matched"], report["exact"]) == (2, 1)